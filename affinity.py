@@ -0,0 +1,249 @@
+"""
+Offline founder x investor affinity job.
+
+Scores every founder's pitch against every investor's focus areas, stages and description with
+TF-IDF cosine similarity (one matrix product per chunk of founders and chunk of investors, so
+memory stays flat however many there are) and stores each founder's
+top AFFINITY_TOP_N investors, so the web UI and the agent can show ranked recommendations without
+a search. Reruns are incremental: only founders and investors whose text changed are rescored,
+against the vocabulary fitted by the last full run. A full rebuild refits the vocabulary; it runs
+on the first run, with --full, when --top-n changes, or when more than AFFINITY_REBUILD_FRACTION
+of the documents changed.
+
+Usage: python affinity.py [--full] [--top-n 10] [--show]
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from config import AFFINITY_TOP_N, AFFINITY_MAX_FEATURES, AFFINITY_REBUILD_FRACTION
+from data_loader import get_investor_dataframe
+from database import get_all_founders, get_affinity_state, save_affinity_results
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "based", "but", "by", "for", "from", "has", "have", "in", "into",
+    "is", "it", "its", "of", "on", "or", "our", "the", "their", "them", "they", "this", "that", "to", "we",
+    "with", "who", "will", "you", "your", "us", "also", "all", "any", "can", "more", "most", "not", "so",
+}
+# Focus areas and stages say more about fit than a free-text description, so their terms count more.
+INVESTOR_FIELD_WEIGHTS = {'focusarea': 3, 'investmentstage': 2, 'industry': 2, 'description': 1}
+FOUNDER_FIELD_WEIGHTS = {'startup_pitch': 2, 'startup_name': 1}
+SCORE_CHUNK_ROWS = 1024  # Founders and investors per matrix product; bounds the dense TF-IDF and score matrices
+
+
+def tokenize(text):
+    """Lower-cased words with stopwords dropped and plurals folded, plus bigrams of adjacent words."""
+    words = []
+    for word in TOKEN_RE.findall(str(text or "").lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def weighted_terms(record, field_weights):
+    """{term: weighted count} over the record's fields."""
+    terms = Counter()
+    for field, weight in field_weights.items():
+        for term in tokenize(record.get(field)):
+            terms[term] += weight
+    return dict(terms)
+
+
+def fingerprint(terms):
+    return hashlib.sha1(json.dumps(terms, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class AffinityModel:
+    """A fitted TF-IDF vocabulary; transform() turns term documents into L2-normalised rows."""
+
+    def __init__(self, vocabulary, idf, top_n):
+        self.vocabulary = {term: col for col, term in enumerate(vocabulary)}
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.top_n = top_n
+
+    @classmethod
+    def fit(cls, documents, top_n, max_features=AFFINITY_MAX_FEATURES):
+        doc_freq = Counter(term for doc in documents for term in doc)
+        terms = sorted(doc_freq, key=lambda t: (-doc_freq[t], t))[:max_features]
+        n = len(documents)
+        return cls(terms, [math.log((1 + n) / (1 + doc_freq[t])) + 1 for t in terms], top_n)
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(data["vocabulary"], data["idf"], data["top_n"])
+
+    def to_json(self):
+        return json.dumps({"vocabulary": list(self.vocabulary), "idf": self.idf.tolist(), "top_n": self.top_n})
+
+    def transform(self, documents):
+        rows, cols, values = [], [], []
+        for row, doc in enumerate(documents):
+            for term, count in doc.items():
+                col = self.vocabulary.get(term)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    values.append(1 + math.log(count))  # Sublinear tf: a repeated word is not 5x as relevant
+        matrix = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        matrix[rows, cols] = values
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def top_matches(scores, investor_ids, top_n):
+    """Per row of scores, the best top_n (investor_id, score) pairs with a positive score, best first."""
+    if scores.shape[1] == 0:
+        return [[] for _ in range(scores.shape[0])]
+    k = min(top_n, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    idx, part = np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+    return [[(investor_ids[j], round(float(s), 4)) for j, s in zip(row_idx, row_scores) if s > 0]
+            for row_idx, row_scores in zip(idx, part)]
+
+
+def score_founders(model, founder_docs, founder_ids, investor_docs, investor_ids, top_n):
+    """
+    {founder_id: ranked [(investor_id, score)]} against the given investors. Each chunk of investors
+    is transformed once and scored against every chunk of founders, keeping a running top_n per founder.
+    """
+    ranked = {f: [] for f in founder_ids}
+    for investor_start in range(0, len(investor_ids), SCORE_CHUNK_ROWS):
+        investor_chunk = investor_ids[investor_start:investor_start + SCORE_CHUNK_ROWS]
+        investor_matrix = model.transform([investor_docs[i] for i in investor_chunk])
+        for start in range(0, len(founder_ids), SCORE_CHUNK_ROWS):
+            chunk = founder_ids[start:start + SCORE_CHUNK_ROWS]
+            scores = model.transform([founder_docs[f] for f in chunk]) @ investor_matrix.T
+            for f, matches in zip(chunk, top_matches(scores, investor_chunk, top_n)):
+                ranked[f] = sorted(ranked[f] + matches, key=lambda pair: -pair[1])[:top_n] if ranked[f] else matches
+    return ranked
+
+
+def merge_ranked(kept, new_matches, top_n):
+    combined = [(r['investor_id'], r['score']) for r in kept] + new_matches
+    return sorted(combined, key=lambda pair: -pair[1])[:top_n]
+
+
+def run_affinity_job(full=False, top_n=AFFINITY_TOP_N):
+    """
+    Brings the stored recommendations up to date with the current founders and investors.
+    Returns (summary dict, None) or (None, error message).
+    """
+    start = time.perf_counter()
+    df = get_investor_dataframe()
+    if df is None:
+        return None, "Error: Investor data could not be loaded."
+    investor_docs = {row['investor_id']: weighted_terms(row, INVESTOR_FIELD_WEIGHTS)
+                     for row in df.to_dict('records') if row.get('investor_id')}
+    founder_docs = {f['id']: weighted_terms(f, FOUNDER_FIELD_WEIGHTS) for f in get_all_founders()}
+    current = {('investor', i): fingerprint(doc) for i, doc in investor_docs.items()}
+    current.update({('founder', str(f)): fingerprint(doc) for f, doc in founder_docs.items()})
+
+    model_json, stored, stored_ranked = get_affinity_state()
+    changed = {key for key, fp in current.items() if stored.get(key) != fp}
+    removed = set(stored) - set(current)
+    churn = (len(changed) + len(removed)) / max(len(current), 1)
+    model = AffinityModel.from_json(model_json) if model_json else None
+    summary = {"founders": len(founder_docs), "investors": len(investor_docs), "changed_documents": len(changed),
+               "removed_documents": len(removed)}
+
+    investor_ids = list(investor_docs)
+    if full or model is None or model.top_n != top_n or churn > AFFINITY_REBUILD_FRACTION:
+        model = AffinityModel.fit(list(investor_docs.values()) + list(founder_docs.values()), top_n)
+        ranked = score_founders(model, founder_docs, list(founder_docs), investor_docs, investor_ids, top_n)
+        if not save_affinity_results(ranked, current, model_json=model.to_json(), full=True):
+            return None, "Error: Could not save the affinity results."
+        summary.update(mode="full", rescored=len(ranked), merged=0, vocabulary=len(model.vocabulary))
+    elif not changed and not removed:
+        summary.update(mode="unchanged", rescored=0, merged=0, vocabulary=len(model.vocabulary))
+    else:
+        stale_investors = {i for kind, i in changed | removed if kind == 'investor'}
+        rescore = [f for f in founder_docs if ('founder', str(f)) in changed]
+        merge = {}
+        if stale_investors:
+            for f in founder_docs:
+                if ('founder', str(f)) in changed:
+                    continue
+                ranked_before = stored_ranked.get(f, [])
+                kept = [r for r in ranked_before if r['investor_id'] not in stale_investors]
+                # A full list that lost an entry may now have a gap that only an unchanged investor
+                # outside the stored top-N can fill, so that founder is rescored against everyone.
+                if len(kept) < len(ranked_before) and len(ranked_before) >= top_n:
+                    rescore.append(f)
+                else:
+                    merge[f] = kept
+
+        ranked = {}
+        if rescore:
+            ranked.update(score_founders(model, founder_docs, rescore, investor_docs, investor_ids, top_n))
+        if merge:
+            new_ids = [i for i in investor_ids if ('investor', i) in changed]
+            new_ranked = score_founders(model, founder_docs, list(merge), investor_docs, new_ids, top_n)
+            ranked.update({f: merge_ranked(kept, new_ranked[f], top_n) for f, kept in merge.items()})
+        removed_founders = [int(f) for kind, f in removed if kind == 'founder']
+        if not save_affinity_results(ranked, {key: current[key] for key in changed}, removed_founders, removed):
+            return None, "Error: Could not save the affinity results."
+        summary.update(mode="incremental", rescored=len(rescore), merged=len(merge), vocabulary=len(model.vocabulary))
+
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info("Affinity job (%s): %d founders x %d investors, %d rescored, %d merged in %ss", summary['mode'],
+                summary['founders'], summary['investors'], summary['rescored'], summary['merged'], summary['seconds'])
+    return summary, None
+
+
+def refresh_in_background():
+    """Runs the job incrementally on a daemon thread, so app startup does not wait for it."""
+    def refresh():
+        try:
+            _, error = run_affinity_job()
+            if error:
+                logger.error("Affinity refresh failed: %s", error)
+        except Exception as e:
+            logger.error("Affinity refresh failed: %s", e)
+
+    thread = threading.Thread(target=refresh, name="affinity-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="refit the vocabulary and rescore every founder")
+    parser.add_argument("--top-n", type=int, default=AFFINITY_TOP_N, help="investors stored per founder")
+    parser.add_argument("--show", action="store_true", help="print each founder's recommendations afterwards")
+    args = parser.parse_args()
+
+    summary, error = run_affinity_job(full=args.full, top_n=max(1, args.top_n))
+    if error:
+        raise SystemExit(error)
+    print(json.dumps(summary, indent=2))
+    if args.show:
+        df = get_investor_dataframe()
+        names = dict(zip(df['investor_id'], df['name']))
+        _, _, ranked = get_affinity_state()
+        for founder in get_all_founders():
+            print(f"\n{founder['founder_name']} ({founder['startup_name']}):")
+            for rank, row in enumerate(ranked.get(founder['id'], []), start=1):
+                print(f"  {rank}. {names.get(row['investor_id'], row['investor_id'])}  {row['score']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import LLM_MAX_CONCURRENCY, AGENT_TOOL_WORKERS
+from instrumentation import start_trace, current_trace_id
+from intent_router import route_message
+
+
+class AgentLoop:
+    """
+    One asyncio event loop on a background thread that runs every agent turn in the process.
+    Turns await the model with ainvoke, so hundreds can be in flight without a thread each; at
+    most max_concurrency of them hold a model slot at once and the rest wait in order. Blocking
+    work (investor search, SMTP, SQLite, sync tools) runs on a bounded thread pool.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, tool_workers=AGENT_TOOL_WORKERS):
+        self.max_concurrency = max(1, max_concurrency)
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=max(1, tool_workers), thread_name_prefix="agent-tool"))
+        self._limiter = asyncio.Semaphore(self.max_concurrency)
+        self._stats = {"turns": 0, "in_flight": 0, "peak_in_flight": 0, "waiting": 0, "peak_waiting": 0}
+        self._thread = threading.Thread(target=self._run, name="agent-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def run(self, coro):
+        """Runs coro on the agent loop and awaits its result from any other event loop."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_traced(current_trace_id(), coro), self.loop))
+
+    def run_sync(self, coro):
+        """Runs coro on the agent loop and blocks the calling thread (never the loop's own) for its result."""
+        return asyncio.run_coroutine_threadsafe(_traced(current_trace_id(), coro), self.loop).result()
+
+    @contextlib.asynccontextmanager
+    async def model_slot(self):
+        """Holds one of the max_concurrency slots in front of the model for the duration of the block."""
+        self._stats["waiting"] += 1
+        self._stats["peak_waiting"] = max(self._stats["peak_waiting"], self._stats["waiting"])
+        try:
+            await self._limiter.acquire()
+        finally:
+            self._stats["waiting"] -= 1
+        self._stats["in_flight"] += 1
+        self._stats["turns"] += 1
+        self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+        try:
+            yield
+        finally:
+            self._stats["in_flight"] -= 1
+            self._limiter.release()
+
+    def stats(self):
+        # Only the loop thread mutates the counters; a slightly stale read is fine for reporting.
+        return dict(self._stats, max_concurrency=self.max_concurrency)
+
+
+async def _traced(trace_id, coro):
+    # Tasks on the agent loop start from the loop thread's context; carry the request's trace id over.
+    if trace_id:
+        start_trace(trace_id)
+    return await coro
+
+
+async def in_executor(func, *args):
+    """Runs blocking func on the loop's thread pool, keeping the caller's context (trace id)."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args))
+
+
+@contextlib.asynccontextmanager
+async def session_locked(agent_session):
+    """
+    Holds agent_session.lock, an asyncio.Lock, so a session's turns run one at a time. Every route
+    that touches a session goes through the agent loop, so waiters queue on the loop instead of
+    parking a pool thread, and a waiter cancelled by a client or timeout simply leaves the queue.
+    """
+    async with agent_session.lock:
+        yield
+
+
+async def agent_turn(agent_loop, agent_session, user_message, callbacks=None):
+    """
+    One /get_response or /stream_response turn: returns (routed response, None) from the fast path
+    or (None, agent output). callbacks (e.g. the SSE handler) are passed to the agent run.
+    """
+    async with session_locked(agent_session):
+        routed = await in_executor(route_message, agent_session, user_message)
+        if routed is not None:
+            return routed, None
+        async with agent_loop.model_slot():
+            result = await agent_session.agent_executor.ainvoke(
+                {"input": f"{user_message}."}, config={"callbacks": callbacks} if callbacks else None
+            )
+    return None, result['output']
+
+
+async def session_call(agent_session, func, *args):
+    """Runs a blocking session action (select or send) on the thread pool with the session lock held."""
+    async with session_locked(agent_session):
+        return await in_executor(func, *args)
@@ -0,0 +1,91 @@
+"""
+Bearer tokens for the JSON API, and signed links that bind a browser session to a founder.
+
+Each token in API_TOKENS (config.py) acts for one founder, or for every founder when its scope is
+"*" (an operator token). A call without a known token is refused, so with API_TOKENS unset the API
+is closed. The browser session is not accepted by the API.
+
+A browser session is bound to a founder only by proof: /?founder_link=<token>, a JWT signed with
+FOUNDER_LINK_SECRET_KEY (mint one with `python api_auth.py <founder_id>`), or /?founder=<id> sent
+with a bearer token that can act for that founder.
+
+Usage: python api_auth.py <founder_id> [--days 7]
+"""
+import argparse
+import datetime
+import hmac
+
+import jwt
+
+from config import API_TOKENS, FOUNDER_LINK_SECRET_KEY, FOUNDER_LINK_TTL_DAYS
+
+ANY_FOUNDER = "*"
+
+
+def parse_api_tokens(text):
+    """'tok1:1, tok2:*' -> [('tok1', '1'), ('tok2', '*')]; malformed entries are skipped."""
+    tokens = []
+    for item in text.split(","):
+        token, sep, scope = item.strip().rpartition(":")
+        scope = scope.strip()
+        if sep and token.strip() and (scope == ANY_FOUNDER or scope.isdigit()):
+            tokens.append((token.strip(), scope))
+    return tokens
+
+
+_TOKENS = parse_api_tokens(API_TOKENS)
+
+
+def token_scope(headers):
+    """The founder id (as a string) or ANY_FOUNDER the request's bearer token acts for, or None."""
+    scheme, _, token = (headers.get("Authorization") or "").strip().partition(" ")
+    token = token.strip()
+    if scheme.lower() != "bearer" or not token:
+        return None
+    scope = None
+    for known, known_scope in _TOKENS:  # Compare against every token so timing does not reveal a prefix
+        if hmac.compare_digest(known.encode(), token.encode()):
+            scope = known_scope
+    return scope
+
+
+def can_act_for(scope, founder_id):
+    """True if a token with this scope may act for founder_id."""
+    return scope == ANY_FOUNDER or (scope is not None and str(founder_id).strip() == scope)
+
+
+def founder_link_token(founder_id, days=FOUNDER_LINK_TTL_DAYS):
+    """A signed token for /?founder_link= that binds a browser session to founder_id until it expires."""
+    if not FOUNDER_LINK_SECRET_KEY:
+        raise ValueError("FOUNDER_LINK_SECRET_KEY is not set")
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days)
+    return jwt.encode({"founder_id": int(founder_id), "purpose": "founder_link", "exp": expires},
+                      FOUNDER_LINK_SECRET_KEY, algorithm="HS256")
+
+
+def founder_from_link(token):
+    """The founder id a valid, unexpired founder link was issued for, or None."""
+    if not FOUNDER_LINK_SECRET_KEY or not token:
+        return None
+    try:
+        payload = jwt.decode(token, FOUNDER_LINK_SECRET_KEY, algorithms=["HS256"])
+    except jwt.InvalidTokenError:  # Also covers expired links
+        return None
+    if payload.get("purpose") != "founder_link" or not isinstance(payload.get("founder_id"), int):
+        return None
+    return payload["founder_id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("founder_id", type=int)
+    parser.add_argument("--days", type=float, default=FOUNDER_LINK_TTL_DAYS, help="days until the link expires")
+    args = parser.parse_args()
+    try:
+        print(f"/?founder_link={founder_link_token(args.founder_id, args.days)}")
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,33 @@
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, request, render_template, jsonify, session, Response, stream_with_context, g, send_file
 import os
 import sys
-import traceback
-import pandas as pd
 import smtplib
 from email.mime.text import MIMEText
 from email.utils import formataddr
 from dotenv import load_dotenv
 from langchain.agents import initialize_agent, AgentType
-from langchain.chat_models import init_chat_model
-from langchain.memory import ConversationBufferMemory
 from langchain.tools import Tool
-from tools import search_investors, send_investor_email, check_investor_outreach_status
-from database import update_investor_acceptance, get_details_by_investor_email
+from conversation_memory import build_memory
+from tools import batch_search_investors, recommend_investors, send_investor_email, check_investor_outreach_status, parse_compact_rows
+from tools import recommended_investor_rows
+from database import update_investor_acceptance, get_details_by_investor_email, get_founder, get_founder_by_email, get_default_founder
 from config import ACCEPT_LINK_SECRET_KEY, MAIL_FROM_ADDRESS, MAIL_FROM_NAME, MAIL_USERNAME, MAIL_PASSWORD, MAIL_HOST, MAIL_PORT, MAIL_ENCRYPTION
+from config import SESSION_POOL_MAX_SESSIONS, SESSION_IDLE_TIMEOUT_SECONDS, LLM_PROVIDER, LLM_MODEL_NAME, AFFINITY_REFRESH_ON_START
+from sessions import SessionPool
+from llm_cache import install_llm_cache
+from llm_providers import create_chat_model
+from intent_router import select_investor, send_to_investor, cancel_send
+from agent_loop import AgentLoop, agent_turn, session_call
+from streaming import stream_agent_turn
+from instrumentation import start_span, start_trace, METRICS
 from send_cc_email import send_cc
+from outreach import submit_outreach, outreach_status, resume_queued_outreach
+from affinity import refresh_in_background
+from suppression import SUPPRESSIONS
+from logging_setup import get_logger, logging_stats
+from profiling import PROFILER, PROFILE_HEADER, profile_reason, has_profile_token
+from api_auth import token_scope, can_act_for, founder_from_link
+from outreach_history import history_page, parse_history_filters, export_chunks, EXPORT_FORMATS
 import jwt
 from flask_wtf.csrf import CSRFProtect
 
@@ -22,107 +35,79 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get("FLASK_SECRET_KEY", "your_secret_key")  # Set a secret key
 csrf = CSRFProtect(app)
 app.config['WTF_CSRF_ENABLED'] = True
+logger = get_logger(__name__)
 
 load_dotenv()
 
-GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
-GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
-
-if not GOOGLE_CLOUD_PROJECT or not GOOGLE_CLOUD_LOCATION:
-    print("Error: GOOGLE_CLOUD_PROJECT or GOOGLE_CLOUD_LOCATION not found in environment variables (.env file).")
-    sys.exit(1)
-
-valid_model_name = "gemini-2.0-flash-lite-001"
-
-llm = None  # Initialize llm outside the route
-agent_executor = None  # Initialize agent_executor outside the route
-founder_name = "Unknown" # Initialize
-startup_name = "Unknown"
-startup_pitch = "Unknown"
-founder_email = "Unknown"
-
-# Initialize LLM and agent globally (or within a function called once at startup)
-def initialize_agent_and_llm():
-    global llm, agent_executor, founder_name, startup_name, startup_pitch, founder_email
-    try:
-        llm = init_chat_model(
-        valid_model_name,
-        model_provider="google_vertexai",
-        temperature=0.1,
-        project=GOOGLE_CLOUD_PROJECT,
-        location=GOOGLE_CLOUD_LOCATION
+llm = None  # Initialize llm outside the route; the model client is shared by every session
+session_pool = None
+llm_cache = None
+agent_loop = AgentLoop()  # Runs every agent turn, streamed or not; LLM_MAX_CONCURRENCY caps turns at the model
+
+tools = [
+    # Takes several queries plus stage/focus filters in one call, and its compact result goes
+    # straight to the user (return_direct), so a search turn costs one LLM call, not two.
+    batch_search_investors,
+    # Precomputed matches for the founder's pitch (affinity.py); also shown directly.
+    recommend_investors,
+     Tool(
+        name="send_investor_email",
+        func=send_investor_email,
+        description="useful for when you need to send an email to an investor. The input should be ONLY the investor's name. Do not include any other information."
+    ),
+    Tool(
+        name="check_investor_outreach_status",
+        func=check_investor_outreach_status,
+        description="useful for when you need to check the status of an investor outreach."
     )
-        print(f"DEBUG: Successfully initialized model {valid_model_name}")
+]
+
+UNKNOWN_FOUNDER = {
+    "id": None,
+    "founder_name": "Unknown",
+    "founder_email": "Unknown",
+    "startup_name": "Unknown",
+    "startup_pitch": "Unknown"
+}
+
+# Initialize LLM globally (or within a function called once at startup)
+def initialize_llm():
+    global llm, session_pool, llm_cache
+    try:
+        # LLM_PROVIDER picks Vertex or an offline stand-in; streaming emits on_llm_new_token for /stream_response
+        llm = create_chat_model(streaming=True)
+        logger.info("Initialized model %s", LLM_MODEL_NAME if LLM_PROVIDER == 'vertex' else LLM_PROVIDER)
 
     except Exception as e:
-        print(f"\n--- ERROR initializing model ---")
-        print(f"Error Type: {type(e)}")
-        print(f"Details: {e}")
-        print("--- Check project/location in .env AND model name validity/availability. ---")
-        traceback.print_exc()
+        logger.critical("Error initializing model (%s: %s). Check project/location in .env AND model name "
+                        "validity/availability.", type(e).__name__, e, exc_info=True)
         sys.exit(1)
 
-    print("\nDEBUG: Testing LLM connection...")
     try:
         test_response = llm.invoke(["Confirm you are ready."])
-        print(f"DEBUG: LLM Test Response: {test_response}")
-        print("DEBUG: LLM connection seems OK.")
+        logger.debug("LLM test response: %s", test_response)
+        logger.info("LLM connection seems OK.")
     except Exception as llm_error:
-        print(f"--- FATAL ERROR: Cannot connect to LLM! ---")
-        print(f"--- ERROR DETAILS: {llm_error} ---")
-        print("--- Please check GCP project permissions for Vertex AI for your account/service account. ---")
+        logger.critical("Cannot connect to LLM: %s. Please check GCP project permissions for Vertex AI for your "
+                        "account/service account.", llm_error)
         sys.exit(1)
 
-    # Load founder details from CSV *before* defining SYSTEM_MESSAGE
-    try:
-        founder_df = pd.read_csv("founder.csv")
-        if not founder_df.empty:
-            founder_data = founder_df.iloc[0].to_dict()
-            founder_name = founder_data.get("founder_name", "Unknown")
-            founder_email = founder_data.get("founder_email", "Unknown")
-            startup_name = founder_data.get("startup_name", "Unknown")
-            startup_pitch = founder_data.get("startup_pitch", "Unknown")
-
-            print(f"DEBUG: Loaded founder details: {founder_data}")
-            print(f"DEBUG: Loaded founder_name: {founder_name}")
-            print(f"DEBUG: Loaded founder_email: {founder_email}")
-            print(f"DEBUG: Loaded startup_name: {startup_name}")
-            print(f"DEBUG: Loaded startup_pitch: {startup_pitch}")
+    # Installed after the connection test so the test always reaches Vertex.
+    llm_cache = install_llm_cache()
 
-        else:
-            print("ERROR: founder.csv is empty!")
-            founder_name = "Unknown"
-            startup_name = "Unknown"
-            startup_pitch = "Unknown"
-            founder_email = "Unknown"
-
-    except FileNotFoundError:
-        print("ERROR: founder.csv not found!")
-        founder_name = "Unknown"
-        startup_name = "Unknown"
-        startup_pitch = "Unknown"
-        founder_email = "Unknown"
-   
-    tools = [
-        Tool(
-            name="search_investors",
-            func=search_investors,
-            description="useful for when you need to find investors. Input should be a search query."
-        ),
-         Tool(
-            name="send_investor_email",
-            func=send_investor_email,
-            description="useful for when you need to send an email to an investor. The input should be ONLY the investor's name. Do not include any other information."
-        ),
-        Tool(
-            name="check_investor_outreach_status",
-            func=check_investor_outreach_status,
-            description="useful for when you need to check the status of an investor outreach."
-        )
-    ]
-    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    session_pool = SessionPool(
+        build_agent_executor,
+        max_sessions=SESSION_POOL_MAX_SESSIONS,
+        idle_timeout_seconds=SESSION_IDLE_TIMEOUT_SECONDS
+    )
+    print("\n--- Investor Outreach AI Assistant ---")
 
-    SYSTEM_MESSAGE = f"""
+def build_system_message(founder):
+    founder_name = founder.get("founder_name") or "Unknown"
+    founder_email = founder.get("founder_email") or "Unknown"
+    startup_name = founder.get("startup_name") or "Unknown"
+    startup_pitch = founder.get("startup_pitch") or "Unknown"
+    return f"""
     You are an AI assistant helping startup founders find and connect with relevant investors. Your goal is to be accurate and helpful.
 
     You know the following details about the founder and their startup:
@@ -135,15 +120,15 @@ def initialize_agent_and_llm():
     
     Your process is STRICTLY as follows:
 
-    1. Ask the founder what types of investors they are looking for. 
+    1. Ask the founder what types of investors they are looking for. If they ask for recommendations or who they should contact instead, call the 'recommend_investors' tool with founder email: {founder_email} and go to step 3.
 
-    2. Use the 'search_investors' tool with relevant keywords to find potential matches. Present the *raw* output from the 'search_investors' tool to the user *exactly* as it is returned.
+    2. Call the 'batch_search_investors' tool ONCE with every relevant keyword query in its 'queries' list (and the 'stage' or 'focus' filter if the founder named one). Its output is shown to the user directly.
 
     3.  **After presenting the search results, IMMEDIATELY STOP and wait for the user to select an investor name.**
 
     4.  **If, and ONLY if, the user provides a specific investor name,** ask the user: "Are you sure you want to send an email to *[investor name the user provided]*? (yes/no)". 
 
-    5.  If the answer is "yes", attempt to send an email call the tool `send_investor_email` with the investor name: {investor_name}, founder email: {founder_email}, founder name: {founder_name}, startup name: {startup_name}, startup pitch: {startup_pitch}. You already know the founder and startup's details. Do not ask the user for them.
+    5.  If the answer is "yes", attempt to send an email call the tool `send_investor_email` with the investor name the user confirmed, founder email: {founder_email}, founder name: {founder_name}, startup name: {startup_name}, startup pitch: {startup_pitch}. You already know the founder and startup's details. Do not ask the user for them.
 
     6. Report the outcome to the user based on the tool's output.
 
@@ -151,14 +136,17 @@ def initialize_agent_and_llm():
 
     *   Do NOT interpret search results. 
     *   Do NOT claim to have found or not found investors based on your interpretation. 
-    *   Do NOT provide investor details or emails directly from your knowledge. The 'search_investors' tool is the only source of investor information.
+    *   Do NOT provide investor details or emails directly from your knowledge. The 'batch_search_investors' and 'recommend_investors' tools are the only sources of investor information.
     *   Do NOT attempt to send an email without the user's explicit confirmation of the investor's name.
     *   You MUST use the founder details already provided.
     """
 
-    print(f"DEBUG: SYSTEM_MESSAGE: {SYSTEM_MESSAGE}")
+def build_agent_executor(founder):
+    """Builds a fresh agent with its own conversation memory for one founder session."""
+    memory = build_memory(llm, agent_loop)
+    SYSTEM_MESSAGE = build_system_message(founder)
 
-    print("\nDEBUG: Initializing agent...")
+    logger.debug("Initializing agent for founder %s", founder.get('founder_email'))
     try:
         agent_executor = initialize_agent(
             tools,
@@ -171,19 +159,47 @@ def initialize_agent_and_llm():
                 "system_message": SYSTEM_MESSAGE
             }
         )
-        print("DEBUG: Agent initialized successfully!")
+        return agent_executor
 
     except Exception as e:
-        print(f"\n--- ERROR during agent initialization ---")
-        print(f"Error Type: {type(e)}")
-        print(f"Details: {e}")
-        print("--- Check project type, tool definitions, and LLM setup. ---")
-        traceback.print_exc()
-        sys.exit(1)
-
-    print("\n--- Investor Outreach AI Assistant ---")
-
-initialize_agent_and_llm()
+        logger.exception("Error during agent initialization (%s: %s). Check project type, tool definitions, "
+                         "and LLM setup.", type(e).__name__, e)
+        return None
+
+def resolve_session_founder():
+    """Looks up the founder bound to the current session cookie, falling back to the first founder."""
+    founder = None
+    founder_id = session.get('founder_id')
+    if founder_id is not None:
+        founder = get_founder(founder_id)
+    if founder is None:
+        founder = get_default_founder()
+        if founder is None:
+            logger.error("No founders found in the founders table (is founder.csv empty?)")
+            return dict(UNKNOWN_FOUNDER)
+        session['founder_id'] = founder['id']
+    return founder
+
+def get_agent_session():
+    """Returns this browser session's AgentSession, creating the session cookie on first use."""
+    if session_pool is None:
+        return None
+    session_id = session.get('sid')
+    if not session_id:
+        session_id = SessionPool.new_session_id()
+        session['sid'] = session_id
+    founder = resolve_session_founder()
+    agent_session = session_pool.get(session_id, founder)
+    if agent_session.agent_executor is None:
+        session_pool.discard(session_id)
+        return None
+    return agent_session
+
+initialize_llm()
+SUPPRESSIONS.rebuild()  # Before the resumed sends below are checked against it
+resume_queued_outreach()
+if AFFINITY_REFRESH_ON_START:
+    refresh_in_background()  # Picks up founders and investors changed since the last affinity run
 
 def send_confirmation_email(recipient_email: str, subject: str, body: str) -> bool:
     """Sends a confirmation email using SMTP configuration."""
@@ -195,7 +211,7 @@ def send_confirmation_email(recipient_email: str, subject: str, body: str) -> bo
     try:
         smtp_port = int(MAIL_PORT)
     except (ValueError, TypeError):
-        print(f"Warning: Invalid MAIL_PORT '{MAIL_PORT}' in .env. Defaulting to 587.")
+        logger.warning("Invalid MAIL_PORT %r in .env. Defaulting to 587.", MAIL_PORT)
         smtp_port = 587
     use_tls = MAIL_ENCRYPTION and MAIL_ENCRYPTION.lower() == 'tls'
 
@@ -205,30 +221,27 @@ def send_confirmation_email(recipient_email: str, subject: str, body: str) -> bo
     message['To'] = recipient_email
 
     server = None
+    smtp_span = start_span("smtp", "send_confirmation_email", host=smtp_host, port=smtp_port)
     try:
-        print(f"DEBUG: Attempting SMTP connection to {smtp_host}:{smtp_port}")
+        logger.debug("Connecting to SMTP %s:%s", smtp_host, smtp_port)
         if smtp_port == 465:
             server = smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=10)
         else:
             server = smtplib.SMTP(smtp_host, smtp_port, timeout=10)
             server.ehlo()
             if use_tls or smtp_port == 587:
-                print("DEBUG: Starting TLS...")
                 server.starttls()
                 server.ehlo()
-                print("DEBUG: TLS Handshake successful.")
 
-        print(f"DEBUG: Logging in as {sender_login_email}...")
         server.login(sender_login_email, sender_password)
-        print(f"DEBUG: Login success")
-
         server.sendmail(sender_from_address, [recipient_email], message.as_string())
-        print(f"DEBUG: Send Mail success")
+        logger.info("Confirmation email sent to %s", recipient_email)
 
         return True
 
     except Exception as e:
-        print(f"Error sending confirmation email: {e}")
+        smtp_span.fail(e)
+        logger.error("Error sending confirmation email: %s", e)
         return False
     finally:
         if server:
@@ -236,88 +249,300 @@ def send_confirmation_email(recipient_email: str, subject: str, body: str) -> bo
                 server.quit()
             except:
                 pass
+        smtp_span.end()
+
+@app.before_request
+def begin_request_span():
+    trace_id = start_trace(request.headers.get('X-Trace-Id'))
+    g.request_span = start_span("http", request.endpoint or request.path, method=request.method)
+    reason = profile_reason(request.headers) if request.endpoint not in ('profiles', 'profile_stacks') else None
+    if reason:
+        g.profile = PROFILER.start(trace_id, f"{request.method} {request.path}", reason)
+
+@app.after_request
+def add_profile_header(response):
+    if 'profile' in g:
+        response.headers['X-Profile-Id'] = g.profile.id  # Sent before a streamed body, so it is known up front
+    return response
+
+@app.teardown_request
+def end_request_span(error=None):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        PROFILER.finish(profile, error)
+    request_span = g.pop('request_span', None)
+    if request_span is not None:
+        if error is not None:
+            request_span.fail(error)
+        request_span.end()
+
+@app.route('/metrics')
+def metrics():
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
+     # A session switches founder only with proof: a signed founder link, or an API token for that founder.
+     founder = None
+     linked_id = founder_from_link(request.args.get('founder_link'))
+     founder_key = request.args.get('founder')
+     if linked_id is not None:
+         founder = get_founder(linked_id)
+     elif founder_key:
+         founder = get_founder(int(founder_key)) if founder_key.isdigit() else get_founder_by_email(founder_key)
+         if founder and not can_act_for(token_scope(request.headers), founder['id']):
+             logger.warning("Ignoring ?founder= without a founder link or API token for that founder")
+             founder = None
+     if founder:
+         if session.get('founder_id') != founder['id']:
+             session.pop('sid', None)  # New founder, new conversation
+         session['founder_id'] = founder['id']
+     founder = resolve_session_founder()
+     founder_name = founder.get("founder_name", "Unknown")
      ai_greeting = f"AI: Hi, {founder_name}! I'm ready to help you find investors."
-     return render_template('index.html', ai_greeting=ai_greeting)
+     # Rendered into the page, so the founder sees their best matches before asking anything.
+     recommended, _ = recommended_investor_rows(founder)
+     recommendations = [row['name'] for row in recommended['rows'] if row['name']] if recommended else []
+     return render_template('index.html', ai_greeting=ai_greeting, recommendations=recommendations)
+
+def format_agent_output(output, user_message):
+    """Turns the agent's final output into the JSON shape the page expects."""
+    bot_response = f"AI: {output}"
+    compact_rows = parse_compact_rows(output)
+
+    if compact_rows:
+        return {
+            'bot_response': "Here are some potential investors:",
+            'investor_options': [name for name, _ in compact_rows],
+            'investor_ids': [investor_id for _, investor_id in compact_rows]
+        }
+    elif "Please enter the name of the investor you want to contact" in bot_response:
+        investor_list_str = output.split("Here are some potential investors:")[1].split("Please enter the name of the investor you want to contact")[0]
+        investor_list = [item.strip() for item in investor_list_str.split(',')]
+        return {
+            'bot_response': "Here are some potential investors:",
+            'investor_options': investor_list
+        }
+    elif "Are you sure you want to send an email to" in bot_response:
+        return {'bot_response': bot_response}
+    elif 'send_investor_email' in user_message:
+        return {'bot_response': bot_response}
+    else:
+        return {'bot_response': output}
 
 @app.route('/get_response', methods=['POST'])
 @csrf.exempt
-def get_response():
-    global agent_executor, founder_name, startup_name, startup_pitch, founder_email
+async def get_response():
     user_message = request.form['user_message']
 
     try:
-        if agent_executor is None:
+        agent_session = get_agent_session()
+        if agent_session is None:
             bot_response = "The agent is not initialized. Please try again later."
         else:
-            initial_input = f"{user_message}."
-            search_results = agent_executor.invoke({"input": initial_input})
-            bot_response = f"AI: {search_results['output']}"
-
-            if "Please enter the name of the investor you want to contact" in bot_response:
-                investor_list_str = search_results['output'].split("Here are some potential investors:")[1].split("Please enter the name of the investor you want to contact")[0]
-                investor_list = [item.strip() for item in investor_list_str.split(',')]
-                return jsonify({
-                    'bot_response': "Here are some potential investors:",
-                    'investor_options': investor_list
-                })
-            elif "Are you sure you want to send an email to" in bot_response:
-                return jsonify({'bot_response': bot_response})
-            elif 'send_investor_email' in user_message:
-                return jsonify({'bot_response': bot_response})
-
-            else:
-                bot_response =search_results['output']
-                return jsonify({'bot_response': bot_response})
+            # The turn runs on the shared agent loop; this request only awaits its result.
+            routed, output = await agent_loop.run(agent_turn(agent_loop, agent_session, user_message))
+            if routed is not None:
+                logger.debug("Fast path handled message as %r", routed['routed'])
+                return jsonify(routed)
+            return jsonify(format_agent_output(output, user_message))
 
     except Exception as e:
         bot_response = f"Error: There is some error {e}"
 
     return jsonify({'bot_response': bot_response})
 
+@app.route('/stream_response', methods=['POST'])
+@csrf.exempt
+def stream_response():
+    """Same turn as /get_response, streamed as server-sent events: status, action, tool, token, final, done."""
+    user_message = request.form['user_message']
+    agent_session = get_agent_session()
+
+    def work(handler):
+        if agent_session is None:
+            return {'bot_response': "The agent is not initialized. Please try again later."}
+        # Same turn as /get_response on the shared agent loop, so it takes the session lock and a model slot.
+        routed, output = agent_loop.run_sync(agent_turn(agent_loop, agent_session, user_message, [handler]))
+        if routed is not None:
+            logger.debug("Fast path handled message as %r", routed['routed'])
+            return routed
+        return format_agent_output(output, user_message)
+
+    return Response(
+        stream_with_context(stream_agent_turn(work)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/send_email_to_investor', methods=['POST'])
-def send_email_to_investor():
-    global agent_executor, founder_name, startup_name, startup_pitch, founder_email
+async def send_email_to_investor():
     investor_name = request.form['investor_name']
 
     try:
-        if agent_executor is None:
+        agent_session = get_agent_session()
+        if agent_session is None:
             return jsonify({'bot_response': "The agent is not initialized. Please try again later."})
         else:
-            confirmation_message = f"Are you sure you want to send an email to {investor_name}? (yes/no)"
-            return jsonify({'bot_response': confirmation_message, 'require_confirmation': True, 'investor_name': investor_name})
+            return jsonify(await agent_loop.run(session_call(agent_session, select_investor, agent_session, investor_name)))
 
     except Exception as e:
         return jsonify({'bot_response': f"Error: {e}"})
 
 
 @app.route('/confirm_send_email', methods=['POST'])
-def confirm_send_email():
-    global agent_executor, founder_name, startup_name, startup_pitch, founder_email
+async def confirm_send_email():
     confirmation = request.form['confirmation']
     investor_name = request.form['investor_name']
 
-    if confirmation.lower() == 'yes':
-        try:
-            email_instructions = f"call the tool `send_investor_email` with the investor name: {investor_name}, founder email: {founder_email}, founder name: {founder_name}, startup name: {startup_name}, startup pitch: {startup_pitch}"
-            bot_response = agent_executor.invoke({"input": email_instructions})
-            return jsonify({'bot_response': bot_response['output']})
-        except Exception as e:
-            return jsonify({'bot_response': f"Error sending email: {e}"})
-    else:
-        return jsonify({'bot_response': "Email not sent."})
+    try:
+        agent_session = get_agent_session()
+        if agent_session is None:
+            return jsonify({'bot_response': "The agent is not initialized. Please try again later."})
+        if confirmation.lower() != 'yes':
+            return jsonify(await agent_loop.run(session_call(agent_session, cancel_send, agent_session)))
+        # The investor was already chosen and confirmed in the UI; no LLM round trip is needed to send.
+        return jsonify(await agent_loop.run(session_call(agent_session, send_to_investor, agent_session, investor_name)))
+    except Exception as e:
+        return jsonify({'bot_response': f"Error sending email: {e}"})
+
+
+def api_unauthorized():
+    return jsonify({'error': "An API token is required (Authorization: Bearer <token>)"}), 401, {'WWW-Authenticate': 'Bearer'}
+
+
+@app.route('/api/outreach', methods=['POST'])
+@csrf.exempt
+def api_outreach():
+    """
+    JSON {"founder_id": 1, "investor_ids": ["inv_..."], "request_id": optional}; an Idempotency-Key
+    header also sets the request id. Queues the sends and answers 202 at once; retrying is safe.
+    Needs an API token (Authorization: Bearer) that acts for founder_id.
+    """
+    scope = token_scope(request.headers)
+    if scope is None:
+        return api_unauthorized()
+    payload = request.get_json(silent=True) or {}
+    if not can_act_for(scope, payload.get('founder_id')):
+        return jsonify({'error': "This API token cannot send for that founder"}), 403
+    request_id = request.headers.get('Idempotency-Key') or payload.get('request_id')
+    body, status = submit_outreach(payload.get('founder_id'), payload.get('investor_ids'), request_id)
+    return jsonify(body), status
+
+
+@app.route('/api/outreach/<request_id>')
+def api_outreach_status(request_id):
+    scope = token_scope(request.headers)
+    if scope is None:
+        return api_unauthorized()
+    body, status = outreach_status(request_id)
+    if status == 200 and not can_act_for(scope, body['founder_id']):
+        body, status = {"error": f"No outreach found for request {request_id}"}, 404  # Same answer as an unknown id
+    return jsonify(body), status
+
+
+@app.route('/api/recommendations/<int:founder_id>')
+def api_recommendations(founder_id):
+    """
+    A founder's precomputed investor matches, best first; ?limit= caps the rows (default 5).
+    Needs an API token that acts for founder_id.
+    """
+    scope = token_scope(request.headers)
+    if scope is None:
+        return api_unauthorized()
+    if not can_act_for(scope, founder_id):  # Checked before the lookup so other founders' ids are not probed
+        return jsonify({'error': "This API token can only read its own founder's recommendations"}), 403
+    founder = get_founder(founder_id)
+    if founder is None:
+        return jsonify({'error': f"Founder {founder_id} not found"}), 404
+    result, error = recommended_investor_rows(founder, request.args.get('limit', type=int) or 5)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify({'founder_id': founder_id, 'total': result['total'], 'investors': result['rows']})
+
+
+@app.route('/api/outreach_history')
+def api_outreach_history():
+    """
+    Outreach rows newest first, keyset-paginated: pass next_cursor back as ?cursor= for the next page.
+    Needs an API token; a founder's token sees only that founder's rows.
+    """
+    scope = token_scope(request.headers)
+    if scope is None:
+        return api_unauthorized()
+    body, status = history_page(request.args, scope)
+    return jsonify(body), status
+
+@app.route('/api/outreach_history/export')
+def api_outreach_history_export():
+    """Every matching outreach row as a streamed download; ?format=csv (default) or ndjson. Same access as above."""
+    scope = token_scope(request.headers)
+    if scope is None:
+        return api_unauthorized()
+    fmt = (request.args.get('format') or 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    filters, error = parse_history_filters(request.args, scope)
+    if error:
+        body, status = error
+        return jsonify(body), status
+    return Response(
+        stream_with_context(export_chunks(filters, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=outreach_history.{fmt}'},
+    )
+
+def profiles_forbidden():
+    return jsonify({'error': f"Send {PROFILE_HEADER}: <PROFILE_TOKEN> to read profiles"}), 403
+
+@app.route('/profiles')
+def profiles():
+    """Recent request profiles, newest first; send an X-Profile header on a request to profile it."""
+    if not has_profile_token(request.headers):
+        return profiles_forbidden()
+    recent = PROFILER.recent(request.args.get('limit', type=int) or 50)
+    if request.args.get('format') == 'json':
+        return jsonify(recent)
+    return render_template('profiles.html', profiles=recent, header=PROFILE_HEADER)
+
+@app.route('/profiles/<profile_id>.collapsed')
+def profile_stacks(profile_id):
+    """A saved profile's collapsed stacks, ready for flamegraph.pl or speedscope."""
+    if not has_profile_token(request.headers):
+        return profiles_forbidden()
+    path = PROFILER.collapsed_path(profile_id)
+    if path is None:
+        return jsonify({'error': f"Profile {profile_id} not found"}), 404
+    return send_file(os.path.abspath(path), mimetype='text/plain')
+
+@app.route('/agent_loop_stats')
+def agent_loop_stats():
+    return jsonify(agent_loop.stats())
+
+
+@app.route('/suppression_stats')
+def suppression_stats():
+    return jsonify(SUPPRESSIONS.stats())
+
+
+@app.route('/logging_stats')
+def logging_stats_route():
+    return jsonify(logging_stats())
+
+@app.route('/llm_cache_stats')
+def llm_cache_stats():
+    if llm_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(llm_cache.stats(), enabled=True))
 
 
 @app.route('/accept_investor')
 def accept_investor():
     token = request.args.get('token')
-    print(f"DEBUG: Received token: {token}")
 
     try:
         payload = jwt.decode(token, ACCEPT_LINK_SECRET_KEY, algorithms=["HS256"])
-        print(f"DEBUG: JWT payload: {payload}")
+        logger.debug("Acceptance link for investor %s from founder %s", payload.get('investor_email'), payload.get('founder_email'))
         investor_email = payload['investor_email']
         founder_email = payload['founder_email']
         investor_name = payload.get("investor_name")
@@ -371,7 +596,7 @@ def accept_investor():
     except jwt.InvalidTokenError:
         return "Invalid token."
     except Exception as e:
-        print(f"Error processing acceptance: {e}")
+        logger.exception("Error processing acceptance: %s", e)
         return f"An error occurred: {e}"
 
 if __name__ == '__main__':
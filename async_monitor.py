@@ -0,0 +1,382 @@
+import asyncio
+import datetime
+import json
+import re
+import ssl
+import traceback
+
+from config import (
+    MAIL_HOST, MAIL_USERNAME, MAIL_PASSWORD, IMAP_IDLE_TIMEOUT_SECONDS,
+    MONITOR_ACCOUNTS_PATH, MONITOR_FOLDERS, PIPELINE_WRITE_BATCH_SIZE
+)
+from database import init_db, apply_reply_updates, get_mailbox_checkpoint, save_mailbox_checkpoint
+from imap_fetch import (
+    compress_uid_set, decode_part, HEADER_FETCH_ITEMS, BODYSTRUCTURE_FETCH_ITEMS, section_fetch_items,
+    headers_from_response, text_sections_from_response, parts_from_section_response
+)
+from monitor_replies import (
+    route_replies, CHECK_INTERVAL_SECONDS, FETCH_BATCH_SIZE,
+    RECONNECT_BACKOFF_INITIAL_SECONDS, RECONNECT_BACKOFF_MAX_SECONDS
+)
+from reply_classifier import get_default_classifier, CATEGORY_STATUS, DEFAULT_STATUS
+
+IMAP_SSL_PORT = 993
+CONNECT_TIMEOUT_SECONDS = 30
+COMMAND_TIMEOUT_SECONDS = 120
+WRITER_FLUSH_INTERVAL_SECONDS = 0.2
+
+LITERAL_RE = re.compile(rb"\{(\d+)\}\r?\n$")
+UIDVALIDITY_RE = re.compile(rb"UIDVALIDITY (\d+)", re.IGNORECASE)
+
+
+class ImapError(Exception):
+    pass
+
+
+def _quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class AsyncImapClient:
+    """
+    Minimal IMAP4rev1 client on asyncio streams, covering what the monitor needs: LOGIN, SELECT,
+    CAPABILITY, UID SEARCH/FETCH, IDLE and LOGOUT. A mailbox waiting in IDLE is just a pending
+    read on the event loop, so watching more mailboxes does not cost more threads.
+    FETCH data is returned in the same shape imaplib uses, so imap_fetch's parsers apply unchanged.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.capabilities = set()
+        self._tag_counter = 0
+
+    @classmethod
+    async def connect(cls, host, port=IMAP_SSL_PORT):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl.create_default_context()), CONNECT_TIMEOUT_SECONDS
+        )
+        client = cls(reader, writer)
+        greeting = await client._readline()
+        if not greeting.startswith(b"* OK") and not greeting.startswith(b"* PREAUTH"):
+            client.close()
+            raise ImapError(f"Unexpected greeting: {greeting!r}")
+        return client
+
+    async def _readline(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("IMAP server closed the connection")
+        return line
+
+    async def _read_untagged(self, line):
+        """Reads one response, following literals; returns imaplib-style pieces."""
+        pieces = []
+        while True:
+            match = LITERAL_RE.search(line)
+            if not match:
+                pieces.append(line.rstrip(b"\r\n"))
+                return pieces
+            literal = await self.reader.readexactly(int(match.group(1)))
+            pieces.append((line.rstrip(b"\r\n"), literal))
+            line = await self._readline()
+
+    def _next_tag(self):
+        self._tag_counter += 1
+        return f"A{self._tag_counter:04d}".encode()
+
+    async def _send(self, line):
+        self.writer.write(line + b"\r\n")
+        await self.writer.drain()
+
+    async def command(self, *args):
+        """Runs one command; returns the untagged responses as a list of piece lists. Raises ImapError on NO/BAD."""
+        tag = self._next_tag()
+        await self._send(tag + b" " + " ".join(args).encode())
+        responses = []
+        while True:
+            line = await asyncio.wait_for(self._readline(), COMMAND_TIMEOUT_SECONDS)
+            if line.startswith(tag + b" "):
+                result = line[len(tag) + 1:].strip()
+                if not result.upper().startswith(b"OK"):
+                    raise ImapError(f"{args[0]} failed: {result!r}")
+                self._record_capabilities(result)
+                return responses
+            if line.startswith(b"*"):
+                pieces = await self._read_untagged(line)
+                self._record_capabilities(pieces[0] if isinstance(pieces[0], bytes) else pieces[0][0])
+                responses.append(pieces)
+
+    def _record_capabilities(self, line):
+        upper = line.upper()
+        idx = upper.find(b"CAPABILITY ")
+        if idx != -1:
+            words = upper[idx + len(b"CAPABILITY "):].split(b"]")[0].split()
+            self.capabilities = {w.decode("ascii", errors="replace") for w in words}
+
+    async def login(self, username, password):
+        await self.command("LOGIN", _quote(username), _quote(password))
+        if not self.capabilities:
+            await self.command("CAPABILITY")
+
+    async def select(self, folder):
+        """Selects folder (read-only, via EXAMINE) and returns its UIDVALIDITY."""
+        responses = await self.command("EXAMINE", _quote(folder))
+        for pieces in responses:
+            match = UIDVALIDITY_RE.search(pieces[0] if isinstance(pieces[0], bytes) else pieces[0][0])
+            if match:
+                return int(match.group(1))
+        raise ImapError(f"No UIDVALIDITY in EXAMINE response for {folder}")
+
+    async def uid_search_after(self, last_uid):
+        responses = await self.command("UID", "SEARCH", f"UID {last_uid + 1}:*")
+        uids = []
+        for pieces in responses:
+            line = pieces[0] if isinstance(pieces[0], bytes) else pieces[0][0]
+            if line.upper().startswith(b"* SEARCH"):
+                uids.extend(int(uid) for uid in line[len(b"* SEARCH"):].split())
+        # 'n:*' always matches the newest message, even when its UID is below n.
+        return sorted(uid for uid in set(uids) if uid > last_uid)
+
+    async def uid_fetch(self, uids, items):
+        responses = await self.command("UID", "FETCH", compress_uid_set(uids), items)
+        data = []
+        for pieces in responses:
+            data.extend(pieces)
+        return data
+
+    async def idle(self, timeout):
+        """Runs one IDLE command. Returns True when the server reports new mail, False on timeout."""
+        tag = self._next_tag()
+        await self._send(tag + b" IDLE")
+        new_mail = False
+        while True:
+            line = await asyncio.wait_for(self._readline(), COMMAND_TIMEOUT_SECONDS)
+            if line.startswith(b"+"):
+                break
+            if line.startswith(tag + b" "):
+                raise ImapError(f"IDLE rejected: {line!r}")
+            new_mail = new_mail or (b"EXISTS" in line or b"RECENT" in line)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not new_mail:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                line = await asyncio.wait_for(self._readline(), remaining)
+            except asyncio.TimeoutError:
+                break  # The pending readline is cancelled; buffered data stays in the stream
+            new_mail = line.startswith(b"*") and (b"EXISTS" in line or b"RECENT" in line)
+
+        await self._send(b"DONE")
+        while True:
+            line = await asyncio.wait_for(self._readline(), COMMAND_TIMEOUT_SECONDS)
+            if line.startswith(tag + b" "):
+                if not line[len(tag) + 1:].strip().upper().startswith(b"OK"):
+                    raise ImapError(f"IDLE ended with: {line!r}")
+                return new_mail
+
+    async def logout(self):
+        try:
+            await asyncio.wait_for(self.command("LOGOUT"), 5)
+        except (ImapError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        self.close()
+
+    def close(self):
+        self.writer.close()
+
+
+class _BatchAck:
+    """Completes once the shared writer has committed every tracked message of one fetch batch."""
+
+    def __init__(self, outstanding):
+        self.outstanding = outstanding
+        self.future = asyncio.get_running_loop().create_future()
+        if outstanding == 0:
+            self.future.set_result(True)
+
+    def committed(self, count=1):
+        self.outstanding -= count
+        if self.outstanding <= 0 and not self.future.done():
+            self.future.set_result(True)
+
+    def failed(self):
+        if not self.future.done():
+            self.future.set_result(False)
+
+
+def classify_and_write(items):
+    """Shared stage, run off the event loop: classify raw parts and apply them in one transaction."""
+    classifier = get_default_classifier()
+    now = datetime.datetime.now()
+    updates = []
+    for mailbox_key, uid, sender_email, outreach_id, part, _ in items:
+        try:
+            body = decode_part(*part) if part else None
+            if body:
+                category, hits = classifier.classify(body)
+                status = CATEGORY_STATUS.get(category, DEFAULT_STATUS)
+                print(f"  [{mailbox_key}] UID {uid} from {sender_email}: {category or 'unclear'} {hits}")
+            else:
+                status = "error_parsing_reply"
+                print(f"  [{mailbox_key}] UID {uid}: could not extract a plain text body for {sender_email}.")
+        except Exception as e:
+            # Still acknowledged: a message that breaks processing is reported once, not every cycle.
+            print(f"Error processing message UID {uid} in {mailbox_key}: {e}")
+            traceback.print_exc()
+            status = "error_parsing_reply"
+        updates.append((sender_email, status, now, outreach_id))
+    return apply_reply_updates(updates)
+
+
+class ReplyWriter:
+    """One classification and DB-writer task shared by every mailbox watcher."""
+
+    def __init__(self, batch_size=PIPELINE_WRITE_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.queue = asyncio.Queue(maxsize=self.batch_size * 4)
+
+    async def submit(self, mailbox_key, tracked, parts):
+        """Queues one batch's tracked messages and waits until they are committed. Returns False on a failed commit."""
+        ack = _BatchAck(len(tracked))
+        for uid, (sender_email, outreach_id) in tracked.items():
+            await self.queue.put((mailbox_key, uid, sender_email, outreach_id, parts.get(uid), ack))
+        return await ack.future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            deadline = loop.time() + WRITER_FLUSH_INTERVAL_SECONDS
+            while len(pending) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            result = await asyncio.to_thread(classify_and_write, pending)
+            for item in pending:
+                if result is None:
+                    item[-1].failed()
+                else:
+                    item[-1].committed()
+
+
+class MailboxWatcher:
+    """Watches one account/folder pair on its own connection, with its own backoff and UID checkpoint."""
+
+    def __init__(self, writer, host, username, password, folder, port=IMAP_SSL_PORT):
+        self.writer = writer
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.folder = folder
+        self.mailbox_key = f"{username}/{folder}"
+
+    async def sync(self, client, uidvalidity):
+        """Processes everything after the checkpoint, advancing it batch by batch once committed."""
+        checkpoint = await asyncio.to_thread(get_mailbox_checkpoint, self.mailbox_key)
+        last_uid = 0
+        if checkpoint and checkpoint[0] == uidvalidity:
+            last_uid = checkpoint[1]
+        elif checkpoint:
+            print(f"UIDVALIDITY for {self.mailbox_key} changed ({checkpoint[0]} -> {uidvalidity}); running a full resync.")
+
+        uids = await client.uid_search_after(last_uid)
+        if not uids:
+            return
+        print(f"[{self.mailbox_key}] Found {len(uids)} new email(s) after UID {last_uid}.")
+
+        for start in range(0, len(uids), FETCH_BATCH_SIZE):
+            batch = uids[start:start + FETCH_BATCH_SIZE]
+            headers = headers_from_response(await client.uid_fetch(batch, HEADER_FETCH_ITEMS))
+            tracked = await asyncio.to_thread(route_replies, headers, False)
+            parts = {uid: None for uid in tracked}
+            if tracked:
+                data = await client.uid_fetch(list(tracked), BODYSTRUCTURE_FETCH_ITEMS)
+                for section, entries in text_sections_from_response(data).items():
+                    data = await client.uid_fetch([uid for uid, _, _ in entries], section_fetch_items(section))
+                    parts_from_section_response(data, entries, parts)
+            if not await self.writer.submit(self.mailbox_key, tracked, parts):
+                print(f"[{self.mailbox_key}] Commit failed; stopping at UID {last_uid} until the next cycle.")
+                return
+            last_uid = batch[-1]
+            await asyncio.to_thread(save_mailbox_checkpoint, self.mailbox_key, uidvalidity, last_uid)
+
+    async def run(self):
+        backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+        while True:
+            client = None
+            try:
+                client = await AsyncImapClient.connect(self.host, self.port)
+                await client.login(self.username, self.password)
+                uidvalidity = await client.select(self.folder)
+                backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+                idle_supported = "IDLE" in client.capabilities
+                print(f"[{self.mailbox_key}] Connected ({'IDLE' if idle_supported else 'polling'}).")
+
+                await self.sync(client, uidvalidity)  # Catch anything that arrived while disconnected
+                while True:
+                    if idle_supported:
+                        if await client.idle(IMAP_IDLE_TIMEOUT_SECONDS):
+                            await self.sync(client, uidvalidity)
+                        else:
+                            await client.command("NOOP")  # Keepalive before re-entering IDLE
+                    else:
+                        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+                        await client.command("NOOP")
+                        await self.sync(client, uidvalidity)
+            except asyncio.CancelledError:
+                if client:
+                    await client.logout()
+                raise
+            except (ImapError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                print(f"[{self.mailbox_key}] IMAP connection error: {e}. Reconnecting in {backoff} seconds...")
+            except Exception as e:
+                print(f"[{self.mailbox_key}] Unexpected error: {e}. Reconnecting in {backoff} seconds...")
+                traceback.print_exc()
+            if client:
+                client.close()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX_SECONDS)
+
+
+def load_mailboxes(path=MONITOR_ACCOUNTS_PATH):
+    """Returns [(host, port, username, password, folder)] from MONITOR_ACCOUNTS_PATH, or the MAIL_* account."""
+    if not path:
+        return [(MAIL_HOST, IMAP_SSL_PORT, MAIL_USERNAME, MAIL_PASSWORD, folder) for folder in MONITOR_FOLDERS]
+    with open(path, encoding="utf-8") as f:
+        accounts = json.load(f)
+    mailboxes = []
+    for account in accounts:
+        for folder in account.get("folders") or MONITOR_FOLDERS:
+            mailboxes.append((
+                account.get("host", MAIL_HOST), int(account.get("port", IMAP_SSL_PORT)),
+                account["username"], account["password"], folder
+            ))
+    return mailboxes
+
+
+async def run_monitor(mailboxes):
+    writer = ReplyWriter()
+    watchers = [
+        MailboxWatcher(writer, host, username, password, folder, port)
+        for host, port, username, password, folder in mailboxes
+    ]
+    print(f"Watching {len(watchers)} mailbox(es): {', '.join(w.mailbox_key for w in watchers)}")
+    await asyncio.gather(writer.run(), *(w.run() for w in watchers))
+
+
+def main():
+    init_db()
+    asyncio.run(run_monitor(load_mailboxes()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Batch jobs for `python main.py --batch`: one JSON object per input line, run on a worker pool, one
+JSON result per line written in completion order.
+
+    {"id": "a1", "type": "search", "queries": ["fintech", "payments"], "stage": "seed", "focus": "", "limit": 5}
+    {"id": "a2", "type": "recommend", "founder": 1, "limit": 5}
+    {"id": "a3", "type": "send", "founder": "founder@example.com", "investor_id": "inv_..."}
+    {"id": "a4", "type": "send", "founder": 1, "investor_name": "Anya Sharma"}
+    {"id": "a5", "type": "status", "investor_email": "anya.invests@email.com"}
+    {"id": "a6", "type": "agent", "message": "Find me climate investors"}
+
+Only "agent" jobs reach the LLM; the others call the tools and the outreach pipeline directly.
+"founder" is a founder id or email. A job without an id gets "line:<n>". Sends go through the same
+idempotent claim as /api/outreach, so a job rerun after a crash never emails an investor twice.
+
+Each result line is {"id", "type", "ok", "result" or "error", "seconds"}. The output file doubles
+as the checkpoint: with resume, jobs already recorded there are skipped and new results appended.
+With retry_failed, failed jobs run again and their new line follows the old one; the last line wins.
+"""
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from database import get_founder, get_founder_by_email
+from outreach import send_outreach_now
+from tools import search_investor_rows, recommended_investor_rows, find_investor_by_name, check_investor_outreach_status
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+PENDING_PER_WORKER = 4  # Jobs read ahead per worker; bounds memory however long the input is
+
+
+class JobError(Exception):
+    """A job that cannot run as written (bad fields, unknown founder or investor)."""
+
+
+def resolve_founder(value):
+    if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+        founder = get_founder(int(value))
+    elif isinstance(value, str) and "@" in value:
+        founder = get_founder_by_email(value.strip())
+    else:
+        raise JobError("founder must be a founder id or email")
+    if founder is None:
+        raise JobError(f"Founder {value} not found")
+    return founder
+
+
+def batch_request_id(job_id):
+    """The outreach request id a send job is recorded under, within /api/outreach's request id alphabet."""
+    return re.sub(r"[^A-Za-z0-9._:-]", "-", f"batch:{job_id}")[:128]
+
+
+def run_search(job):
+    result, error = search_investor_rows(job.get("queries") or job.get("query"), job.get("stage", ""),
+                                         job.get("focus", ""), job.get("limit", 5))
+    if error:
+        raise JobError(error)
+    return result
+
+
+def run_recommend(job):
+    result, error = recommended_investor_rows(resolve_founder(job.get("founder")), job.get("limit", 5))
+    if error:
+        raise JobError(error)
+    return result
+
+
+def run_send(job):
+    founder = resolve_founder(job.get("founder"))
+    investor_id = job.get("investor_id")
+    if not investor_id:
+        if not job.get("investor_name"):
+            raise JobError("send needs investor_id or investor_name")
+        investor, error = find_investor_by_name(job["investor_name"])
+        if error:
+            raise JobError(error)
+        investor_id = investor["investor_id"]
+    body, status = send_outreach_now(founder["id"], investor_id, batch_request_id(job["id"]))
+    if status != 200:
+        raise JobError(body.get("error", body))
+    if body["status"] == "failed":
+        raise JobError(body.get("detail") or "Send failed")
+    return body
+
+
+def run_status(job):
+    if not job.get("investor_email"):
+        raise JobError("status needs investor_email")
+    return check_investor_outreach_status.invoke({"investor_email": job["investor_email"]})
+
+
+DETERMINISTIC_JOBS = {"search": run_search, "recommend": run_recommend, "send": run_send, "status": run_status}
+
+
+def read_jobs(lines):
+    """Yields (job id, job dict or None, parse error or None) for each non-blank line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("not a JSON object")
+        except ValueError as e:
+            yield f"line:{number}", None, f"Invalid job line: {e}"
+            continue
+        job["id"] = str(job.get("id") or f"line:{number}")
+        yield job["id"], job, None
+
+
+def completed_job_ids(path, retry_failed=False):
+    """Ids already recorded in an earlier run's output (only successful ones with retry_failed)."""
+    done = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash; that job runs again
+                if isinstance(record, dict) and "id" in record and (record.get("ok") or not retry_failed):
+                    done.add(record["id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def run_job(job, agent_runner):
+    start = time.perf_counter()
+    record = {"id": job["id"], "type": job.get("type")}
+    try:
+        handler = DETERMINISTIC_JOBS.get(job.get("type"))
+        if handler is not None:
+            record["result"] = handler(job)
+        elif job.get("type") == "agent":
+            if agent_runner is None:
+                raise JobError("agent jobs are not available in this run")
+            if not job.get("message"):
+                raise JobError("agent needs message")
+            record["result"] = agent_runner(job["message"])
+        else:
+            raise JobError(f"Unknown job type {job.get('type')!r}; expected one of "
+                           f"{', '.join(list(DETERMINISTIC_JOBS) + ['agent'])}")
+        record["ok"] = True
+    except JobError as e:
+        record.update(ok=False, error=str(e))
+    except Exception as e:
+        logger.exception("Batch job %s failed: %s", job["id"], e)
+        record.update(ok=False, error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run_batch(lines, out, workers, skip_ids=frozenset(), agent_runner=None):
+    """
+    Runs every job in lines (an iterable of JSONL strings) not in skip_ids and writes each result to
+    out as it completes. Returns a summary dict.
+    """
+    summary = {"ok": 0, "failed": 0, "skipped": 0}
+    start = time.perf_counter()
+
+    def write(record):  # Only this thread writes; workers hand back their records
+        out.write(json.dumps(record, default=str) + "\n")
+        out.flush()  # One complete line per finished job, so a crash loses at most the jobs in flight
+        summary["ok" if record["ok"] else "failed"] += 1
+
+    jobs = read_jobs(lines)
+    max_pending = max(1, workers) * PENDING_PER_WORKER
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as executor:
+        pending, exhausted = set(), False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                item = next(jobs, None)
+                if item is None:
+                    exhausted = True
+                    break
+                job_id, job, error = item
+                if job_id in skip_ids:
+                    summary["skipped"] += 1
+                elif error:
+                    write({"id": job_id, "type": None, "ok": False, "error": error, "seconds": 0})
+                else:
+                    pending.add(executor.submit(run_job, job, agent_runner))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(future.result())
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    ran = summary["ok"] + summary["failed"]
+    summary["jobs_per_second"] = round(ran / summary["seconds"], 2) if summary["seconds"] else None
+    return summary
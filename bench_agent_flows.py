@@ -0,0 +1,281 @@
+"""
+End-to-end benchmark for the Flask app, run offline against an LLM stand-in and a local SMTP sink.
+
+Each simulated founder runs the outreach flow over HTTP with its own session cookie:
+/get_response (search) -> /send_email_to_investor (select) -> /confirm_send_email (send).
+Reports flows/sec and p50/p90/p99 latency per step. Sends are written to a scratch copy of
+the DB and delivered to an in-process SMTP sink, so nothing leaves the machine.
+
+Usage: python bench_agent_flows.py [--users 8] [--flows 200] [--latency-ms 500] [--jitter-ms 200]
+       python bench_agent_flows.py --users 300 --flows 1200 --max-concurrency 64   # load test
+       python bench_agent_flows.py --provider replay --replay llm_transcript.jsonl
+       python bench_agent_flows.py --check   # only the routing cases below
+
+Before the run, a few hand-written messages are checked against the fast-path router: searches it
+must answer, and status questions it must leave to the agent. A wrong route exits with status 1.
+"""
+import argparse
+import contextlib
+import http.cookiejar
+import io
+import json
+import logging
+import math
+import os
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+STEPS = ["get_response", "send_email_to_investor", "confirm_send_email"]
+DEFAULT_MESSAGES = [
+    "find fintech investors",  # Handled by the fast-path router
+    "Which funds back seed-stage climate startups?",  # Goes through the agent and the LLM stand-in
+]
+
+# (message, search query the fast path must run, or None if the message must reach the agent)
+ROUTING_CASES = [
+    ("find fintech investors", "fintech"),
+    ("I'm looking for seed stage climate funds", "climate"),
+    ("search for angels in healthcare", "healthcare"),
+    ("Did any investors reply?", None),
+    ("Can you check if any investors replied to me?", None),
+    ("show me the status of my outreach to investors", None),
+    ("I need to know which funds accepted", None),
+    ("what do these investors want?", None),
+    ("find investors who opened my email", None),
+]
+
+
+def check_routing_cases():
+    """Runs each ROUTING_CASES message through the router; returns descriptions of the wrong routes."""
+    from types import SimpleNamespace
+    from intent_router import extract_search_query, route_message
+
+    failures = []
+    for message, query in ROUTING_CASES:
+        if query is None:
+            session = SimpleNamespace(pending_investor=None, last_results=[], agent_executor=None)
+            routed = route_message(session, message)
+            if routed is not None:
+                failures.append(f"{message!r} should reach the agent, was routed as {routed.get('routed')!r}")
+        else:
+            extracted = extract_search_query(message) or ""
+            if query not in extracted.split():
+                failures.append(f"{message!r} should search for {query!r}, got {extracted or None!r}")
+    return failures
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO with AUTH PLAIN, MAIL, RCPT, DATA and QUIT. Messages are counted and dropped."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif command.startswith("HELO"):
+                self.reply("250 localhost")
+            elif command.startswith("AUTH"):
+                self.reply("235 Authentication successful")
+            elif command.startswith("DATA"):
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.delivered += 1
+                self.reply("250 OK queued")
+            elif command.startswith("QUIT"):
+                self.reply("221 Bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.lock = threading.Lock()
+        self.delivered = 0
+
+
+def configure_environment(args, smtp_port, workdir, db_path):
+    """Points config at the stand-ins and the scratch DB; must run before anything imports config."""
+    os.environ.update({
+        "DB_PATH": db_path,  # app runs init_db, the suppression rebuild and queued sends at import
+        "LLM_PROVIDER": args.provider,
+        "LLM_FAKE_LATENCY_MS": str(args.latency_ms),
+        "LLM_FAKE_JITTER_MS": str(args.jitter_ms),
+        "LLM_CACHE_ENABLED": "false",  # Every agent turn should pay the stand-in's latency
+        "TRACE_PATH": os.path.join(workdir, "traces.jsonl"),
+        "SESSION_POOL_MAX_SESSIONS": str(max(args.users * 2, 100)),
+        "LLM_MAX_CONCURRENCY": str(args.max_concurrency),
+        "MAIL_HOST": "127.0.0.1",
+        "MAIL_PORT": str(smtp_port),
+        "MAIL_ENCRYPTION": "none",
+        "MAIL_USERNAME": "bench@example.com",
+        "MAIL_PASSWORD": "bench",
+        "MAIL_FROM_ADDRESS": "bench@example.com",
+        "MAIL_FROM_NAME": "Benchmark",
+    })
+    os.environ.setdefault("ACCEPT_LINK_SECRET_KEY", "bench-secret")
+    if args.replay:
+        os.environ["LLM_REPLAY_PATH"] = os.path.abspath(args.replay)
+
+
+def start_app():
+    from werkzeug.serving import make_server
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+    app_module.app.config["WTF_CSRF_ENABLED"] = False  # The benchmark posts forms without a page token
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", app_module.agent_loop
+
+
+def investor_names():
+    from data_loader import get_investor_dataframe
+
+    df = get_investor_dataframe()
+    return [name for name in df["name"].tolist() if name] if df is not None and "name" in df.columns else []
+
+
+class Founder:
+    """One simulated browser session: a cookie jar and the per-step timings of its flows."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, form=None):
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        with self.opener.open(self.base_url + path, data=data, timeout=120) as response:
+            body = response.read()
+        return json.loads(body) if form is not None else body
+
+    def timed_post(self, timings, step, path, form):
+        start = time.perf_counter()
+        result = self.request(path, form)
+        timings[step] = time.perf_counter() - start
+        return result
+
+
+def run_flow(founder, message, fallback_investor):
+    """Runs search -> select -> confirm; returns (step timings, routed by the fast path?, sent?)."""
+    timings = {}
+    start = time.perf_counter()
+    found = founder.timed_post(timings, "get_response", "/get_response", {"user_message": message})
+    options = found.get("investor_options") or []
+    investor = options[0] if options else fallback_investor
+    founder.timed_post(timings, "send_email_to_investor", "/send_email_to_investor", {"investor_name": investor})
+    sent = founder.timed_post(timings, "confirm_send_email", "/confirm_send_email",
+                              {"confirmation": "yes", "investor_name": investor})
+    timings["flow"] = time.perf_counter() - start
+    return timings, "routed" in found, bool(sent.get("sent"))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))  # Nearest rank
+    return sorted_values[idx]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent founders")
+    parser.add_argument("--flows", type=int, default=200, help="total flows across all founders")
+    parser.add_argument("--provider", choices=["fake", "replay"], default="fake")
+    parser.add_argument("--replay", default=None, help="transcript recorded with LLM_RECORD_PATH (for --provider replay)")
+    parser.add_argument("--latency-ms", type=float, default=500, help="stand-in LLM latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--max-concurrency", type=int, default=64, help="agent turns allowed at the model at once")
+    parser.add_argument("--message", action="append", default=None, help="search message; repeat to mix (default: one routed, one agent)")
+    parser.add_argument("--db", default="email_tracking.db", help="DB to copy for the run (not modified)")
+    parser.add_argument("--check", action="store_true", help="only check the routing cases")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # investors.csv and templates are relative paths
+    workdir = tempfile.mkdtemp(prefix="agent-bench-")
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, name="smtp-sink", daemon=True).start()
+    server = None
+    try:
+        # Every run starts from a fresh copy, so suppressions and sends from earlier runs do not carry over.
+        db_path = os.path.join(workdir, "bench.db")
+        shutil.copyfile(args.db, db_path)
+        configure_environment(args, sink.server_address[1], workdir, db_path)  # Before the routing check imports config
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = check_routing_cases()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"{len(ROUTING_CASES)} routing cases routed correctly")
+        if args.check:
+            return
+        server, base_url, agent_loop = start_app()
+        names = investor_names()
+        messages = args.message or DEFAULT_MESSAGES
+        founders = [Founder(base_url) for _ in range(args.users)]
+        for founder in founders:
+            founder.request("/")  # Sets the session cookie, as the page load does
+
+        def user_loop(idx):
+            results = []
+            for flow in range(idx, args.flows, args.users):
+                try:
+                    results.append(run_flow(founders[idx], messages[flow % len(messages)], names[flow % len(names)] if names else ""))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        print(f"Running {args.flows} flows with {args.users} concurrent founders "
+              f"({args.provider} LLM, {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms per call)...")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=args.users) as pool:
+            outcomes = [item for batch in pool.map(user_loop, range(args.users)) for item in batch]
+        elapsed = time.perf_counter() - start
+
+        errors = [o for o in outcomes if isinstance(o, Exception)]
+        completed = [o for o in outcomes if not isinstance(o, Exception)]
+        print(f"\n{len(completed)} flows in {elapsed:.2f}s ({len(completed) / elapsed:.2f} flows/sec); "
+              f"{sum(1 for _, _, sent in completed if sent)} sent, {sum(1 for _, routed, _ in completed if routed)} "
+              f"searches on the fast path, {len(errors)} errors, {sink.delivered} messages at the SMTP sink")
+        if errors:
+            print(f"first error: {errors[0]!r}")
+        loop_stats = agent_loop.stats()
+        print(f"agent loop: {loop_stats['turns']} model calls (turns and memory summaries), peak {loop_stats['peak_in_flight']} at the model "
+              f"(limit {loop_stats['max_concurrency']}), peak {loop_stats['peak_waiting']} queued for a slot")
+        print(f"{'step':<24}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)")
+        for step in STEPS + ["flow"]:
+            values = sorted(timings[step] for timings, _, _ in completed)
+            row = [percentile(values, p) for p in (50, 90, 99)] + [values[-1] if values else 0.0]
+            print(f"{step:<24}" + "".join(f"{v * 1000:9.1f}" for v in row))
+    finally:
+        if server is not None:
+            server.shutdown()
+        sink.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
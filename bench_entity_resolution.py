@@ -0,0 +1,155 @@
+"""
+Scale and accuracy benchmark for investor entity resolution (data_loader.resolve_investor_entities).
+
+Generates a synthetic export of distinct investors where a share of them appear several times:
+a legal suffix or abbreviation ("Capital LLC", "Cap."), a typo, an "(Angel)" tag, a second
+personal email, or the same website. It then reports the run time and pairwise precision/recall
+against the known clusters. Before that it checks a few hand-written pairs that must (or must not)
+merge, and exits with status 1 if any is resolved wrongly; --check runs only those.
+
+Usage: python bench_entity_resolution.py [--investors 1000000] [--duplicate-rate 0.15] [--seed 7] [--check]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+
+import pandas as pd
+
+from data_loader import resolve_investor_entities
+
+SUFFIXES = ["Capital", "Ventures", "Partners", "Fund", "Investments", "Group", "Angels"]
+STAGES = ["Pre-Seed", "Seed", "Series A", "Series B", "Series C+"]
+FOCUS = ["AI", "FinTech", "Climate Tech", "SaaS", "Healthcare IT", "EdTech", "Robotics", "Marketplaces", "DeFi", "Cybersecurity"]
+FREEMAIL = ["gmail.com", "yahoo.com", "outlook.com"]
+
+# (row, row, same investor?) pairs the resolver must get right.
+KNOWN_CASES = [
+    ({"Name": "John Smith", "Email": "john@gmail.com"}, {"Name": "John Smithers", "Email": "js@hotmail.com"}, False),
+    ({"Name": "Anya Sharma (Angel)", "Email": "anya@gmail.com"}, {"Name": "Anya Sharman", "Email": "a.sharman@yahoo.com"}, False),
+    ({"Name": "Seedling Capital LLC", "Email": "info@gmail.com"}, {"Name": "Seedling Cap.", "Email": "deals@yahoo.com"}, True),
+    ({"Name": "Inovate Ventures", "Email": "info@innovate.vc"}, {"Name": "Innovate Ventures", "Email": "deals@innovate.vc"}, True),
+    ({"Name": "Anya Sharma (Angel)", "Email": "anya@gmail.com"}, {"Name": "Anya Sharma", "Email": "anya.s@yahoo.com"}, True),
+]
+
+
+def make_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9))).capitalize()
+
+
+def make_investor(rng, idx):
+    name = f"{make_word(rng)} {make_word(rng)}"
+    if rng.random() < 0.3:  # An individual angel with a personal address
+        local = name.lower().replace(" ", ".")
+        return {"Name": f"{name} (Angel)", "Email": f"{local}{idx}@{rng.choice(FREEMAIL)}", "Website": ""}
+    slug = name.lower().replace(" ", "")
+    return {"Name": f"{name} {rng.choice(SUFFIXES)}", "Email": f"info@{slug}{idx}.com", "Website": f"www.{slug}{idx}.com"}
+
+
+def make_variant(rng, record):
+    variant = dict(record)
+    kind = rng.choice(["suffix", "abbreviation", "typo", "angel", "email", "website"])
+    if kind == "suffix":
+        variant["Name"] = record["Name"] + " LLC"
+    elif kind == "abbreviation":
+        words = record["Name"].split()
+        variant["Name"] = " ".join(words[:-1] + [words[-1][:3] + "."])
+    elif kind == "typo":
+        name = record["Name"]
+        cut = rng.randint(1, len(name.split()[0]) - 1)
+        variant["Name"] = name[:cut] + name[cut + 1:]
+    elif kind == "angel":
+        variant["Name"] = record["Name"].replace(" (Angel)", "") if "(Angel)" in record["Name"] else record["Name"] + " (Angel)"
+    elif kind == "email":
+        local, domain = record["Email"].split("@")
+        variant["Email"] = f"{local}.alt@{rng.choice(FREEMAIL)}" if domain in FREEMAIL else f"partners@{domain}"
+    else:
+        variant["Email"] = ""
+    return variant
+
+
+def generate(count, duplicate_rate, seed):
+    """Returns (DataFrame of rows in loader form, true cluster id per row)."""
+    rng = random.Random(seed)
+    rows, truth = [], []
+    for idx in range(count):
+        record = make_investor(rng, idx)
+        record.update({
+            "InvestmentStage": ", ".join(rng.sample(STAGES, 2)),
+            "FocusArea": ", ".join(rng.sample(FOCUS, 2)),
+            "Description": f"Invests in {rng.choice(FOCUS)} companies." if rng.random() < 0.8 else "",
+        })
+        copies = [record] + [make_variant(rng, record) for _ in range(rng.randint(1, 2) if rng.random() < duplicate_rate else 0)]
+        rows.extend(copies)
+        truth.extend([idx] * len(copies))
+    order = list(range(len(rows)))
+    rng.shuffle(order)
+    df = pd.DataFrame([rows[i] for i in order])
+    df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
+    return df.fillna(''), [truth[i] for i in order]
+
+
+def pair_count(groups):
+    return sum(len(g) * (len(g) - 1) // 2 for g in groups)
+
+
+def evaluate(truth, report, n):
+    """Pairwise precision and recall of the predicted clusters against the true ones."""
+    predicted = list(range(n))
+    for row in report["rows"]:
+        predicted[row["csv_line"] - 2] = row["investor_id"]
+    true_groups, predicted_groups, both = {}, {}, {}
+    for pos in range(n):
+        true_groups.setdefault(truth[pos], []).append(pos)
+        predicted_groups.setdefault(predicted[pos], []).append(pos)
+        both.setdefault((truth[pos], predicted[pos]), []).append(pos)
+    correct = pair_count(both.values())
+    predicted_pairs, true_pairs = pair_count(predicted_groups.values()), pair_count(true_groups.values())
+    return correct / predicted_pairs if predicted_pairs else 1.0, correct / true_pairs if true_pairs else 1.0
+
+
+def check_known_cases():
+    """Resolves each KNOWN_CASES pair on its own; returns the descriptions of the ones resolved wrongly."""
+    failures = []
+    for first, second, same in KNOWN_CASES:
+        df = pd.DataFrame([first, second])
+        df.columns = [col.strip().lower() for col in df.columns]
+        result, _ = resolve_investor_entities(df)
+        if (len(result) == 1) != same:
+            failures.append(f"{first['Name']!r} / {second['Name']!r} should {'' if same else 'not '}merge")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--investors", type=int, default=1_000_000, help="distinct investors before duplication")
+    parser.add_argument("--duplicate-rate", type=float, default=0.15, help="share of investors with 1-2 duplicate rows")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--check", action="store_true", help="only check the hand-written cases")
+    args = parser.parse_args()
+
+    failures = check_known_cases()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"{len(KNOWN_CASES)} known cases resolved correctly")
+    if args.check:
+        return
+
+    start = time.perf_counter()
+    df, truth = generate(args.investors, args.duplicate_rate, args.seed)
+    print(f"Generated {len(df)} rows for {args.investors} investors in {time.perf_counter() - start:.1f}s")
+
+    result, report = resolve_investor_entities(df)
+    precision, recall = evaluate(truth, report, len(df))
+    print(f"Resolved {report['input_rows']} rows -> {report['output_rows']} investors in {report['seconds']:.1f}s "
+          f"({report['input_rows'] / max(report['seconds'], 1e-9):,.0f} rows/s)")
+    print(f"{report['clusters']} clusters, {report['merged_rows']} rows merged, {report['comparisons']} name comparisons, "
+          f"{report['skipped_blocks']} oversized blocks skipped")
+    print(f"pairwise precision {precision:.4f}, recall {recall:.4f} ({len(set(truth))} true investors)")
+
+
+if __name__ == "__main__":
+    main()
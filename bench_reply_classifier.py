@@ -0,0 +1,129 @@
+"""
+Accuracy and throughput benchmark for the reply classifier.
+
+Usage: python bench_reply_classifier.py [--fixtures reply_fixtures.csv] [--bodies 20000] [--extra-phrases 500]
+
+The substring baseline runs one C-level scan per phrase, so it is quick for the handful of default
+phrases but grows linearly with the keyword sets; the compiled engine makes one pass per body
+regardless of how many phrases are configured. The last section shows that crossover.
+"""
+import argparse
+import csv
+import random
+import time
+
+from reply_classifier import ReplyClassifier, DEFAULT_KEYWORD_SETS
+
+LEGACY_POSITIVE = [
+    "interested", "yes", "connect", "schedule", "call", "meet",
+    "learn more", "love to", "happy to", "would like to", "open to"
+]
+LEGACY_NEGATIVE = [
+    "not interested", "no thanks", "not a fit", "pass", "decline",
+    "unfortunately", "unable to", "not right now", "no capacity"
+]
+
+FILLER = (
+    "Thanks for the note about the company and the market you are going after. "
+    "I read through the summary and shared it with the partnership. "
+)
+QUOTED_HISTORY = "\n\nOn Mon, Jun 3, 2024 at 10:00 AM Assistant <ai@example.com> wrote:\n" + \
+    "\n".join("> " + FILLER for _ in range(20))
+
+
+def legacy_label(body):
+    """The substring classifier check_for_replies used before the compiled engine."""
+    body_lower = body.lower()
+    is_positive = any(keyword in body_lower for keyword in LEGACY_POSITIVE)
+    is_negative = any(keyword in body_lower for keyword in LEGACY_NEGATIVE)
+    if is_positive and not is_negative:
+        return "positive"
+    if is_negative:
+        return "negative"
+    return "other"
+
+
+def load_fixtures(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["label"], row["body"]) for row in csv.DictReader(f)]
+
+
+def report_accuracy(name, fixtures, label_fn):
+    correct = 0
+    misses = []
+    for label, body in fixtures:
+        predicted = label_fn(body)
+        if predicted == label:
+            correct += 1
+        else:
+            misses.append((label, predicted, body.splitlines()[0][:70]))
+    print(f"{name}: {correct}/{len(fixtures)} correct ({100.0 * correct / len(fixtures):.1f}%)")
+    for label, predicted, first_line in misses:
+        print(f"    expected {label:<14} got {predicted:<14} | {first_line}")
+
+
+def report_throughput(name, bodies, label_fn):
+    start = time.perf_counter()
+    for body in bodies:
+        label_fn(body)
+    elapsed = time.perf_counter() - start
+    total_mb = sum(len(b) for b in bodies) / 1e6
+    print(f"{name}: {len(bodies) / elapsed:,.0f} bodies/sec, {total_mb / elapsed:,.1f} MB/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="reply_fixtures.csv")
+    parser.add_argument("--bodies", type=int, default=20000)
+    parser.add_argument("--extra-phrases", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    build_start = time.perf_counter()
+    classifier = ReplyClassifier(DEFAULT_KEYWORD_SETS)
+    print(f"Built automaton in {(time.perf_counter() - build_start) * 1000:.2f} ms")
+
+    def engine_label(body):
+        category, _ = classifier.classify(body)
+        return category or "other"
+
+    fixtures = load_fixtures(args.fixtures)
+    print(f"\n--- Accuracy on {len(fixtures)} labelled fixtures ---")
+    report_accuracy("compiled engine", fixtures, engine_label)
+    report_accuracy("legacy substring", fixtures, legacy_label)
+
+    rng = random.Random(args.seed)
+    bodies = []
+    for _ in range(args.bodies):
+        _, body = rng.choice(fixtures)
+        bodies.append(FILLER * rng.randint(1, 6) + body + QUOTED_HISTORY)
+    print(f"\n--- Throughput on {len(bodies)} synthetic replies with quoted history ---")
+    report_throughput("compiled engine", bodies, engine_label)
+    report_throughput("legacy substring", bodies, legacy_label)
+
+    # Larger, campaign-specific keyword sets: same bodies, many more phrases per category.
+    expanded = {category: list(phrases) for category, phrases in DEFAULT_KEYWORD_SETS.items()}
+    categories = list(expanded)
+    for idx in range(args.extra_phrases):
+        expanded[categories[idx % len(categories)]].append(f"campaign phrase {idx} marker")
+    expanded_classifier = ReplyClassifier(expanded)
+
+    def expanded_engine_label(body):
+        category, _ = expanded_classifier.classify(body)
+        return category or "other"
+
+    def expanded_substring_label(body):
+        body_lower = body.lower()
+        for category in expanded_classifier.priority:
+            if any(phrase in body_lower for phrase in expanded[category]):
+                return category
+        return "other"
+
+    total_phrases = sum(len(p) for p in expanded.values())
+    print(f"\n--- Throughput with {total_phrases} configured phrases ---")
+    report_throughput("compiled engine", bodies, expanded_engine_label)
+    report_throughput("substring scan", bodies, expanded_substring_label)
+
+
+if __name__ == "__main__":
+    main()
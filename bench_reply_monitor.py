@@ -0,0 +1,159 @@
+"""
+End-to-end benchmark for the reply monitor, replayed offline from a local corpus.
+
+Runs check_for_replies against a LocalMailbox (see mail_replay.py) and a scratch SQLite DB and
+reports messages/sec, time per stage (fetch + MIME decode, match, classify, DB update) and
+peak memory. Without --source a corpus is generated with generate_reply_corpus.py.
+
+Usage: python bench_reply_monitor.py [--messages 2000] [--attachment-kb 1024] [--mode sequential|pipeline|both]
+       python bench_reply_monitor.py --source replies.mbox --db email_tracking.db
+"""
+import argparse
+import contextlib
+import io
+import os
+import resource
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import database
+import monitor_replies
+from generate_reply_corpus import generate, seed_outreach
+from mail_replay import LocalMailbox
+from reply_classifier import get_default_classifier
+
+STAGES = ["fetch + decode", "match", "classify", "update"]
+
+
+class StageTimer:
+    """Wraps module-level functions so each call's wall time is charged to a stage."""
+
+    def __init__(self):
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self._restore = []
+
+    def wrap(self, owner, name, stage):
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - start
+
+        setattr(owner, name, timed)
+        self._restore.append((owner, name, original))
+
+    def restore(self):
+        for owner, name, original in reversed(self._restore):
+            setattr(owner, name, original)
+        self._restore = []
+
+
+def prepare_db(path, source_db, outreach):
+    if source_db:
+        shutil.copyfile(source_db, path)  # Never mutate the caller's DB
+    database.DB_NAME = path
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_db()
+        if not source_db:
+            seed_outreach(outreach)
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM mailbox_sync")
+    conn.commit()
+    conn.close()
+
+
+def status_counts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM outreach GROUP BY status").fetchall())
+    finally:
+        conn.close()
+
+
+def run_once(mode, source, fmt, db_path, source_db, outreach, trace_memory):
+    prepare_db(db_path, source_db, outreach)
+    mail = LocalMailbox(source, fmt)
+    timer = StageTimer()
+    classifier = get_default_classifier()
+    if mode == "sequential":
+        monitor_replies.PIPELINE_THRESHOLD = len(mail.messages) + 1
+        timer.wrap(monitor_replies, "fetch_headers", "fetch + decode")
+        timer.wrap(monitor_replies, "fetch_plain_text_bodies", "fetch + decode")
+        timer.wrap(monitor_replies, "route_replies", "match")
+        timer.wrap(classifier, "classify", "classify")
+        timer.wrap(monitor_replies, "apply_reply_updates", "update")
+    else:
+        monitor_replies.PIPELINE_THRESHOLD = 0
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            monitor_replies.check_for_replies(mail)
+    finally:
+        elapsed = time.perf_counter() - start
+        timer.restore()
+        if classifier.__dict__.get("classify"):
+            del classifier.classify
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    count = len(mail.messages)
+    client_seconds = elapsed - mail.server_seconds
+    print(f"\n--- {mode}: {count} messages ---")
+    print(f"total {elapsed:.2f}s ({count / elapsed:,.0f} msgs/sec); local server share {mail.server_seconds:.2f}s, "
+          f"monitor only {client_seconds:.2f}s ({count / max(client_seconds, 1e-9):,.0f} msgs/sec)")
+    if mode == "sequential":
+        # The stand-in's parsing happens inside the fetch calls; charge it to the server, not the client.
+        timer.seconds["fetch + decode"] -= mail.server_seconds
+        for stage in STAGES:
+            print(f"  {stage:<15} {timer.seconds[stage]:8.3f}s  {100 * timer.seconds[stage] / max(client_seconds, 1e-9):5.1f}%")
+    print(f"peak RSS {rss_after / 1024:.1f} MB (+{(rss_after - rss_before) / 1024:.1f} MB during run)"
+          + (f", peak traced Python heap {traced_peak / 1e6:.1f} MB" if traced_peak is not None else ""))
+    print(f"outreach statuses: {status_counts(db_path)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=None, help="existing mbox file or Maildir to replay")
+    parser.add_argument("--format", choices=["mbox", "maildir"], default=None)
+    parser.add_argument("--db", default=None, help="DB with the outreach the source replies to (copied, not modified)")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--investors", type=int, default=200)
+    parser.add_argument("--attachment-kb", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mode", choices=["sequential", "pipeline", "both"], default="both")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the tracemalloc peak (slower)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="reply-bench-")
+    try:
+        source, fmt, outreach = args.source, args.format, []
+        if source is None:
+            source, fmt = os.path.join(workdir, "corpus.mbox"), "mbox"
+            start = time.perf_counter()
+            outreach = generate(source, fmt, args.messages, args.investors, args.attachment_kb, args.seed)
+            print(f"Generated {args.messages} messages ({os.path.getsize(source) / 1e6:.1f} MB) "
+                  f"in {time.perf_counter() - start:.1f}s")
+        elif not args.db:
+            print("No --db given: no outreach is recorded, so every message will be untracked.")
+
+        modes = ["sequential", "pipeline"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            run_once(mode, source, fmt, os.path.join(workdir, f"{mode}.db"), args.db, outreach, args.trace_memory)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,4 +13,121 @@ MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
 MAIL_ENCRYPTION = os.getenv("MAIL_ENCRYPTION")
 MAIL_FROM_ADDRESS = os.getenv("MAIL_FROM_ADDRESS")
 MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME")
-ACCEPT_LINK_SECRET_KEY = os.getenv("ACCEPT_LINK_SECRET_KEY")
\ No newline at end of file
+ACCEPT_LINK_SECRET_KEY = os.getenv("ACCEPT_LINK_SECRET_KEY")
+DB_PATH = os.getenv("DB_PATH", "email_tracking.db")  # SQLite DB for outreach, founders and suppressions
+
+SESSION_POOL_MAX_SESSIONS = int(os.getenv("SESSION_POOL_MAX_SESSIONS", "100"))
+SESSION_IDLE_TIMEOUT_SECONDS = int(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "1800"))
+
+MEMORY_MODE = os.getenv("MEMORY_MODE", "budget").lower()  # 'budget' or 'buffer'
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "2000"))
+MEMORY_KEEP_TURNS = int(os.getenv("MEMORY_KEEP_TURNS", "4"))
+
+MONITOR_MODE = os.getenv("MONITOR_MODE", "idle").lower()  # 'idle', 'poll' or 'async'
+IMAP_IDLE_TIMEOUT_SECONDS = int(os.getenv("IMAP_IDLE_TIMEOUT_SECONDS", str(25 * 60)))
+
+REPLY_KEYWORDS_PATH = os.getenv("REPLY_KEYWORDS_PATH")  # Optional JSON {category: [phrases]}
+
+PIPELINE_THRESHOLD = int(os.getenv("PIPELINE_THRESHOLD", "200"))  # New messages per cycle before switching to the pipeline
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", str(os.cpu_count() or 2)))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+PIPELINE_WRITE_BATCH_SIZE = int(os.getenv("PIPELINE_WRITE_BATCH_SIZE", "200"))
+
+# Async multi-mailbox monitor. MONITOR_ACCOUNTS_PATH points to a JSON list of
+# {"host", "port", "username", "password", "folders": [...]}; without it the MAIL_* account is used.
+MONITOR_ACCOUNTS_PATH = os.getenv("MONITOR_ACCOUNTS_PATH")
+MONITOR_FOLDERS = [f.strip() for f in os.getenv("MONITOR_FOLDERS", "inbox").split(",") if f.strip()]
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_NORMALIZE = os.getenv("LLM_CACHE_NORMALIZE", "false").lower() in ("1", "true", "yes")  # Also match ignoring case/whitespace
+
+# Span metrics are always kept for /metrics. With TRACE_ENABLED every span (each SQLite statement, LLM and
+# tool call) is also appended to TRACE_PATH, which rolls over to TRACE_PATH.1 at TRACE_MAX_BYTES (0: no limit).
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACE_PATH = os.getenv("TRACE_PATH", "traces.jsonl")  # One JSON span per line
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Chat model behind the agent: 'vertex' (Gemini on Vertex AI), 'fake' (scripted, offline) or 'replay'
+# (answers from a transcript recorded with LLM_RECORD_PATH; unknown prompts fall back to the script).
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "vertex").lower()
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash-lite-001")
+LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH")  # Append every prompt/response pair here as JSONL
+LLM_REPLAY_PATH = os.getenv("LLM_REPLAY_PATH", "llm_transcript.jsonl")
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))  # 0 replays instantly
+LLM_FAKE_SCRIPT_PATH = os.getenv("LLM_FAKE_SCRIPT_PATH")  # Optional JSON [{"match": regex, "response": text}]
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+LLM_FAKE_JITTER_MS = float(os.getenv("LLM_FAKE_JITTER_MS", "0"))
+
+# Agent turns run on one shared asyncio loop (agent_loop.py). At most LLM_MAX_CONCURRENCY turns talk to
+# the model at once; the rest queue. Blocking work (search, SMTP, SQLite) runs on AGENT_TOOL_WORKERS threads.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+AGENT_TOOL_WORKERS = int(os.getenv("AGENT_TOOL_WORKERS", "32"))
+
+# /api/outreach: sends run on OUTREACH_WORKERS background threads. A (founder, investor) pair stuck in
+# 'queued'/'sending' longer than OUTREACH_CLAIM_TIMEOUT_SECONDS (e.g. after a crash) can be claimed again.
+OUTREACH_WORKERS = int(os.getenv("OUTREACH_WORKERS", "4"))
+OUTREACH_CLAIM_TIMEOUT_SECONDS = int(os.getenv("OUTREACH_CLAIM_TIMEOUT_SECONDS", "600"))
+OUTREACH_MAX_INVESTORS = int(os.getenv("OUTREACH_MAX_INVESTORS", "50"))  # Per request
+
+# JSON API bearer tokens (api_auth.py), "token:founder_id" pairs separated by commas; "token:*" may act for any
+# founder. Calls without a listed token get 401, so the API is closed until this is set.
+API_TOKENS = os.getenv("API_TOKENS", "")
+# Signed /?founder_link= tokens that bind a browser session to a founder (python api_auth.py <founder_id>).
+# Without FOUNDER_LINK_SECRET_KEY links are refused and sessions stay on the default founder.
+FOUNDER_LINK_SECRET_KEY = os.getenv("FOUNDER_LINK_SECRET_KEY")
+FOUNDER_LINK_TTL_DAYS = float(os.getenv("FOUNDER_LINK_TTL_DAYS", "7"))
+
+# Founder x investor affinity job (affinity.py): each founder's AFFINITY_TOP_N best investors are
+# precomputed. A run rescores only changed documents unless more than AFFINITY_REBUILD_FRACTION of them
+# changed, in which case the vocabulary is refitted and everything is rescored.
+AFFINITY_TOP_N = int(os.getenv("AFFINITY_TOP_N", "10"))
+AFFINITY_MAX_FEATURES = int(os.getenv("AFFINITY_MAX_FEATURES", "4096"))  # Vocabulary size cap
+AFFINITY_REBUILD_FRACTION = float(os.getenv("AFFINITY_REBUILD_FRACTION", "0.2"))
+AFFINITY_REFRESH_ON_START = os.getenv("AFFINITY_REFRESH_ON_START", "true").lower() in ("1", "true", "yes")
+
+# Investor entity resolution at load time (data_loader.resolve_investor_entities): duplicate rows for one
+# fund or person are merged into a canonical record, and each merge is listed in INVESTOR_MERGE_REPORT_PATH.
+INVESTOR_DEDUP_ENABLED = os.getenv("INVESTOR_DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+INVESTOR_DEDUP_NAME_THRESHOLD = float(os.getenv("INVESTOR_DEDUP_NAME_THRESHOLD", "0.85"))  # 0-1 name similarity to merge
+INVESTOR_DEDUP_MAX_BLOCK = int(os.getenv("INVESTOR_DEDUP_MAX_BLOCK", "200"))  # Larger candidate blocks are too generic; skipped
+INVESTOR_MERGE_REPORT_PATH = os.getenv("INVESTOR_MERGE_REPORT_PATH", "investor_merge_report.csv")
+
+# Recontact suppression (suppression.py), checked before every send. A send suppresses the same
+# founder -> investor pair for SUPPRESSION_COOLDOWN_DAYS; negative replies, unsubscribes and hard bounces
+# suppress until removed. The in-memory Bloom filter picks up other processes' writes every
+# SUPPRESSION_REFRESH_SECONDS.
+SUPPRESSION_ENABLED = os.getenv("SUPPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+SUPPRESSION_COOLDOWN_DAYS = float(os.getenv("SUPPRESSION_COOLDOWN_DAYS", "14"))
+SUPPRESSION_BLOOM_CAPACITY = int(os.getenv("SUPPRESSION_BLOOM_CAPACITY", "100000"))  # Doubles when exceeded
+SUPPRESSION_BLOOM_FP_RATE = float(os.getenv("SUPPRESSION_BLOOM_FP_RATE", "0.001"))
+SUPPRESSION_REFRESH_SECONDS = float(os.getenv("SUPPRESSION_REFRESH_SECONDS", "30"))
+
+# Outreach history API (outreach_history.py): keyset-paginated pages of at most HISTORY_MAX_PAGE_SIZE rows,
+# and CSV/NDJSON exports streamed in batches of HISTORY_EXPORT_BATCH_SIZE rows.
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "500"))
+HISTORY_EXPORT_BATCH_SIZE = int(os.getenv("HISTORY_EXPORT_BATCH_SIZE", "1000"))
+
+# Request profiling (profiling.py). A request is profiled when it sends "X-Profile: <PROFILE_TOKEN>" or when it is
+# picked at PROFILE_SAMPLE_RATE (0-1). Collapsed stacks are kept in PROFILE_DIR, newest PROFILE_KEEP, and listed at
+# /profiles for requests sending the same header. Without PROFILE_TOKEN the header and /profiles are disabled.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+
+# Logging (logging_setup.py). LOG_LEVEL applies to every module unless LOG_LEVELS overrides it ("tools=DEBUG,database=WARNING").
+# LOG_SAMPLE_RATES keeps only a fraction of a module's DEBUG/INFO records ("tools=0.1"); warnings and errors are never sampled.
+# Records pass through a bounded in-memory queue to a writer thread; when the queue is full, records are dropped and counted.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # 'text' or 'json' (one object per line)
+LOG_REDACT = os.getenv("LOG_REDACT", "true").lower() in ("1", "true", "yes")  # Mask emails, JWTs and secrets
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# main.py --batch: jobs run on BATCH_WORKERS threads; sends are SMTP-bound, so this can exceed the CPU count.
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
@@ -0,0 +1,192 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain.memory import ConversationBufferMemory
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, get_buffer_string
+from pydantic import PrivateAttr
+
+from config import MEMORY_MODE, MEMORY_TOKEN_BUDGET, MEMORY_KEEP_TURNS
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Summaries are cheap background work; a small shared pool keeps them off the request path.
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+GRID_LINE_RE = re.compile(r"^\s*\+[-=+]+\+\s*$")
+CHARS_PER_TOKEN = 4  # Rough average for English text
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a startup founder and an investor outreach assistant.
+Keep investor names that were shown, selected, or emailed, and any outcomes reported by tools. Stay under 120 words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~CHARS_PER_TOKEN characters per token); avoids a count_tokens round trip per turn."""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_row(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+def compact_tool_output(text: str) -> str:
+    """Replaces tabulate grid tables in a message with a one-line reference listing the row names."""
+    if not isinstance(text, str) or '+-' not in text:
+        return text
+    lines = text.splitlines()
+    out = []
+    i = 0
+    while i < len(lines):
+        if not GRID_LINE_RE.match(lines[i]):
+            out.append(lines[i])
+            i += 1
+            continue
+        table = []
+        while i < len(lines) and (GRID_LINE_RE.match(lines[i]) or lines[i].lstrip().startswith('|')):
+            table.append(lines[i])
+            i += 1
+        rows = [_split_row(l) for l in table if l.lstrip().startswith('|')]
+        if not rows:
+            continue
+        header, body = rows[0], rows[1:]
+        name_idx = header.index('name') if 'name' in header else min(1, len(header) - 1)
+        names = [row[name_idx] for row in body if len(row) > name_idx and row[name_idx]]
+        out.append(f"[search results table omitted: {len(names)} rows - {'; '.join(names)}]")
+    return "\n".join(out)
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """
+    Chat memory that keeps the prompt under a fixed token budget.
+    The last keep_turns turns stay verbatim; older tool tables are compacted to references, and
+    turns pushed out of the budget are folded into a running summary by a background LLM call.
+    With agent_loop set, that call waits for a model slot like an agent turn; the CLI has no loop
+    and one user, so it calls the model directly.
+    """
+
+    llm: Any = None
+    agent_loop: Any = None
+    memory_key: str = "chat_history"
+    return_messages: bool = True
+    max_token_limit: int = 2000
+    keep_turns: int = 4
+    summary: str = ""
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _pending: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _summarizing: bool = PrivateAttr(default=False)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _message_tokens(self, messages: List[BaseMessage]) -> int:
+        return sum(estimate_tokens(str(m.content)) for m in messages)
+
+    def _compact_old_messages(self):
+        messages = self.chat_memory.messages
+        verbatim_from = max(0, len(messages) - self.keep_turns * 2)
+        for idx in range(verbatim_from):
+            message = messages[idx]
+            if isinstance(message, AIMessage) and isinstance(message.content, str):
+                compacted = compact_tool_output(message.content)
+                if compacted != message.content:
+                    messages[idx] = AIMessage(content=compacted)
+
+    def _enforce_budget(self):
+        messages = self.chat_memory.messages
+        total = estimate_tokens(self.summary) + self._message_tokens(messages)
+        evicted = []
+        while total > self.max_token_limit and len(messages) > self.keep_turns * 2:
+            dropped = messages[:2]
+            del messages[:2]
+            evicted.extend(dropped)
+            total -= self._message_tokens(dropped)
+        if evicted:
+            self._pending.extend(evicted)
+            if not self._summarizing:
+                self._summarizing = True
+                _SUMMARY_EXECUTOR.submit(self._summarize_pending)
+
+    def _summarize_pending(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._summarizing = False
+                    return
+                batch, self._pending = self._pending, []
+                previous_summary = self.summary
+            new_lines = get_buffer_string(batch)
+            try:
+                if self.llm is None:
+                    raise ValueError("no summarization LLM configured")
+                prompt = SUMMARY_PROMPT.format(summary=previous_summary or "(none)", new_lines=new_lines)
+                if self.agent_loop is not None:
+                    response = self.agent_loop.run_sync(self._summarize_in_slot(prompt))
+                else:
+                    response = self.llm.invoke(prompt)
+                new_summary = getattr(response, "content", response)
+            except Exception as e:
+                logger.exception("Background memory summarization failed: %s", e)
+                # Keep a compact trace of what was dropped, newest last, within a quarter of the budget
+                # so the summary cannot crowd out the verbatim turns.
+                new_summary = (previous_summary + "\n" + compact_tool_output(new_lines)).strip()
+                new_summary = new_summary[-(self.max_token_limit * CHARS_PER_TOKEN // 4):]
+            with self._lock:
+                self.summary = str(new_summary).strip()
+
+    async def _summarize_in_slot(self, prompt: str) -> Any:
+        async with self.agent_loop.model_slot():
+            return await self.llm.ainvoke(prompt)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            messages = list(self.chat_memory.messages)
+            summary = self.summary
+        if summary:
+            messages = [SystemMessage(content=f"Summary of earlier conversation: {summary}")] + messages
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        with self._lock:
+            super().save_context(inputs, outputs)
+            self._compact_old_messages()
+            self._enforce_budget()
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self.summary = ""
+            self._pending = []
+
+
+def build_memory(llm: Optional[Any] = None, agent_loop: Optional[Any] = None) -> BaseChatMemory:
+    """
+    Returns the conversation memory selected by MEMORY_MODE ('budget' or 'buffer'). Pass the app's
+    agent_loop so background summaries share its model concurrency limit.
+    """
+    if MEMORY_MODE == "buffer":
+        return ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    return TokenBudgetMemory(
+        llm=llm,
+        agent_loop=agent_loop,
+        memory_key="chat_history",
+        return_messages=True,
+        max_token_limit=MEMORY_TOKEN_BUDGET,
+        keep_turns=MEMORY_KEEP_TURNS
+    )
@@ -1,11 +1,243 @@
 import pandas as pd
 import sqlite3
 import datetime
+import hashlib
 import os
+import re
+import csv
+import time
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from difflib import SequenceMatcher
+from config import INVESTOR_DEDUP_ENABLED, INVESTOR_DEDUP_NAME_THRESHOLD, INVESTOR_DEDUP_MAX_BLOCK, INVESTOR_MERGE_REPORT_PATH, DB_PATH
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
 
 INVESTOR_CSV_PATH = "investors.csv"
 INVESTOR_DF = None
 
+def investor_id(row):
+    """
+    Stable id for an investor row: a digest of the email, or of name and website when there is no
+    email, so the id survives reordering and re-exporting the CSV.
+    """
+    key = str(row.get('email', '')).strip().lower()
+    if not key:
+        key = f"{str(row.get('name', '')).strip().lower()}|{str(row.get('website', '')).strip().lower()}"
+    return "inv_" + hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+
+# Entity resolution. Merged exports list one fund under name variants ("Seedling Capital LLC",
+# "Seedling Cap.") and one person under several emails. Rows are only compared within blocks that
+# share a key: the exact email or website, a corporate email domain, or one of the name's two rarest
+# tokens. The work grows with block sizes, not n^2, and matches are joined with union-find.
+LEGAL_SUFFIXES = {"llc", "inc", "ltd", "lp", "llp", "plc", "gmbh", "corp", "co", "the"}
+GENERIC_NAME_TOKENS = {"capital", "cap", "ventures", "venture", "vc", "partners", "fund", "funds", "investments",
+                       "investors", "invest", "angels", "angel", "group", "holdings", "management", "collective",
+                       "equity", "and"}
+FREEMAIL_DOMAINS = {"gmail.com", "googlemail.com", "yahoo.com", "outlook.com", "hotmail.com", "live.com", "icloud.com",
+                    "me.com", "aol.com", "proton.me", "protonmail.com", "email.com", "mail.com", "gmx.com"}
+LIST_COLUMNS = ['investmentstage', 'focusarea', 'industry']
+PARENS_RE = re.compile(r"\([^)]*\)")
+NAME_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def name_tokens(name):
+    """Name words without parentheticals ("(Angel)") or legal suffixes: "The Nexus Fund, LLC" -> ("nexus", "fund")."""
+    text = PARENS_RE.sub(" ", str(name).lower()).replace("&", " and ")
+    return tuple(t for t in NAME_TOKEN_RE.findall(text) if t not in LEGAL_SUFFIXES)
+
+def name_similarity(a, b, threshold=INVESTOR_DEDUP_NAME_THRESHOLD, fuzzy=True):
+    """
+    0-1 similarity of two name_tokens tuples: the share of words matched, where a word matches an
+    equal word or, from three letters, an abbreviation of a firm word ("cap" ~ "capital"; never
+    "smith" ~ "smithers"). With fuzzy, near misses are rescored by character similarity so typos
+    ("Inovate") still match; leave it off when nothing but the names ties the two rows together.
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    unmatched = list(b)
+    matched = 0
+    for token in a:
+        for idx, other in enumerate(unmatched):
+            if token == other or _abbreviates(token, other) or _abbreviates(other, token):
+                matched += 1
+                del unmatched[idx]
+                break
+    score = matched / max(len(a), len(b))
+    if fuzzy and 0.5 <= score < threshold:
+        score = max(score, SequenceMatcher(None, " ".join(a), " ".join(b)).ratio())
+    return score
+
+def _abbreviates(short, word):
+    return word in GENERIC_NAME_TOKENS and len(short) >= 3 and word.startswith(short)
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]  # Path halving
+        i = parent[i]
+    return i
+
+def _merge_lists(values):
+    """Comma-separated values merged in order without repeats: "Seed, Series A" + "seed, Series B"."""
+    seen = {}
+    for value in values:
+        for item in str(value).split(','):
+            item = item.strip()
+            if item and item.lower() not in seen:
+                seen[item.lower()] = item
+    return ", ".join(seen.values())
+
+def _canonical_record(rows, columns):
+    """One record for a cluster (canonical row first): its values, gaps filled from the others, list columns merged."""
+    record = {}
+    for idx, col in enumerate(columns):
+        values = [row[idx] for row in rows if str(row[idx]).strip()]
+        if col in LIST_COLUMNS:
+            record[col] = _merge_lists(values)
+        else:
+            record[col] = values[0] if values else ''
+    emails = {}
+    if 'email' in columns:
+        for email in (record['email'], *(row[columns.index('email')] for row in rows)):
+            email = str(email).strip()
+            if email:
+                emails.setdefault(email.lower(), email)
+    record['alternate_emails'] = "; ".join(list(emails.values())[1:])  # The first is the record's own email
+    return record
+
+def resolve_investor_entities(df, threshold=INVESTOR_DEDUP_NAME_THRESHOLD, max_block=INVESTOR_DEDUP_MAX_BLOCK):
+    """
+    Merges rows that describe the same investor. Rows sharing an email, or a website, are the same
+    investor. Rows in a shared domain or name-token block merge when their names are at least
+    threshold similar and they do not point at different websites or corporate email domains.
+    Typo-tolerant name matching needs a shared corporate domain: two people on personal addresses
+    ("John Smith", "John Smithers") have only their names to tell them apart.
+    The canonical row of a cluster is its most complete one. Takes the normalized DataFrame and
+    returns (deduplicated DataFrame with an alternate_emails column, merge report dict).
+    """
+    start = time.perf_counter()
+    n = len(df)
+    columns = list(df.columns)
+    empty = pd.Series('', index=df.index)
+    emails = (df['email'] if 'email' in df.columns else empty).astype(str).str.strip().str.lower()
+    sites = ((df['website'] if 'website' in df.columns else empty).astype(str).str.strip().str.lower()
+             .str.replace(r"^[a-z]+://", "", regex=True).str.replace(r"^www\.", "", regex=True).str.rstrip("/"))
+    domains = emails.str.extract(r"@([^@\s]+)$", expand=False).fillna('')
+    domains = domains.where(~domains.isin(FREEMAIL_DOMAINS), '')
+    tokens = (df['name'] if 'name' in df.columns else empty).map(name_tokens).tolist()
+    token_freq = Counter(t for toks in tokens for t in set(toks))
+
+    # Candidate keys as one long frame; keys held by a single row are dropped before grouping.
+    key_parts = [
+        pd.DataFrame({'key': 'e:' + emails, 'pos': range(n)})[emails != ''],
+        pd.DataFrame({'key': 's:' + sites, 'pos': range(n)})[sites != ''],
+        pd.DataFrame({'key': 'd:' + domains, 'pos': range(n)})[domains != ''],
+    ]
+    rare = [sorted({t for t in toks if t not in GENERIC_NAME_TOKENS and len(t) > 1}, key=lambda t: (token_freq[t], t))[:2]
+            for toks in tokens]
+    key_parts.append(pd.DataFrame({'key': ['t:' + t for toks in rare for t in toks],
+                                   'pos': [pos for pos, toks in enumerate(rare) for _ in toks]}))
+    keys = pd.concat(key_parts, ignore_index=True)
+    keys = keys[keys['key'].duplicated(keep=False)].sort_values('key', kind='stable')
+    sites, domains = sites.tolist(), domains.tolist()
+
+    parent = list(range(n))
+    reasons = {}  # root -> set of reasons its cluster was merged for
+    comparisons = skipped_blocks = 0
+
+    def union(i, j, reason):
+        ri, rj = _find(parent, i), _find(parent, j)
+        if ri == rj:
+            return
+        parent[rj] = ri
+        reasons.setdefault(ri, set()).update(reasons.pop(rj, set()) | {reason})
+
+    for key, group in groupby(zip(keys['key'].tolist(), keys['pos'].tolist()), key=itemgetter(0)):
+        positions = [pos for _, pos in group]
+        kind = key[0]
+        if kind == 'e':
+            for pos in positions[1:]:
+                union(positions[0], pos, 'email')
+            continue
+        if len(positions) > max_block:
+            skipped_blocks += 1
+            continue
+        if kind == 's':
+            for pos in positions[1:]:
+                union(positions[0], pos, 'website')
+            continue
+        for idx, i in enumerate(positions):
+            for j in positions[idx + 1:]:
+                if _find(parent, i) == _find(parent, j):
+                    continue
+                if (sites[i] and sites[j] and sites[i] != sites[j]) or (domains[i] and domains[j] and domains[i] != domains[j]):
+                    continue  # Different websites or firms: different investors, however alike the names
+                comparisons += 1
+                fuzzy = bool(domains[i]) and domains[i] == domains[j]
+                if name_similarity(tokens[i], tokens[j], threshold, fuzzy) >= threshold:
+                    union(i, j, 'name')
+
+    roots = [_find(parent, i) for i in range(n)]
+    clusters = {}
+    for pos, root in enumerate(roots):
+        clusters.setdefault(root, []).append(pos)
+    clusters = [members for members in clusters.values() if len(members) > 1]
+
+    text = df[columns].astype(str).apply(lambda col: col.str.strip() != '')
+    completeness = text.sum(axis=1).to_numpy()
+    description_len = (df['description'].astype(str).str.len() if 'description' in df.columns else empty.str.len()).to_numpy()
+    values = df[columns].to_numpy(dtype=object)
+    field = {col: idx for idx, col in enumerate(columns)}
+    drop, merged_records, report_rows = set(), {}, []
+    for members in clusters:
+        canonical = max(members, key=lambda pos: (completeness[pos], description_len[pos], -pos))
+        ordered = [canonical] + [pos for pos in members if pos != canonical]
+        record = _canonical_record([values[pos] for pos in ordered], columns)
+        first = min(members)
+        merged_records[first] = record
+        drop.update(pos for pos in members if pos != first)
+        merged_id = investor_id(record)
+        why = "+".join(sorted(reasons.get(_find(parent, canonical), ())))
+        for pos in ordered:
+            report_rows.append({
+                'investor_id': merged_id,
+                'canonical_name': record.get('name', ''),
+                'role': 'canonical' if pos == canonical else 'merged',
+                'csv_line': pos + 2,  # 1-based, after the header
+                'name': values[pos][field['name']] if 'name' in field else '',
+                'email': values[pos][field['email']] if 'email' in field else '',
+                'website': values[pos][field['website']] if 'website' in field else '',
+                'reason': why,
+            })
+
+    # Each cluster's record takes the place of its first row, so the CSV order is kept.
+    result = df.reset_index(drop=True).assign(alternate_emails='')
+    if merged_records:
+        merged = pd.DataFrame.from_dict(merged_records, orient='index')[columns + ['alternate_emails']]
+        result.loc[merged.index, merged.columns] = merged
+        result = result.drop(index=list(drop)).reset_index(drop=True)
+    report = {
+        'input_rows': n,
+        'output_rows': len(result),
+        'clusters': len(clusters),
+        'merged_rows': sum(len(members) - 1 for members in clusters),
+        'comparisons': comparisons,
+        'skipped_blocks': skipped_blocks,
+        'seconds': round(time.perf_counter() - start, 3),
+        'rows': report_rows,
+    }
+    return result, report
+
+def write_merge_report(report, path=INVESTOR_MERGE_REPORT_PATH):
+    """Writes one CSV line per row that took part in a merge, grouped by the resulting investor."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['investor_id', 'canonical_name', 'role', 'csv_line', 'name', 'email', 'website', 'reason'])
+        writer.writeheader()
+        writer.writerows(report['rows'])
+
 def load_investors():
     """Loads the investor DataFrame."""
     global INVESTOR_DF
@@ -13,13 +245,21 @@ def load_investors():
         INVESTOR_DF = pd.read_csv(INVESTOR_CSV_PATH)
         INVESTOR_DF.columns = [col.strip().lower().replace(' ', '_') for col in INVESTOR_DF.columns]
         INVESTOR_DF = INVESTOR_DF.fillna('')
-        print(f"Successfully loaded {len(INVESTOR_DF)} investors from {INVESTOR_CSV_PATH}")
+        if INVESTOR_DEDUP_ENABLED:
+            INVESTOR_DF, report = resolve_investor_entities(INVESTOR_DF)
+            logger.info("Entity resolution: %d rows -> %d investors (%d duplicates in %d clusters, %ss)", report['input_rows'],
+                        report['output_rows'], report['merged_rows'], report['clusters'], report['seconds'])
+            if report['clusters'] and INVESTOR_MERGE_REPORT_PATH:
+                write_merge_report(report, INVESTOR_MERGE_REPORT_PATH)
+                logger.info("Merge report written to %s", INVESTOR_MERGE_REPORT_PATH)
+        INVESTOR_DF['investor_id'] = [investor_id(row) for row in INVESTOR_DF.to_dict('records')]
+        logger.info("Successfully loaded %s investors from %s", len(INVESTOR_DF), INVESTOR_CSV_PATH)
         return INVESTOR_DF
     except FileNotFoundError:
-        print(f"Error: Investor CSV file not found at {INVESTOR_CSV_PATH}")
+        logger.error("Investor CSV file not found at %s", INVESTOR_CSV_PATH)
         return None
     except Exception as e:
-        print(f"Error loading or processing investor CSV: {e}")
+        logger.error("Error loading or processing investor CSV: %s", e)
         return None
 
 def get_investor_dataframe():
@@ -30,14 +270,14 @@ def get_investor_dataframe():
 
 load_investors()
 
-DB_NAME = "email_tracking.db"
+DB_NAME = DB_PATH
 
 def init_db():
     """Initializes the database and creates the table if it doesn't exist."""
     if os.path.exists(DB_NAME):
-        print(f"Database {DB_NAME} already exists.")
+        logger.debug("Database %s already exists.", DB_NAME)
     else:
-        print(f"Creating database {DB_NAME}...")
+        logger.info("Creating database %s...", DB_NAME)
     conn = None 
     try:
         conn = sqlite3.connect(DB_NAME)
@@ -60,9 +300,9 @@ def init_db():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_investor_email ON outreach (investor_email)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON outreach (status)')
         conn.commit()
-        print("Database initialized.")
+        logger.debug("Database initialized.")
     except sqlite3.Error as e:
-        print(f"Database initialization error: {e}")
+        logger.error("Database initialization error: %s", e)
     finally:
         if conn:
             conn.close()
@@ -78,10 +318,10 @@ def add_sent_email_record(investor_email, investor_name, founder_email, founder_
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (investor_email, investor_name, founder_email, founder_name, startup_name, message_id, 'sent', datetime.datetime.now()))
         conn.commit()
-        print(f"DB: Recorded outreach to {investor_email}")
+        logger.info("Recorded outreach to %s", investor_email)
         return True
     except sqlite3.Error as e:
-        print(f"DB Error adding record for {investor_email}: {e}")
+        logger.error("Error adding record for %s: %s", investor_email, e)
         return False
     finally:
         if conn:
@@ -110,13 +350,13 @@ def update_outreach_status(investor_email, new_status, reply_time=None):
         updated_rows = cursor.rowcount
         conn.commit()
         if updated_rows > 0:
-            print(f"DB: Updated status for {investor_email} to {new_status}")
+            logger.info("Updated status for %s to %s", investor_email, new_status)
             return True
         else:
-            print(f"DB: No 'sent' record found or already updated for {investor_email} when trying to set status to {new_status}")
+            logger.info("No 'sent' record found or already updated for %s when trying to set status to %s", investor_email, new_status)
             return False
     except sqlite3.Error as e:
-        print(f"DB Error updating status for {investor_email}: {e}")
+        logger.error("Error updating status for %s: %s", investor_email, e)
         return False
     finally:
         if conn:
@@ -138,7 +378,7 @@ def get_details_by_investor_email(investor_email):
         row = cursor.fetchone()
         return dict(row) if row else None
     except sqlite3.Error as e:
-        print(f"DB Error fetching details for {investor_email}: {e}")
+        logger.error("Error fetching details for %s: %s", investor_email, e)
         return None
     finally:
         if conn:
@@ -1,16 +1,25 @@
 import sqlite3
 import datetime
+import csv
 import os
+from instrumentation import TracedConnection
+from config import SUPPRESSION_COOLDOWN_DAYS, DB_PATH
+from logging_setup import get_logger
 
-DB_NAME = "email_tracking.db"
+logger = get_logger(__name__)
+
+DB_NAME = DB_PATH
+FOUNDER_CSV_PATH = "founder.csv"
+# Reply statuses that stop recontact: a 'no' only for the founder it answered, an unsubscribe for everyone.
+SUPPRESSING_STATUSES = ('replied_negative', 'unsubscribed')
 
 def init_db():
     """Initializes the database and creates the table if it doesn't exist."""
     if os.path.exists(DB_NAME):
-        print(f"Database {DB_NAME} already exists.")
+        logger.debug("Database %s already exists.", DB_NAME)
     else:
-        print(f"Creating database {DB_NAME}...")
-    conn = sqlite3.connect(DB_NAME)
+        logger.info("Creating database %s...", DB_NAME)
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS outreach (
@@ -31,24 +40,233 @@ def init_db():
     ''')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_investor_email ON outreach (investor_email)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON outreach (status)')
+    # History API: per-founder pages in id order, and date-range filters.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_outreach_founder ON outreach (founder_email, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_outreach_sent ON outreach (sent_timestamp)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS founders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            founder_email TEXT NOT NULL UNIQUE,
+            founder_name TEXT,
+            startup_name TEXT,
+            startup_pitch TEXT,
+            created_timestamp DATETIME NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mailbox_sync (
+            mailbox_key TEXT PRIMARY KEY,
+            uidvalidity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL DEFAULT 0,
+            updated_timestamp DATETIME NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS outreach_requests (
+            founder_id INTEGER NOT NULL,
+            investor_id TEXT NOT NULL,
+            request_id TEXT NOT NULL,
+            status TEXT NOT NULL, -- 'queued', 'sending', 'sent', 'failed' or 'suppressed'
+            investor_email TEXT,
+            message_id TEXT,
+            detail TEXT,
+            created_timestamp DATETIME NOT NULL,
+            updated_timestamp DATETIME NOT NULL,
+            PRIMARY KEY (founder_id, investor_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_outreach_requests_request ON outreach_requests (request_id)')
+    # Written by the affinity job (affinity.py): each founder's top investors, plus the fingerprint of
+    # every document it scored and the fitted vocabulary, so a rerun only rescores what changed.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS investor_recommendations (
+            founder_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            investor_id TEXT NOT NULL,
+            score REAL NOT NULL,
+            computed_timestamp DATETIME NOT NULL,
+            PRIMARY KEY (founder_id, rank)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS affinity_documents (
+            kind TEXT NOT NULL, -- 'founder' or 'investor'
+            entity_id TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            PRIMARY KEY (kind, entity_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS affinity_model (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            model_json TEXT NOT NULL,
+            built_timestamp DATETIME NOT NULL
+        )
+    ''')
+    # Recontact suppressions (suppression.py). founder_email '' suppresses the investor for every founder.
+    # Rows with source 'outreach' are derived from the outreach table and rebuilt from it; others
+    # ('send' for hard bounces, 'manual') are kept across rebuilds.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS suppressions (
+            investor_email TEXT NOT NULL,
+            founder_email TEXT NOT NULL DEFAULT '',
+            reason TEXT NOT NULL, -- 'cooldown', 'replied_negative', 'unsubscribed', 'hard_bounce' or 'manual'
+            source TEXT NOT NULL,
+            expires_timestamp DATETIME, -- NULL: until removed
+            updated_timestamp DATETIME NOT NULL,
+            PRIMARY KEY (investor_email, founder_email)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_suppressions_updated ON suppressions (updated_timestamp)')
     conn.commit()
     conn.close()
-    print("Database initialized.")
+    import_founders_from_csv()
+    logger.debug("Database initialized.")
+
+def import_founders_from_csv(csv_path=FOUNDER_CSV_PATH):
+    """Upserts the founders listed in the founder CSV into the founders table."""
+    if not os.path.exists(csv_path):
+        logger.info("Founder CSV %s not found, skipping founder import.", csv_path)
+        return 0
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    cursor = conn.cursor()
+    imported = 0
+    try:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f, skipinitialspace=True):
+                founder_email = (row.get("founder_email") or "").strip().lower()
+                if not founder_email:
+                    continue
+                cursor.execute('''
+                    INSERT INTO founders (founder_email, founder_name, startup_name, startup_pitch, created_timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(founder_email) DO UPDATE SET
+                        founder_name = excluded.founder_name,
+                        startup_name = excluded.startup_name,
+                        startup_pitch = excluded.startup_pitch
+                ''', (founder_email, (row.get("founder_name") or "").strip(), (row.get("startup_name") or "").strip(),
+                      (row.get("startup_pitch") or "").strip(), datetime.datetime.now()))
+                imported += 1
+        conn.commit()
+        return imported
+    except (sqlite3.Error, csv.Error) as e:
+        logger.error("Error importing founders from %s: %s", csv_path, e)
+        return 0
+    finally:
+        conn.close()
+
+def get_founder(founder_id):
+    """Retrieves a founder profile by its id."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, founder_email, founder_name, startup_name, startup_pitch
+            FROM founders WHERE id = ?
+        ''', (founder_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error("Error fetching founder %s: %s", founder_id, e)
+        return None
+    finally:
+        conn.close()
+
+def get_founder_by_email(founder_email):
+    """Retrieves a founder profile by email address."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, founder_email, founder_name, startup_name, startup_pitch
+            FROM founders WHERE founder_email = ?
+        ''', (founder_email.strip().lower(),))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error("Error fetching founder %s: %s", founder_email, e)
+        return None
+    finally:
+        conn.close()
+
+def get_default_founder():
+    """Retrieves the first founder in the table, used when a session has not picked one."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, founder_email, founder_name, startup_name, startup_pitch
+            FROM founders ORDER BY id LIMIT 1
+        ''')
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error("Error fetching default founder: %s", e)
+        return None
+    finally:
+        conn.close()
+
+def get_all_founders():
+    """Retrieves every founder profile, ordered by id."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, founder_email, founder_name, startup_name, startup_pitch
+            FROM founders ORDER BY id
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error("Error fetching founders: %s", e)
+        return []
+    finally:
+        conn.close()
+
+def _record_cooldown(cursor, investor_email, founder_email):
+    """Suppresses the pair until the cooldown ends, without shortening a longer suppression already there."""
+    if SUPPRESSION_COOLDOWN_DAYS <= 0:
+        return
+    now = datetime.datetime.now()
+    cursor.execute('''
+        INSERT INTO suppressions (investor_email, founder_email, reason, source, expires_timestamp, updated_timestamp)
+        VALUES (?, ?, 'cooldown', 'outreach', ?, ?)
+        ON CONFLICT(investor_email, founder_email) DO UPDATE SET
+            expires_timestamp = excluded.expires_timestamp, updated_timestamp = excluded.updated_timestamp
+        WHERE suppressions.reason = 'cooldown'
+    ''', (str(investor_email).strip().lower(), str(founder_email).strip().lower(),
+          now + datetime.timedelta(days=SUPPRESSION_COOLDOWN_DAYS), now))
+
+def _record_reply_suppressions(cursor, updated_at):
+    """Suppresses the investors whose outreach rows this transaction moved to a SUPPRESSING_STATUSES status."""
+    placeholders = ",".join("?" * len(SUPPRESSING_STATUSES))
+    cursor.execute(f'''
+        INSERT INTO suppressions (investor_email, founder_email, reason, source, expires_timestamp, updated_timestamp)
+        SELECT lower(investor_email), CASE WHEN status = 'replied_negative' THEN lower(founder_email) ELSE '' END,
+               status, 'outreach', NULL, ?
+        FROM outreach WHERE status IN ({placeholders}) AND last_checked_timestamp = ?
+        ON CONFLICT(investor_email, founder_email) DO UPDATE SET
+            reason = excluded.reason, expires_timestamp = NULL, updated_timestamp = excluded.updated_timestamp
+    ''', (updated_at, *SUPPRESSING_STATUSES, updated_at))
 
 def add_sent_email_record(investor_email, investor_name, founder_email, founder_name, startup_name, message_id=None):
     """Adds a record for an email that was just sent."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
     cursor = conn.cursor()
     try:
         cursor.execute('''
             INSERT INTO outreach (investor_email, investor_name, founder_email, founder_name, startup_name, sent_message_id, status, sent_timestamp)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (investor_email, investor_name, founder_email, founder_name, startup_name, message_id, 'sent', datetime.datetime.now()))
+        _record_cooldown(cursor, investor_email, founder_email)
         conn.commit()
-        print(f"DB: Recorded outreach to {investor_email}")
+        logger.info("Recorded outreach to %s", investor_email)
         return True
     except sqlite3.Error as e:
-        print(f"DB Error adding record for {investor_email}: {e}")
+        logger.error("Error adding record for %s: %s", investor_email, e)
         return False
     finally:
         conn.close()
@@ -56,7 +274,7 @@ def add_sent_email_record(investor_email, investor_name, founder_email, founder_
 
 def update_investor_acceptance(investor_email: str) -> bool:
     """Updates the database when an investor clicks the acceptance link."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
     cursor = conn.cursor()
     try:
         now = datetime.datetime.now()
@@ -68,20 +286,20 @@ def update_investor_acceptance(investor_email: str) -> bool:
         updated_rows = cursor.rowcount
         conn.commit()
         if updated_rows > 0:
-            print(f"DB: Investor {investor_email} accepted the invitation.")
+            logger.info("Investor %s accepted the invitation.", investor_email)
             return True
         else:
-            print(f"DB: No matching 'sent' record found or already accepted for {investor_email}.")
+            logger.info("No matching 'sent' record found or already accepted for %s.", investor_email)
             return False
     except sqlite3.Error as e:
-        print(f"DB Error updating acceptance for {investor_email}: {e}")
+        logger.error("Error updating acceptance for %s: %s", investor_email, e)
         return False
     finally:
         conn.close()
 
 def update_outreach_status(investor_email, new_status, reply_time=None):
     """Updates the status and optionally the reply timestamp for an outreach attempt."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
     cursor = conn.cursor()
     now = datetime.datetime.now()
     try:
@@ -99,22 +317,499 @@ def update_outreach_status(investor_email, new_status, reply_time=None):
             ''', (new_status, now, investor_email))
 
         updated_rows = cursor.rowcount
+        if updated_rows and new_status in SUPPRESSING_STATUSES:
+            _record_reply_suppressions(cursor, now)
+        conn.commit()
+        if updated_rows > 0:
+            logger.info("Updated status for %s to %s", investor_email, new_status)
+            return True
+        else:
+            logger.info("No 'sent' record found or already updated for %s when trying to set status to %s", investor_email, new_status)
+            return False
+    except sqlite3.Error as e:
+        logger.error("Error updating status for %s: %s", investor_email, e)
+        return False
+    finally:
+        conn.close()
+
+def get_mailbox_checkpoint(mailbox_key):
+    """Returns (uidvalidity, last_uid) for a mailbox, or None if it has never been synced."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT uidvalidity, last_uid FROM mailbox_sync WHERE mailbox_key = ?', (mailbox_key,))
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+    except sqlite3.Error as e:
+        logger.error("Error reading sync checkpoint for %s: %s", mailbox_key, e)
+        return None
+    finally:
+        conn.close()
+
+def save_mailbox_checkpoint(mailbox_key, uidvalidity, last_uid):
+    """Records the highest UID processed for a mailbox under its current UIDVALIDITY."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO mailbox_sync (mailbox_key, uidvalidity, last_uid, updated_timestamp)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(mailbox_key) DO UPDATE SET
+                uidvalidity = excluded.uidvalidity,
+                last_uid = excluded.last_uid,
+                updated_timestamp = excluded.updated_timestamp
+        ''', (mailbox_key, uidvalidity, last_uid, datetime.datetime.now()))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logger.error("Error saving sync checkpoint for %s: %s", mailbox_key, e)
+        return False
+    finally:
+        conn.close()
+
+def get_tracked_investor_emails(investor_emails):
+    """Returns the subset of investor_emails that have an outreach row still in 'sent' status."""
+    emails = sorted(set(e for e in investor_emails if e))
+    if not emails:
+        return set()
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    cursor = conn.cursor()
+    tracked = set()
+    try:
+        for start in range(0, len(emails), 500):  # Stay under SQLite's bound-parameter limit
+            chunk = emails[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"SELECT DISTINCT investor_email FROM outreach WHERE status = 'sent' AND investor_email IN ({placeholders})", chunk)
+            tracked.update(row[0] for row in cursor.fetchall())
+        return tracked
+    except sqlite3.Error as e:
+        logger.error("Error looking up tracked investors: %s", e)
+        return set()
+    finally:
+        conn.close()
+
+def apply_reply_updates(updates):
+    """
+    Applies many (investor_email, new_status, reply_time, outreach_id) updates in one transaction.
+    Updates with an outreach_id (correlated by Message-ID) touch exactly that row; the rest fall
+    back to the investor's rows still in 'sent' status.
+    Returns the number of rows updated, or None if the transaction was rolled back.
+    """
+    if not updates:
+        return 0
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    cursor = conn.cursor()
+    now = datetime.datetime.now()
+    by_id = [(new_status, reply_time, now, outreach_id) for _, new_status, reply_time, outreach_id in updates if outreach_id is not None]
+    by_email = [(new_status, reply_time, now, investor_email) for investor_email, new_status, reply_time, outreach_id in updates if outreach_id is None]
+    try:
+        updated_rows = 0
+        if by_id:
+            cursor.executemany('''
+                UPDATE outreach
+                SET status = ?, reply_timestamp = ?, last_checked_timestamp = ?
+                WHERE id = ? AND status = 'sent'
+            ''', by_id)
+            updated_rows += cursor.rowcount
+        if by_email:
+            cursor.executemany('''
+                UPDATE outreach
+                SET status = ?, reply_timestamp = ?, last_checked_timestamp = ?
+                WHERE investor_email = ? AND status = 'sent'
+            ''', by_email)
+            updated_rows += cursor.rowcount
+        if updated_rows and any(update[1] in SUPPRESSING_STATUSES for update in updates):
+            _record_reply_suppressions(cursor, now)
+        conn.commit()
+        logger.info("Applied %s reply updates (%s rows changed)", len(updates), updated_rows)
+        return updated_rows
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error("Error applying %s reply updates: %s", len(updates), e)
+        return None
+    finally:
+        conn.close()
+
+def get_outreach_by_message_ids(message_ids):
+    """
+    Resolves Message-IDs (from In-Reply-To/References) against sent_message_id in one indexed
+    lookup. Returns {message_id: {'id', 'investor_email', 'founder_email', 'status'}}.
+    """
+    ids = sorted(set(m for m in message_ids if m))
+    if not ids:
+        return {}
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    found = {}
+    try:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f'''
+                SELECT id, sent_message_id, investor_email, founder_email, status
+                FROM outreach WHERE sent_message_id IN ({placeholders})
+            ''', chunk)
+            for row in cursor.fetchall():
+                found[row["sent_message_id"]] = dict(row)
+        return found
+    except sqlite3.Error as e:
+        logger.error("Error resolving message ids: %s", e)
+        return {}
+    finally:
+        conn.close()
+
+def update_outreach_status_by_id(outreach_id, new_status, reply_time=None):
+    """Updates a single outreach row identified by Message-ID correlation, if it is still 'sent'."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    cursor = conn.cursor()
+    now = datetime.datetime.now()
+    try:
+        cursor.execute('''
+            UPDATE outreach
+            SET status = ?, reply_timestamp = COALESCE(?, reply_timestamp), last_checked_timestamp = ?
+            WHERE id = ? AND status = 'sent'
+        ''', (new_status, reply_time, now, outreach_id))
+        updated_rows = cursor.rowcount
+        if updated_rows and new_status in SUPPRESSING_STATUSES:
+            _record_reply_suppressions(cursor, now)
         conn.commit()
         if updated_rows > 0:
-            print(f"DB: Updated status for {investor_email} to {new_status}")
+            logger.info("Updated status for outreach #%s to %s", outreach_id, new_status)
             return True
         else:
-            print(f"DB: No 'sent' record found or already updated for {investor_email} when trying to set status to {new_status}")
+            logger.info("Outreach #%s is not in 'sent' status; not setting %s", outreach_id, new_status)
             return False
     except sqlite3.Error as e:
-        print(f"DB Error updating status for {investor_email}: {e}")
+        logger.error("Error updating status for outreach #%s: %s", outreach_id, e)
+        return False
+    finally:
+        conn.close()
+
+def claim_outreach_request(founder_id, founder_email, investor_id, investor_email, request_id, stale_seconds):
+    """
+    Claims the (founder, investor) pair for one send, at most once. Returns (claimed, row).
+    A new pair, a 'failed' or 'suppressed' one, or one stuck in 'queued'/'sending' for over
+    stale_seconds is (re)claimed as 'queued' under request_id. A pair already sent, including by
+    the agent before the API existed, or in progress elsewhere is returned unclaimed with its row.
+    """
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection, timeout=10)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    now = datetime.datetime.now()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')  # Serializes concurrent claims across threads and processes
+        cursor.execute('SELECT * FROM outreach_requests WHERE founder_id = ? AND investor_id = ?', (founder_id, investor_id))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute('''
+                SELECT sent_message_id FROM outreach
+                WHERE investor_email = ? AND founder_email = ? AND status != 'error'
+                ORDER BY sent_timestamp DESC LIMIT 1
+            ''', (investor_email, founder_email))
+            earlier = cursor.fetchone()
+            status = 'sent' if earlier else 'queued'
+            cursor.execute('''
+                INSERT INTO outreach_requests (founder_id, investor_id, request_id, status, investor_email, message_id, detail, created_timestamp, updated_timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (founder_id, investor_id, request_id, status, investor_email, earlier[0] if earlier else None,
+                  'Sent before this request' if earlier else None, now, now))
+            claimed = not earlier
+        elif row['status'] in ('failed', 'suppressed') or (
+                row['status'] in ('queued', 'sending') and str(row['updated_timestamp']) < str(now - datetime.timedelta(seconds=stale_seconds))):
+            cursor.execute('''
+                UPDATE outreach_requests SET request_id = ?, status = 'queued', detail = NULL, updated_timestamp = ?
+                WHERE founder_id = ? AND investor_id = ?
+            ''', (request_id, now, founder_id, investor_id))
+            claimed = True
+        else:
+            claimed = False
+        cursor.execute('SELECT * FROM outreach_requests WHERE founder_id = ? AND investor_id = ?', (founder_id, investor_id))
+        row = dict(cursor.fetchone())
+        conn.commit()
+        return claimed, row
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error("Error claiming outreach %s/%s: %s", founder_id, investor_id, e)
+        raise
+    finally:
+        conn.close()
+
+def update_outreach_request(founder_id, investor_id, status, detail=None, message_id=None, from_status=None):
+    """Sets a pair's status; with from_status, only if it is still in that status. Returns True if a row changed."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection, timeout=10)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            UPDATE outreach_requests SET status = ?, detail = ?, message_id = COALESCE(?, message_id), updated_timestamp = ?
+            WHERE founder_id = ? AND investor_id = ? AND (? IS NULL OR status = ?)
+        ''', (status, detail, message_id, datetime.datetime.now(), founder_id, investor_id, from_status, from_status))
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error("Error updating outreach request %s/%s: %s", founder_id, investor_id, e)
+        return False
+    finally:
+        conn.close()
+
+def get_outreach_requests(request_id=None, status=None):
+    """Outreach API rows for one request id, or in one status (e.g. 'queued' to resume after a restart)."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        if request_id is not None:
+            cursor.execute('SELECT * FROM outreach_requests WHERE request_id = ? ORDER BY created_timestamp', (request_id,))
+        else:
+            cursor.execute('SELECT * FROM outreach_requests WHERE status = ? ORDER BY updated_timestamp', (status,))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error("Error fetching outreach requests: %s", e)
+        return []
+    finally:
+        conn.close()
+
+def get_affinity_state():
+    """
+    What the last affinity run left behind: (model JSON or None, {(kind, entity_id): fingerprint},
+    {founder_id: [{investor_id, score}] in rank order}).
+    """
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT model_json FROM affinity_model WHERE id = 1')
+        row = cursor.fetchone()
+        cursor.execute('SELECT kind, entity_id, fingerprint FROM affinity_documents')
+        fingerprints = {(r['kind'], r['entity_id']): r['fingerprint'] for r in cursor.fetchall()}
+        cursor.execute('SELECT founder_id, investor_id, score FROM investor_recommendations ORDER BY founder_id, rank')
+        recommendations = {}
+        for r in cursor.fetchall():
+            recommendations.setdefault(r['founder_id'], []).append({'investor_id': r['investor_id'], 'score': r['score']})
+        return (row['model_json'] if row else None), fingerprints, recommendations
+    except sqlite3.Error as e:
+        logger.error("Error fetching affinity state: %s", e)
+        return None, {}, {}
+    finally:
+        conn.close()
+
+def save_affinity_results(recommendations, fingerprints, removed_founder_ids=(), removed_documents=(), model_json=None, full=False):
+    """
+    Stores one affinity run in a single transaction. recommendations maps founder_id to its new
+    ranked [(investor_id, score)], replacing that founder's rows; fingerprints maps (kind, entity_id)
+    to the document fingerprint scored. full=True first clears everything from earlier runs.
+    """
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection, timeout=10)
+    cursor = conn.cursor()
+    now = datetime.datetime.now()
+    try:
+        if full:
+            cursor.execute('DELETE FROM investor_recommendations')
+            cursor.execute('DELETE FROM affinity_documents')
+        if model_json is not None:
+            cursor.execute('''
+                INSERT INTO affinity_model (id, model_json, built_timestamp) VALUES (1, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET model_json = excluded.model_json, built_timestamp = excluded.built_timestamp
+            ''', (model_json, now))
+        stale_founders = list(recommendations) + list(removed_founder_ids)
+        cursor.executemany('DELETE FROM investor_recommendations WHERE founder_id = ?', [(f,) for f in stale_founders])
+        cursor.executemany('''
+            INSERT INTO investor_recommendations (founder_id, rank, investor_id, score, computed_timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(founder_id, rank, investor_id, score, now)
+              for founder_id, ranked in recommendations.items()
+              for rank, (investor_id, score) in enumerate(ranked, start=1)])
+        cursor.executemany('DELETE FROM affinity_documents WHERE kind = ? AND entity_id = ?', list(removed_documents))
+        cursor.executemany('''
+            INSERT INTO affinity_documents (kind, entity_id, fingerprint) VALUES (?, ?, ?)
+            ON CONFLICT(kind, entity_id) DO UPDATE SET fingerprint = excluded.fingerprint
+        ''', [(kind, entity_id, fingerprint) for (kind, entity_id), fingerprint in fingerprints.items()])
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error("Error saving affinity results: %s", e)
         return False
     finally:
         conn.close()
 
+def get_recommendations(founder_id, limit=None):
+    """A founder's precomputed investor recommendations in rank order: [{investor_id, score, rank, computed_timestamp}]."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT investor_id, score, rank, computed_timestamp FROM investor_recommendations
+            WHERE founder_id = ? ORDER BY rank LIMIT ?
+        ''', (founder_id, -1 if limit is None else int(limit)))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error("Error fetching recommendations for founder %s: %s", founder_id, e)
+        return []
+    finally:
+        conn.close()
+
+def add_suppression(investor_email, founder_email='', reason='manual', source='manual', expires=None):
+    """Suppresses the investor for founder_email, or for every founder when it is ''. Returns True on success."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection, timeout=10)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO suppressions (investor_email, founder_email, reason, source, expires_timestamp, updated_timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(investor_email, founder_email) DO UPDATE SET
+                reason = excluded.reason, source = excluded.source,
+                expires_timestamp = excluded.expires_timestamp, updated_timestamp = excluded.updated_timestamp
+        ''', (str(investor_email).strip().lower(), str(founder_email or '').strip().lower(), reason, source,
+              expires, datetime.datetime.now()))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        logger.error("Error suppressing %s: %s", investor_email, e)
+        return False
+    finally:
+        conn.close()
+
+def remove_suppression(investor_email, founder_email=''):
+    """Lifts a suppression. Derived ones come back on the next rebuild while their outreach row still implies them."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection, timeout=10)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM suppressions WHERE investor_email = ? AND founder_email = ?',
+                       (str(investor_email).strip().lower(), str(founder_email or '').strip().lower()))
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error("Error lifting suppression for %s: %s", investor_email, e)
+        return False
+    finally:
+        conn.close()
+
+def rebuild_outreach_suppressions():
+    """
+    Re-derives the 'outreach' suppressions from the outreach table in one transaction: negative
+    replies and unsubscribes, plus a cooldown for every pair sent to within SUPPRESSION_COOLDOWN_DAYS.
+    Suppressions from other sources win over derived ones. Returns the number of derived rows, or None.
+    """
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection, timeout=10)
+    cursor = conn.cursor()
+    now = datetime.datetime.now()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute("DELETE FROM suppressions WHERE source = 'outreach'")
+        placeholders = ",".join("?" * len(SUPPRESSING_STATUSES))
+        cursor.execute(f'''
+            INSERT INTO suppressions (investor_email, founder_email, reason, source, expires_timestamp, updated_timestamp)
+            SELECT lower(investor_email), CASE WHEN status = 'replied_negative' THEN lower(founder_email) ELSE '' END,
+                   MIN(status), 'outreach', NULL, ?
+            FROM outreach WHERE status IN ({placeholders})
+            GROUP BY 1, 2
+            ON CONFLICT(investor_email, founder_email) DO NOTHING
+        ''', (now, *SUPPRESSING_STATUSES))
+        derived = cursor.rowcount
+        if SUPPRESSION_COOLDOWN_DAYS > 0:
+            cooldown = datetime.timedelta(days=SUPPRESSION_COOLDOWN_DAYS)
+            cursor.execute('''
+                SELECT lower(investor_email), lower(founder_email), MAX(sent_timestamp) FROM outreach
+                WHERE sent_timestamp >= ? AND status NOT IN ('error', 'pending')
+                GROUP BY 1, 2
+            ''', (now - cooldown,))
+            rows = [(investor_email, founder_email, datetime.datetime.fromisoformat(str(sent)) + cooldown, now)
+                    for investor_email, founder_email, sent in cursor.fetchall()]
+            cursor.executemany('''
+                INSERT INTO suppressions (investor_email, founder_email, reason, source, expires_timestamp, updated_timestamp)
+                VALUES (?, ?, 'cooldown', 'outreach', ?, ?)
+                ON CONFLICT(investor_email, founder_email) DO NOTHING
+            ''', rows)
+            derived += cursor.rowcount
+        conn.commit()
+        return derived
+    except (sqlite3.Error, ValueError) as e:
+        conn.rollback()
+        logger.error("Error rebuilding suppressions: %s", e)
+        return None
+    finally:
+        conn.close()
+
+def get_suppression_keys(updated_since=None):
+    """(investor_email, founder_email, updated_timestamp) of every suppression, or of those written after updated_since."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    cursor = conn.cursor()
+    try:
+        if updated_since is None:
+            cursor.execute('SELECT investor_email, founder_email, updated_timestamp FROM suppressions')
+        else:
+            cursor.execute('SELECT investor_email, founder_email, updated_timestamp FROM suppressions WHERE updated_timestamp > ?',
+                           (updated_since,))
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error("Error reading suppressions: %s", e)
+        return []
+    finally:
+        conn.close()
+
+def get_active_suppression(investor_email, founder_email):
+    """The suppression in force for the pair, the investor-wide one first: {reason, founder_email, expires_timestamp} or None."""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT reason, founder_email, expires_timestamp FROM suppressions
+            WHERE investor_email = ? AND founder_email IN ('', ?) AND (expires_timestamp IS NULL OR expires_timestamp > ?)
+            ORDER BY founder_email LIMIT 1
+        ''', (str(investor_email).strip().lower(), str(founder_email or '').strip().lower(), datetime.datetime.now()))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error("Error checking suppression for %s: %s", investor_email, e)
+        return None
+    finally:
+        conn.close()
+
+OUTREACH_HISTORY_COLUMNS = ['id', 'investor_email', 'investor_name', 'founder_email', 'founder_name', 'startup_name',
+                            'sent_message_id', 'status', 'sent_timestamp', 'reply_timestamp', 'last_checked_timestamp',
+                            'investor_accepted', 'accepted_timestamp']
+
+def get_outreach_history(founder_email=None, statuses=None, sent_from=None, sent_to=None, after_id=None, limit=100, descending=True):
+    """
+    One page of outreach rows in id order, newest first unless descending=False. Keyset pagination:
+    pass the last row's id as after_id for the next page, so every page is an index seek however
+    deep it is. sent_from is inclusive and sent_to exclusive. Returns a list of dicts; raises sqlite3.Error.
+    """
+    clauses, params = [], []
+    if founder_email:
+        clauses.append('founder_email = ?')
+        params.append(founder_email)
+    if statuses:
+        clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if sent_from is not None:
+        clauses.append('sent_timestamp >= ?')
+        params.append(sent_from)
+    if sent_to is not None:
+        clauses.append('sent_timestamp < ?')
+        params.append(sent_to)
+    if after_id is not None:
+        clauses.append('id < ?' if descending else 'id > ?')
+        params.append(after_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+            SELECT {', '.join(OUTREACH_HISTORY_COLUMNS)} FROM outreach {where}
+            ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?
+        ''', (*params, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
 def get_details_by_investor_email(investor_email):
     """Retrieves details needed for CC email, looking for status='sent'."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     try:
@@ -127,7 +822,7 @@ def get_details_by_investor_email(investor_email):
         row = cursor.fetchone()
         return dict(row) if row else None
     except sqlite3.Error as e:
-        print(f"DB Error fetching details for {investor_email}: {e}")
+        logger.error("Error fetching details for %s: %s", investor_email, e)
         return None
     finally:
         conn.close()
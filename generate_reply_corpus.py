@@ -0,0 +1,151 @@
+"""
+Generates a synthetic reply corpus for replaying through the reply monitor.
+
+The corpus mixes tracked investor replies (correlated by In-Reply-To, forwarded by an
+assistant, or matched by sender only) with untracked mail, across plain and multipart
+messages, several charsets, quoted-printable/base64/8bit bodies and large attachments.
+
+Usage: python generate_reply_corpus.py OUT [--format mbox|maildir] [--messages 2000] [--seed-db email_tracking.db]
+"""
+import argparse
+import csv
+import email.utils
+import mailbox
+import os
+import random
+from email.message import EmailMessage
+
+FOUNDER_EMAIL = "founder@startup.example"
+GREETINGS = {
+    "utf-8": "Thanks — appreciate the note. ",
+    "iso-8859-1": "Merci, très intéressant. ",
+    "windows-1252": "Thanks – we’ve reviewed it. ",
+    "koi8-r": "Спасибо за письмо. ",
+    "shift_jis": "ご連絡ありがとうございます。 ",
+}
+ENCODINGS = ["quoted-printable", "base64", "8bit"]
+UNTRACKED_SENDERS = [
+    "newsletter@vcweekly.example", "noreply@calendar.example", "alerts@bank.example",
+    "hello@saas-tool.example", "events@conference.example"
+]
+UNTRACKED_BODIES = [
+    "This week in venture: three funds closed and two partners moved firms.",
+    "You have a new calendar invitation. Please respond yes or no.",
+    "Your monthly statement is ready to view.",
+    "Join us for a free webinar on scaling your sales team.",
+]
+QUOTED_HISTORY = (
+    "\n\nOn Mon, Jun 3, 2024 at 10:00 AM Founder <founder@startup.example> wrote:\n"
+    "> Hi, I'm reaching out about our seed round.\n> Would you be open to a call?\n"
+)
+
+
+def investor(idx):
+    return f"partner{idx}@fund{idx % 37}.example", f"Partner {idx}", f"<outreach-{idx}@startup.example>"
+
+
+def load_reply_bodies(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["body"] for row in csv.DictReader(f)]
+
+
+def _set_text(msg, text, rng, subtype="plain"):
+    charset = rng.choice(list(GREETINGS))
+    body = GREETINGS[charset] + text
+    msg.set_content(body.encode(charset, errors="replace").decode(charset), subtype=subtype,
+                    charset=charset, cte=rng.choice(ENCODINGS))
+
+
+def build_message(rng, idx, sender, subject, text, in_reply_to=None, references=None,
+                  attachment_bytes=0, html=False):
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = FOUNDER_EMAIL
+    msg["Subject"] = subject
+    msg["Date"] = email.utils.formatdate(1717400000 + idx * 60)
+    msg["Message-ID"] = f"<reply-{idx}@corpus.example>"
+    if in_reply_to:
+        msg["In-Reply-To"] = in_reply_to
+    if references:
+        msg["References"] = references
+    _set_text(msg, text, rng)
+    if html:
+        msg.add_alternative(f"<html><body><p>{text}</p></body></html>", subtype="html")
+    if attachment_bytes:
+        msg.add_attachment(rng.randbytes(attachment_bytes), maintype="application", subtype="pdf",
+                           filename=f"deck-{idx}.pdf")
+    return msg
+
+
+def generate(out, fmt="mbox", messages=2000, investors=200, attachment_kb=1024, seed=7,
+             fixtures="reply_fixtures.csv"):
+    """Writes the corpus and returns the (investor_email, investor_name, message_id) outreach it answers."""
+    rng = random.Random(seed)
+    replies = load_reply_bodies(fixtures)
+    outreach = [investor(i) for i in range(investors)]
+    box = mailbox.Maildir(out, create=True) if fmt == "maildir" else mailbox.mbox(out, create=True)
+    box.lock()
+    try:
+        for idx in range(messages):
+            roll = rng.random()
+            attachment = attachment_kb * 1024 if rng.random() < 0.05 else 0
+            html = rng.random() < 0.4
+            if roll < 0.35:
+                email_addr, name, message_id = rng.choice(outreach)
+                text = rng.choice(replies) + QUOTED_HISTORY
+                msg = build_message(rng, idx, f"{name} <{email_addr}>", "Re: Seed round", text,
+                                    in_reply_to=message_id, references=message_id,
+                                    attachment_bytes=attachment, html=html)
+            elif roll < 0.45:
+                email_addr, name, message_id = rng.choice(outreach)
+                assistant = f"assistant@{email_addr.split('@')[1]}"
+                msg = build_message(rng, idx, f"Assistant <{assistant}>", "Fwd: Re: Seed round",
+                                    rng.choice(replies), references=f"<thread-{idx}@fund.example> {message_id}",
+                                    attachment_bytes=attachment, html=html)
+            elif roll < 0.55:
+                email_addr, name, _ = rng.choice(outreach)
+                msg = build_message(rng, idx, email_addr, "Quick question", rng.choice(replies),
+                                    attachment_bytes=attachment, html=html)
+            else:
+                msg = build_message(rng, idx, rng.choice(UNTRACKED_SENDERS), "Update",
+                                    rng.choice(UNTRACKED_BODIES), attachment_bytes=attachment, html=html)
+            box.add(msg.as_bytes())
+        box.flush()
+    finally:
+        box.unlock()
+        box.close()
+    return outreach
+
+
+def seed_outreach(outreach):
+    """Records the outreach the corpus replies to, as if the emails had just been sent."""
+    from database import add_sent_email_record
+    for email_addr, name, message_id in outreach:
+        add_sent_email_record(email_addr, name, FOUNDER_EMAIL, "Founder", "Startup", message_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", help="mbox file or Maildir directory to create")
+    parser.add_argument("--format", choices=["mbox", "maildir"], default="mbox")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--investors", type=int, default=200)
+    parser.add_argument("--attachment-kb", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--seed-db", default=None, help="also record the matching outreach in this SQLite DB")
+    args = parser.parse_args()
+
+    if os.path.exists(args.out):
+        parser.error(f"{args.out} already exists")
+    outreach = generate(args.out, args.format, args.messages, args.investors, args.attachment_kb, args.seed)
+    print(f"Wrote {args.messages} messages to {args.out} ({args.format}).")
+    if args.seed_db:
+        import database
+        database.DB_NAME = args.seed_db
+        database.init_db()
+        seed_outreach(outreach)
+        print(f"Recorded {len(outreach)} outreach rows in {args.seed_db}.")
+
+
+if __name__ == "__main__":
+    main()
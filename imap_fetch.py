@@ -0,0 +1,271 @@
+import base64
+import quopri
+import re
+
+HEADER_FIELDS = "FROM SUBJECT IN-REPLY-TO REFERENCES"
+MAX_BODY_BYTES = 65536  # Replies are short; cap the text part so a huge paste never blows up a cycle
+
+LITERAL_SUFFIX_RE = re.compile(rb"\{(\d+)\}\s*$")
+
+
+class _Paren:
+    def __init__(self, kind):
+        self.kind = kind
+
+
+LPAREN = _Paren("(")
+RPAREN = _Paren(")")
+
+
+def compress_uid_set(uids):
+    """Turns [1, 2, 3, 7, 9, 10] into '1:3,7,9:10' for a single UID FETCH/STORE command."""
+    uids = sorted(set(int(u) for u in uids))
+    ranges = []
+    start = prev = None
+    for uid in uids:
+        if start is None:
+            start = prev = uid
+        elif uid == prev + 1:
+            prev = uid
+        else:
+            ranges.append(f"{start}:{prev}" if start != prev else str(start))
+            start = prev = uid
+    if start is not None:
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(ranges)
+
+
+def _tokenize_text(text):
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i:i + 1]
+        if c in b" \t\r\n":
+            i += 1
+        elif c == b"(":
+            yield LPAREN
+            i += 1
+        elif c == b")":
+            yield RPAREN
+            i += 1
+        elif c == b'"':
+            i += 1
+            out = bytearray()
+            while i < n and text[i:i + 1] != b'"':
+                if text[i:i + 1] == b"\\" and i + 1 < n:
+                    i += 1
+                out += text[i:i + 1]
+                i += 1
+            i += 1
+            yield out.decode("utf-8", errors="replace")
+        else:
+            start = i
+            depth = 0
+            while i < n:
+                c = text[i:i + 1]
+                if c == b"[":
+                    depth += 1
+                elif c == b"]":
+                    depth -= 1
+                elif depth == 0 and c in b" ()\r\n":
+                    break
+                i += 1
+            atom = text[start:i].decode("utf-8", errors="replace")
+            yield None if atom.upper() == "NIL" else atom
+
+
+def _tokenize(pieces):
+    """Tokenizes imaplib response data, where literals arrive as (prefix_with_{n}, literal_bytes) tuples."""
+    for piece in pieces:
+        if isinstance(piece, tuple):
+            head, literal = piece[0], piece[1]
+            yield from _tokenize_text(LITERAL_SUFFIX_RE.sub(b"", head))
+            yield bytes(literal)
+        elif isinstance(piece, (bytes, bytearray)):
+            yield from _tokenize_text(bytes(piece))
+
+
+def _parse_list(tokens):
+    items = []
+    for token in tokens:
+        if token is LPAREN:
+            items.append(_parse_list(tokens))
+        elif token is RPAREN:
+            return items
+        else:
+            items.append(token)
+    return items
+
+
+def parse_fetch_response(data):
+    """
+    Parses the data list returned by imaplib's uid('FETCH', ...) into {uid: {ITEM: value}}.
+    Item names are upper-cased; section items keep their section, e.g. 'BODY[1]<0>'.
+    Untagged responses without a UID (unsolicited FLAGS updates) are skipped.
+    """
+    results = {}
+    tokens = iter(list(_tokenize(data or [])))
+    for token in tokens:
+        if token is LPAREN:
+            items = _parse_list(tokens)
+            fields = {}
+            for idx in range(0, len(items) - 1, 2):
+                key = items[idx]
+                if isinstance(key, str):
+                    fields[key.upper()] = items[idx + 1]
+            uid = fields.get("UID")
+            if uid is not None and str(uid).isdigit():
+                results[int(uid)] = fields
+    return results
+
+
+def get_section(fields, prefix):
+    """Returns the value of the first fetched item whose name starts with prefix (e.g. 'BODY[HEADER')."""
+    for key, value in fields.items():
+        if key.startswith(prefix):
+            return value
+    return None
+
+
+def _params_to_dict(params):
+    if not isinstance(params, list):
+        return {}
+    return {str(params[i]).lower(): params[i + 1] for i in range(0, len(params) - 1, 2)}
+
+
+def _is_attachment(part):
+    # Disposition is extension data: index 9 for text/* parts (after lines and md5).
+    disposition = part[9] if len(part) > 9 else None
+    return isinstance(disposition, list) and disposition and str(disposition[0]).lower() == "attachment"
+
+
+def find_text_plain_part(structure, prefix=""):
+    """
+    Walks a parsed BODYSTRUCTURE and returns (section, encoding, charset) for the first
+    text/plain part that is not an attachment, or None. Forwarded message/rfc822 parts are not
+    descended into; the reply text lives in the outer message.
+    """
+    if not isinstance(structure, list) or not structure:
+        return None
+    if isinstance(structure[0], list):
+        for idx, child in enumerate(c for c in structure if isinstance(c, list)):
+            section = f"{prefix}.{idx + 1}" if prefix else str(idx + 1)
+            found = find_text_plain_part(child, section)
+            if found:
+                return found
+        return None
+    if len(structure) < 7:
+        return None
+    main_type = str(structure[0]).lower()
+    sub_type = str(structure[1]).lower()
+    if main_type != "text" or sub_type != "plain" or _is_attachment(structure):
+        return None
+    charset = _params_to_dict(structure[2]).get("charset") or "utf-8"
+    encoding = str(structure[5] or "7bit").lower()
+    return (prefix or "1", encoding, charset)
+
+
+def decode_part(payload, encoding, charset):
+    """Decodes a fetched body part given the transfer encoding and charset from BODYSTRUCTURE."""
+    if payload is None:
+        return None
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8", errors="replace")
+    if encoding == "base64":
+        compact = re.sub(rb"\s+", b"", payload)
+        compact = compact[: len(compact) - len(compact) % 4]  # Partial fetches can cut a quantum
+        try:
+            payload = base64.b64decode(compact)
+        except (ValueError, TypeError):
+            return None
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+HEADER_FETCH_ITEMS = f"(UID BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])"
+BODYSTRUCTURE_FETCH_ITEMS = "(UID BODYSTRUCTURE)"
+
+
+def section_fetch_items(section):
+    return f"(UID BODY.PEEK[{section}]<0.{MAX_BODY_BYTES}>)"
+
+
+def headers_from_response(data):
+    """Extracts {uid: header_bytes} from a HEADER_FETCH_ITEMS response."""
+    headers = {}
+    for uid, fields in parse_fetch_response(data).items():
+        value = get_section(fields, "BODY[HEADER")
+        if isinstance(value, (bytes, str)):
+            headers[uid] = value if isinstance(value, bytes) else value.encode()
+    return headers
+
+
+def text_sections_from_response(data):
+    """Groups uids of a BODYSTRUCTURE response by text/plain section: {section: [(uid, encoding, charset)]}."""
+    by_section = {}
+    for uid, fields in parse_fetch_response(data).items():
+        found = find_text_plain_part(fields.get("BODYSTRUCTURE"))
+        if found:
+            by_section.setdefault(found[0], []).append((uid, found[1], found[2]))
+    return by_section
+
+
+def parts_from_section_response(data, entries, parts):
+    """Fills parts[uid] = (payload, encoding, charset) from a section_fetch_items response."""
+    parsed = parse_fetch_response(data)
+    for uid, encoding, charset in entries:
+        payload = get_section(parsed.get(uid, {}), "BODY[")
+        if payload is not None:
+            parts[uid] = (payload, encoding, charset)
+
+
+def fetch_headers(mail, uids):
+    """
+    Phase one: a single UID FETCH of just the routing headers for every uid.
+    Returns {uid: header_bytes}, or None if the server rejected the fetch.
+    """
+    if not uids:
+        return {}
+    status, data = mail.uid("FETCH", compress_uid_set(uids), HEADER_FETCH_ITEMS)
+    if status != "OK":
+        print(f"Error fetching headers: {data}")
+        return None
+    return headers_from_response(data)
+
+
+def fetch_plain_text_parts(mail, uids):
+    """
+    Phase two: one BODYSTRUCTURE fetch, then one partial body fetch per distinct text/plain
+    section (usually just '1' or '1.1'), all batched across uids.
+    Returns {uid: (payload, encoding, charset) or None} with payloads still transfer-encoded,
+    or None if any fetch was rejected.
+    """
+    parts = {uid: None for uid in uids}
+    if not uids:
+        return parts
+    status, data = mail.uid("FETCH", compress_uid_set(uids), BODYSTRUCTURE_FETCH_ITEMS)
+    if status != "OK":
+        print(f"Error fetching body structure: {data}")
+        return None
+
+    for section, entries in text_sections_from_response(data).items():
+        status, data = mail.uid(
+            "FETCH", compress_uid_set(uid for uid, _, _ in entries), section_fetch_items(section)
+        )
+        if status != "OK":
+            print(f"Error fetching body section {section}: {data}")
+            return None
+        parts_from_section_response(data, entries, parts)
+    return parts
+
+
+def fetch_plain_text_bodies(mail, uids):
+    """Like fetch_plain_text_parts, but decoded: {uid: text or None}, or None if a fetch was rejected."""
+    parts = fetch_plain_text_parts(mail, uids)
+    if parts is None:
+        return None
+    return {uid: decode_part(*part) if part else None for uid, part in parts.items()}
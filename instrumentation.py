@@ -0,0 +1,201 @@
+import contextvars
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import TRACE_ENABLED, TRACE_PATH, TRACE_MAX_BYTES
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Latency buckets in seconds, from a SQLite lookup up to a slow multi-step LLM call.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_TARGET_RE = re.compile(r"^\s*(\w+)\b.*?\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?|INDEX(?: IF NOT EXISTS)?\s+\w+\s+ON)\s+(\w+)", re.IGNORECASE | re.DOTALL)
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+
+
+def start_trace(trace_id=None):
+    """Starts a new trace for the current request or turn; spans recorded from here on carry its id."""
+    trace_id = trace_id or uuid.uuid4().hex
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+class MetricsRegistry:
+    """In-process span metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (kind, name) -> [bucket counts..., sum, count]
+        self._outcomes = {}  # (kind, name, outcome) -> count
+        self._tokens = {}  # (name, type) -> count
+
+    def observe(self, kind, name, duration, outcome, tokens=None):
+        with self._lock:
+            hist = self._histograms.setdefault((kind, name), [0] * (len(BUCKETS) + 2))
+            for idx, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    hist[idx] += 1
+            hist[-2] += duration
+            hist[-1] += 1
+            key = (kind, name, outcome)
+            self._outcomes[key] = self._outcomes.get(key, 0) + 1
+            for token_type, count in (tokens or {}).items():
+                if count:
+                    self._tokens[(name, token_type)] = self._tokens.get((name, token_type), 0) + count
+
+    def render(self):
+        lines = [
+            "# HELP agent_span_duration_seconds Duration of instrumented operations.",
+            "# TYPE agent_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (kind, name), hist in sorted(self._histograms.items()):
+                labels = f'kind="{_escape(kind)}",name="{_escape(name)}"'
+                for idx, bound in enumerate(BUCKETS):
+                    lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="{bound}"}} {hist[idx]}')
+                lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="+Inf"}} {hist[-1]}')
+                lines.append(f"agent_span_duration_seconds_sum{{{labels}}} {hist[-2]:.6f}")
+                lines.append(f"agent_span_duration_seconds_count{{{labels}}} {hist[-1]}")
+            lines += ["# HELP agent_spans_total Instrumented operations by outcome.", "# TYPE agent_spans_total counter"]
+            for (kind, name, outcome), count in sorted(self._outcomes.items()):
+                lines.append(f'agent_spans_total{{kind="{_escape(kind)}",name="{_escape(name)}",outcome="{outcome}"}} {count}')
+            lines += ["# HELP agent_llm_tokens_total LLM tokens by model and type.", "# TYPE agent_llm_tokens_total counter"]
+            for (name, token_type), count in sorted(self._tokens.items()):
+                lines.append(f'agent_llm_tokens_total{{model="{_escape(name)}",type="{token_type}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = MetricsRegistry()
+
+
+class TraceWriter:
+    """
+    Appends spans to a JSONL file; one line per span, flushed per line so a crash loses nothing.
+    Past max_bytes the file is renamed to <path>.1 (replacing the previous one) and a new one started.
+    """
+
+    def __init__(self, path, max_bytes=TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is not None and self.max_bytes > 0 and self._size + len(line) > self.max_bytes:
+                self._file.close()
+                self._file = None
+                os.replace(self.path, self.path + ".1")
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+                self._size = self._file.tell()
+            self._file.write(line)
+            self._size += len(line)
+
+
+TRACE_WRITER = TraceWriter(TRACE_PATH)
+
+
+def record_span(kind, name, start_time, duration, outcome="ok", **attrs):
+    """Records a finished span in the metrics and, if tracing is enabled, the JSONL trace file."""
+    METRICS.observe(kind, name, duration, outcome, attrs.get("tokens"))
+    if not TRACE_ENABLED:
+        return
+    record = {
+        "trace_id": current_trace_id(),
+        "kind": kind,
+        "name": name,
+        "start": start_time,
+        "duration_ms": round(duration * 1000, 3),
+        "outcome": outcome,
+    }
+    record.update({k: v for k, v in attrs.items() if v is not None})
+    try:
+        TRACE_WRITER.write(record)
+    except OSError as e:
+        logger.error("Could not write trace span: %s", e)
+
+
+class Span:
+    """A span whose end is explicit: start_span(...), fail(error) on errors, end() in a finally block."""
+
+    def __init__(self, kind, name, attrs):
+        self.kind = kind
+        self.name = name
+        self.attrs = attrs
+        self.outcome = "ok"
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._ended = False
+
+    def fail(self, error):
+        self.outcome = "error"
+        self.attrs["error"] = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if not self._ended:
+            self._ended = True
+            record_span(self.kind, self.name, self.start_time, time.perf_counter() - self._start, self.outcome, **self.attrs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.fail(exc)
+        self.end()
+        return False
+
+
+def start_span(kind, name, **attrs):
+    return Span(kind, name, attrs)
+
+
+def _sql_span_name(sql):
+    match = SQL_TARGET_RE.match(sql)
+    if match:
+        return f"{match.group(1).upper()} {match.group(2)}"
+    return sql.split(None, 1)[0].upper() if sql.strip() else "SQL"
+
+
+class TracedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        with start_span("sqlite", _sql_span_name(sql)) as span:
+            result = super().execute(sql, parameters)
+            span.attrs["rows"] = self.rowcount if self.rowcount >= 0 else None
+            return result
+
+    def executemany(self, sql, seq_of_parameters):
+        with start_span("sqlite", _sql_span_name(sql)) as span:
+            result = super().executemany(sql, seq_of_parameters)
+            span.attrs["rows"] = self.rowcount if self.rowcount >= 0 else None
+            return result
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection factory that records a span per statement: sqlite3.connect(path, factory=TracedConnection)."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
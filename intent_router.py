@@ -0,0 +1,215 @@
+import re
+
+from tools import find_investors, search_investor_rows, recommended_investor_rows, send_investor_email
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Deterministic fast path in front of the agent. Plain searches, requests for recommendations, picks
+# from the last results and yes/no answers map straight onto the tools; anything else returns None
+# and goes to the LLM.
+
+MAX_RESULTS = 5
+WORD_RE = re.compile(r"[a-z0-9&+#'./-]+")
+
+YES_ANSWERS = {"yes", "y", "yeah", "yep", "yup", "sure", "ok", "okay", "confirm", "confirmed", "send", "send it",
+               "go ahead", "do it", "yes please", "yes send it", "please send", "sounds good"}
+NO_ANSWERS = {"no", "n", "nope", "nah", "cancel", "don't", "dont", "stop", "not now", "no thanks", "don't send",
+              "do not send", "never mind", "nevermind"}
+
+SEARCH_VERBS_RE = re.compile(r"\b(find|search|searching for|looking for|look for)\b")
+# Questions about outreach already sent ("did any investors reply?") belong to the agent's status tool.
+STATUS_WORDS_RE = re.compile(r"\b(repl(?:y|ies|ied)|responded|respon\w*|status|accepted|opened|check\w*|heard back)\b")
+QUESTION_START_RE = re.compile(r"^\W*(did|do|does|can|could|what|which|how)\b")
+INVESTOR_NOUNS_RE = re.compile(r"\b(investors?|vcs?|funds?|angels?|backers?|firms?)\b")
+SELECT_PREFIX_RE = re.compile(
+    r"^(?:please\s+)?(?:email|e-mail|contact|select|pick|choose|send (?:an )?email to|reach out to|write to)\s+(.+)$"
+)
+ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "1st": 1, "2nd": 2, "3rd": 3, "4th": 4, "5th": 5}
+# Words that belong to the request, not to what is being searched for.
+SEARCH_STOPWORDS = {
+    "find", "search", "show", "list", "looking", "look", "searching", "need", "want", "get", "any", "for", "me",
+    "i", "i'm", "im", "am", "we", "we're", "are", "us", "some", "a", "an", "the", "who", "that", "which", "invest",
+    "invests", "investing", "in", "into", "on", "with", "focused", "focus", "focusing", "interested", "please",
+    "can", "you", "could", "would", "investors", "investor", "vcs", "vc", "funds", "fund", "angels", "angel",
+    "backers", "backer", "firms", "firm", "of", "and", "or", "to", "at", "stage", "stages", "do", "have", "there",
+    "all", "more", "other", "like", "my", "our", "startup", "company",
+}
+# Asks for the precomputed matches rather than a keyword search.
+RECOMMEND_RE = re.compile(
+    r"\b(recommend\w*|suggest\w*|best (?:fit|match\w*|investors?)|(?:good|best) fits?|who should (?:i|we) "
+    r"(?:contact|email|pitch|reach out to)|(?:matches|matching investors) for (?:me|us|my|our))\b"
+)
+# A search that also asks for an action ("... and email the best one") needs the agent.
+MULTI_STEP_RE = re.compile(r"\b(and|then)\s+(email|send|contact|reach)\b")
+
+
+def normalize(message):
+    return " ".join(WORD_RE.findall(message.lower().replace("’", "'")))
+
+
+def extract_search_query(message):
+    """
+    Returns the search keywords in a plain search request, or None if it is not one. Only a clear
+    find/search/looking-for verb with an investor noun qualifies; questions, and anything about
+    replies or status, go to the agent.
+    """
+    text = message.lower()
+    if not SEARCH_VERBS_RE.search(text) or not INVESTOR_NOUNS_RE.search(text) or MULTI_STEP_RE.search(text):
+        return None
+    if STATUS_WORDS_RE.search(text) or QUESTION_START_RE.match(text):
+        return None
+    terms = [word.strip("./-") for word in WORD_RE.findall(text)]
+    terms = [word for word in terms if word and word not in SEARCH_STOPWORDS]
+    return " ".join(terms) or None
+
+
+def match_selection(message, last_results):
+    """Resolves a pick from the last shown results: a name, a number, an ordinal or 'email <name>'."""
+    text = normalize(message)
+    prefixed = SELECT_PREFIX_RE.match(text)
+    candidate = prefixed.group(1).strip() if prefixed else text
+    candidate = re.sub(r"^(?:the|number|#)\s*", "", candidate)
+    candidate = re.sub(r"\s+(?:one|please)$", "", candidate)
+
+    if last_results:
+        position = ORDINALS.get(candidate) or (int(candidate) if candidate.isdigit() else None)
+        if position and 1 <= position <= len(last_results):
+            return last_results[position - 1]
+        exact = [name for name in last_results if normalize(name) == candidate]
+        if exact:
+            return exact[0]
+        partial = [name for name in last_results if len(candidate) >= 3 and candidate in normalize(name)]
+        if len(partial) == 1:
+            return partial[0]
+    if prefixed and candidate:
+        results, error = find_investors(candidate)
+        if not error and results is not None and "name" in results.columns:
+            named = results[results["name"].str.lower().str.contains(re.escape(candidate), na=False)]
+            if len(named) == 1:
+                return named.iloc[0]["name"]
+    return None
+
+
+def confirmation_prompt(investor_name):
+    return f"Are you sure you want to send an email to {investor_name}? (yes/no)"
+
+
+def run_search(agent_session, query):
+    result, error = search_investor_rows([query], limit=MAX_RESULTS)
+    if error:
+        return {"bot_response": error, "routed": "search"}
+    if not result["rows"]:
+        agent_session.last_results = []
+        return {"bot_response": f"No investors found matching the criteria: '{query}'", "routed": "search",
+                "query": query, "investors": [], "total": 0}
+    rows = result["rows"]
+    names = [row["name"] for row in rows if row["name"]]
+    agent_session.last_results = names
+    agent_session.pending_investor = None
+    return {
+        "bot_response": "Here are some potential investors:",
+        "investor_options": names,
+        "investor_ids": [row["investor_id"] for row in rows if row["name"]],
+        "investors": rows,
+        "total": result["total"],
+        "query": query,
+        "routed": "search",
+    }
+
+
+def run_recommendations(agent_session):
+    """Shows the founder's precomputed matches; None if the affinity job has not scored them yet."""
+    result, error = recommended_investor_rows(agent_session.founder, limit=MAX_RESULTS)
+    if error or not result["rows"]:
+        return None
+    rows = result["rows"]
+    names = [row["name"] for row in rows if row["name"]]
+    agent_session.last_results = names
+    agent_session.pending_investor = None
+    return {
+        "bot_response": "Here are the investors that best match your pitch:",
+        "investor_options": names,
+        "investor_ids": [row["investor_id"] for row in rows if row["name"]],
+        "investors": rows,
+        "total": result["total"],
+        "routed": "recommend",
+    }
+
+
+def send_to_investor(agent_session, investor_name):
+    """Sends the outreach email for investor_name with the session founder's details."""
+    founder = agent_session.founder
+    result = send_investor_email.invoke({
+        "investor_name": investor_name,
+        "founder_email": founder.get("founder_email"),
+        "founder_name": founder.get("founder_name"),
+        "startup_name": founder.get("startup_name"),
+        "startup_pitch": founder.get("startup_pitch"),
+    })
+    agent_session.pending_investor = None
+    return {"bot_response": result, "routed": "send", "investor_name": investor_name,
+            "sent": result.startswith("Email successfully sent")}
+
+
+def cancel_send(agent_session):
+    agent_session.pending_investor = None
+    return {"bot_response": "Email not sent.", "routed": "cancel"}
+
+
+def select_investor(agent_session, investor_name):
+    agent_session.pending_investor = investor_name
+    return {"bot_response": confirmation_prompt(investor_name), "require_confirmation": True,
+            "investor_name": investor_name, "routed": "select"}
+
+
+def remember_turn(agent_session, user_message, bot_response):
+    """Keeps routed turns in the agent's memory so a later LLM turn still has the context."""
+    memory = getattr(agent_session.agent_executor, "memory", None)
+    if memory is not None:
+        try:
+            memory.save_context({"input": user_message}, {"output": bot_response})
+        except Exception as e:
+            logger.debug("Could not record routed turn in memory: %s", e)
+
+
+def route_message(agent_session, user_message):
+    """
+    Handles user_message without the LLM when its intent is unambiguous. Returns the JSON-ready
+    response dict, or None to fall through to the agent. Call with agent_session.lock held.
+    """
+    answer = normalize(user_message).strip(" ./-")
+    if agent_session.pending_investor:
+        if answer in YES_ANSWERS:
+            response = send_to_investor(agent_session, agent_session.pending_investor)
+        elif answer in NO_ANSWERS:
+            response = cancel_send(agent_session)
+        else:
+            response = None
+        if response is not None:
+            remember_turn(agent_session, user_message, response["bot_response"])
+            return response
+
+    if RECOMMEND_RE.search(user_message.lower()) and not MULTI_STEP_RE.search(user_message.lower()):
+        response = run_recommendations(agent_session)
+        if response is not None:
+            remember_turn(agent_session, user_message, response["bot_response"] + " " + ", ".join(response["investor_options"]))
+            return response
+
+    query = extract_search_query(user_message)
+    if query:
+        response = run_search(agent_session, query)
+        summary = response["bot_response"]
+        if response.get("investor_options"):
+            summary += " " + ", ".join(response["investor_options"])
+        remember_turn(agent_session, user_message, summary)
+        return response
+
+    if answer in YES_ANSWERS or answer in NO_ANSWERS:
+        return None  # Nothing pending; let the agent interpret it
+    investor_name = match_selection(user_message, agent_session.last_results)
+    if investor_name:
+        response = select_investor(agent_session, investor_name)
+        remember_turn(agent_session, user_message, response["bot_response"])
+        return response
+    return None
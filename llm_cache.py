@@ -0,0 +1,202 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_NORMALIZE
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+WHITESPACE_RE = re.compile(r"(?:\\n|\\t|\s)+")
+TRAILING_PUNCTUATION_RE = re.compile(r"[.!?\s]+(\"|$)")
+EVICTION_CHECK_EVERY = 50  # Updates between size checks; COUNT(*) on every write is wasted work
+# A miss is timed until update() writes the result back; a model call that raises never gets there.
+# Once this many misses are open, those older than MISS_TIMEOUT_SECONDS are dropped as failed.
+MISS_PRUNE_SIZE = 1000
+MISS_TIMEOUT_SECONDS = 600
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, whitespace and trailing-punctuation insensitive form of a serialized prompt."""
+    return TRAILING_PUNCTUATION_RE.sub(r"\1", WHITESPACE_RE.sub(" ", prompt.lower())).strip()
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Persistent LangChain LLM cache in SQLite.
+    Entries are keyed on llm_string (model name, temperature and other call parameters) and the
+    serialized prompt, which for the agent includes the conversation and every tool output so far.
+    With normalize on, a second key ignoring case, whitespace and trailing punctuation is also
+    consulted. Entries expire after ttl_seconds and the least recently used are evicted above
+    max_entries. stats() reports the hit rate and the model latency the hits saved.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, normalize: bool = LLM_CACHE_NORMALIZE):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.normalize = normalize
+        self._lock = threading.Lock()
+        self._miss_started: Dict[str, float] = {}
+        self._updates_since_check = 0
+        self._stats = {"hits": 0, "normalized_hits": 0, "misses": 0, "saved_seconds": 0.0, "evicted": 0}
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    normalized_key TEXT NOT NULL,
+                    llm_string TEXT NOT NULL,
+                    return_val TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_hit_at REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0,
+                    latency_seconds REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_normalized ON llm_cache (normalized_key)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache (last_hit_at)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _keys(self, prompt: str, llm_string: str):
+        return _digest(llm_string, prompt), _digest(llm_string, normalize_prompt(prompt))
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        cache_key, normalized_key = self._keys(prompt, llm_string)
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT cache_key, return_val, latency_seconds FROM llm_cache WHERE cache_key = ? AND created_at > ?',
+                (cache_key, now - self.ttl_seconds)
+            ).fetchone()
+            normalized = False
+            if row is None and self.normalize:
+                row = conn.execute('''
+                    SELECT cache_key, return_val, latency_seconds FROM llm_cache
+                    WHERE normalized_key = ? AND created_at > ? ORDER BY created_at DESC LIMIT 1
+                ''', (normalized_key, now - self.ttl_seconds)).fetchone()
+                normalized = row is not None
+            if row is not None:
+                conn.execute('UPDATE llm_cache SET last_hit_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?', (now, row[0]))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache lookup failed: %s", e)
+            return None
+        finally:
+            conn.close()
+
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                started = time.monotonic()
+                self._miss_started[cache_key] = started
+                if len(self._miss_started) > MISS_PRUNE_SIZE:
+                    self._miss_started = {key: at for key, at in self._miss_started.items()
+                                          if started - at < MISS_TIMEOUT_SECONDS}
+                return None
+            self._stats["hits"] += 1
+            self._stats["normalized_hits"] += int(normalized)
+            self._stats["saved_seconds"] += row[2] or 0.0
+        try:
+            generations = [loads(item) for item in json.loads(row[1])]
+        except Exception as e:
+            logger.warning("LLM cache entry could not be deserialized, ignoring it: %s", e)
+            return None
+        logger.debug("LLM cache %shit (saved ~%.2fs)", 'normalized ' if normalized else '', row[2] or 0.0)
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        cache_key, normalized_key = self._keys(prompt, llm_string)
+        with self._lock:
+            started = self._miss_started.pop(cache_key, None)
+            self._updates_since_check += 1
+            check_size = self._updates_since_check >= EVICTION_CHECK_EVERY
+            if check_size:
+                self._updates_since_check = 0
+        latency = time.monotonic() - started if started is not None else None
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT INTO llm_cache (cache_key, normalized_key, llm_string, return_val, created_at, last_hit_at, latency_seconds)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    return_val = excluded.return_val,
+                    created_at = excluded.created_at,
+                    last_hit_at = excluded.last_hit_at,
+                    latency_seconds = COALESCE(excluded.latency_seconds, llm_cache.latency_seconds)
+            ''', (cache_key, normalized_key, llm_string, json.dumps([dumps(g) for g in return_val]), now, now, latency))
+            if check_size:
+                self._evict(conn, now)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.warning("LLM cache update failed: %s", e)
+        finally:
+            conn.close()
+
+    def _evict(self, conn, now):
+        expired = conn.execute('DELETE FROM llm_cache WHERE created_at <= ?', (now - self.ttl_seconds,)).rowcount
+        count = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        overflow = 0
+        if count > self.max_entries:
+            # Trim to 90% so the next few writes do not each trigger another eviction.
+            overflow = count - int(self.max_entries * 0.9)
+            conn.execute('''
+                DELETE FROM llm_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_cache ORDER BY last_hit_at ASC LIMIT ?
+                )
+            ''', (overflow,))
+        with self._lock:
+            self._stats["evicted"] += expired + overflow
+
+    def clear(self, **kwargs: Any) -> None:
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM llm_cache')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 2)
+        return stats
+
+
+def install_llm_cache() -> Optional[SQLiteLLMCache]:
+    """Installs the persistent cache for every LangChain model in the process, if LLM_CACHE_ENABLED."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    cache = SQLiteLLMCache()
+    set_llm_cache(cache)
+    logger.info("LLM cache enabled at %s (ttl %ss, max %s entries, normalize=%s)", cache.path, cache.ttl_seconds,
+                cache.max_entries, 'on' if cache.normalize else 'off')
+    return cache
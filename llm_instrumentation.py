@@ -0,0 +1,81 @@
+"""
+LangChain callback handler that records a span (instrumentation.record_span) for every LLM call and
+tool call. Kept apart from instrumentation.py so the database layer and the IMAP monitors, which only
+need TracedConnection and spans, do not import langchain.
+"""
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from instrumentation import record_span
+
+
+def _token_usage(response):
+    """Pulls prompt/completion token counts from an LLMResult, whichever way the provider reports them."""
+    usage = {}
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            usage["prompt"] = usage.get("prompt", 0) + (metadata.get("input_tokens") or 0)
+            usage["completion"] = usage.get("completion", 0) + (metadata.get("output_tokens") or 0)
+    if not any(usage.values()):
+        llm_output = getattr(response, "llm_output", None) or {}
+        raw = llm_output.get("usage_metadata") or llm_output.get("token_usage") or {}
+        usage = {
+            "prompt": raw.get("prompt_token_count") or raw.get("prompt_tokens") or raw.get("input_tokens") or 0,
+            "completion": raw.get("candidates_token_count") or raw.get("completion_tokens") or raw.get("output_tokens") or 0,
+        }
+    return usage
+
+
+class InstrumentationHandler(BaseCallbackHandler):
+    """LangChain callback handler recording a span for every LLM call and tool call."""
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, kind, name, **attrs):
+        with self._lock:
+            self._runs[run_id] = (kind, name, time.time(), time.perf_counter(), attrs)
+
+    def _end(self, run_id, outcome="ok", **extra):
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if started is None:
+            return
+        kind, name, start_time, start, attrs = started
+        attrs.update(extra)
+        record_span(kind, name, start_time, time.perf_counter() - start, outcome, run_id=str(run_id), **attrs)
+
+    @staticmethod
+    def _model_name(serialized, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        return params.get("model_name") or params.get("model") or (serialized or {}).get("name") or "llm"
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, "llm", self._model_name(serialized, kwargs), parent_run_id=str(parent_run_id or "") or None)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, "llm", self._model_name(serialized, kwargs), parent_run_id=str(parent_run_id or "") or None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, tokens=_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "error", error=f"{type(error).__name__}: {error}")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name") or "tool", parent_run_id=str(parent_run_id or "") or None)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        text = str(getattr(output, "content", output))
+        # Tools report failures as "Error: ..." strings rather than raising.
+        self._end(run_id, "error" if text.startswith("Error") else "ok", output_chars=len(text))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "error", error=f"{type(error).__name__}: {error}")
+
+
+INSTRUMENTATION_HANDLER = InstrumentationHandler()
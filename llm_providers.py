@@ -0,0 +1,266 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field, PrivateAttr
+
+from config import GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_LOCATION, LLM_PROVIDER, LLM_MODEL_NAME, LLM_RECORD_PATH
+from config import LLM_REPLAY_PATH, LLM_REPLAY_LATENCY_SCALE, LLM_FAKE_SCRIPT_PATH, LLM_FAKE_LATENCY_MS, LLM_FAKE_JITTER_MS
+from llm_instrumentation import INSTRUMENTATION_HANDLER
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Chat model selection for the agent. 'vertex' is the production model; 'fake' and 'replay' run
+# fully offline so the Flask app can be benchmarked and load-tested without Vertex credentials.
+
+OBSERVATION_RE = re.compile(r"Observation:\s*(.*?)\s*(?:\nThought:|$)", re.DOTALL)
+SCRATCHPAD_MARKER = "\n\nThis was your previous work"
+TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+def transcript_key(messages: List[BaseMessage]) -> str:
+    """Identifies a prompt across runs: the digest of every message's role and content."""
+    text = "\x00".join(f"{message.type}:{message.content}" for message in messages)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def agent_action(action: str, action_input: Any) -> str:
+    """A reply in the structured-chat agent's format: a JSON action blob in a code fence."""
+    blob = json.dumps({"action": action, "action_input": action_input}, indent=2)
+    return f"Action:\n```\n{blob}\n```"
+
+
+def default_reply(messages: List[BaseMessage]) -> str:
+    """
+    The built-in script: the agent searches with the user's words and answers with the raw output
+    of any tool that does not return directly, as the system prompt asks the real model to.
+    Prompts outside the agent (connection test, memory summaries) get a short plain reply.
+    """
+    if not messages or messages[0].type != "system":
+        return "OK."
+    last = str(messages[-1].content)
+    observations = OBSERVATION_RE.findall(last)
+    if observations:
+        return agent_action("Final Answer", observations[-1])
+    user_input = last.split(SCRATCHPAD_MARKER, 1)[0].strip().rstrip(".")
+    return agent_action("batch_search_investors", {"queries": [user_input]})
+
+
+def load_script(path: Optional[str]) -> List[Dict[str, str]]:
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    for rule in rules:
+        re.compile(rule["match"])  # Fail at startup, not on the first matching prompt
+    return rules
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Offline chat model answering from a script with a configurable delay.
+    Each rule is {"match": regex, "response": text}; the first whose regex matches the last
+    message wins, and unmatched prompts get default_reply(). Streaming emits one token per word.
+    """
+
+    rules: List[Dict[str, str]] = Field(default_factory=list)
+    latency_seconds: float = 0.0
+    jitter_seconds: float = 0.0
+    streaming: bool = False
+    model_name: str = "scripted"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def _respond(self, messages: List[BaseMessage]):
+        """Returns (reply text, seconds to wait before answering)."""
+        last = str(messages[-1].content) if messages else ""
+        for rule in self.rules:
+            if re.search(rule["match"], last, re.DOTALL):
+                return rule["response"], self._delay()
+        return default_reply(messages), self._delay()
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_seconds + random.uniform(-self.jitter_seconds, self.jitter_seconds))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text, delay = self._respond(messages)
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        text, delay = self._respond(messages)
+        time.sleep(delay)
+        for token in TOKEN_RE.findall(text):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    # Native async versions so a delay under ainvoke is an asyncio.sleep, not a blocked executor thread.
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text, delay = self._respond(messages)
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        text, delay = self._respond(messages)
+        await asyncio.sleep(delay)
+        for token in TOKEN_RE.findall(text):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class ReplayChatModel(ScriptedChatModel):
+    """
+    Answers prompts seen in a transcript recorded with LLM_RECORD_PATH, waiting as long as the
+    recorded call took (times latency_scale). A prompt recorded several times replays its answers
+    in order. Unrecorded prompts fall back to the script and are counted in misses.
+    """
+
+    transcripts: Dict[str, List[Dict[str, Any]]] = Field(default_factory=dict)
+    latency_scale: float = 1.0
+    model_name: str = "replay"
+    _cursor: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _misses: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat"
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayChatModel":
+        transcripts = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    transcripts.setdefault(record["key"], []).append(record)
+        logger.debug("Loaded %s recorded LLM calls from %s", sum(len(v) for v in transcripts.values()), path)
+        return cls(transcripts=transcripts, **kwargs)
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def _respond(self, messages: List[BaseMessage]):
+        key = transcript_key(messages)
+        recorded = self.transcripts.get(key)
+        if not recorded:
+            with self._lock:
+                self._misses += 1
+            logger.debug("Prompt %s not in the replay transcript; using the script", key[:12])
+            return super()._respond(messages)
+        with self._lock:
+            idx = self._cursor.get(key, 0)
+            self._cursor[key] = idx + 1
+        record = recorded[idx % len(recorded)]
+        return record["output"], (record.get("latency_seconds") or 0.0) * self.latency_scale
+
+
+class TranscriptRecorder(BaseCallbackHandler):
+    """Appends each chat model call (messages, output, latency) to a JSONL file for ReplayChatModel."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        prompt = messages[0] if messages else []
+        with self._lock:
+            self._runs[run_id] = (prompt, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if started is None or not response.generations or not response.generations[0]:
+            return
+        prompt, start = started
+        record = {
+            "key": transcript_key(prompt),
+            "messages": [{"type": m.type, "content": m.content} for m in prompt],
+            "output": response.generations[0][0].text,
+            "latency_seconds": round(time.perf_counter() - start, 4),
+        }
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+
+def _vertex_model(streaming, callbacks):
+    from langchain.chat_models import init_chat_model
+
+    if not GOOGLE_CLOUD_PROJECT or not GOOGLE_CLOUD_LOCATION:
+        raise RuntimeError("GOOGLE_CLOUD_PROJECT or GOOGLE_CLOUD_LOCATION not found in environment variables (.env file).")
+    return init_chat_model(
+        LLM_MODEL_NAME,
+        model_provider="google_vertexai",
+        temperature=0.1,
+        streaming=streaming,
+        callbacks=callbacks,
+        project=GOOGLE_CLOUD_PROJECT,
+        location=GOOGLE_CLOUD_LOCATION
+    )
+
+
+def _fake_model(streaming, callbacks):
+    return ScriptedChatModel(
+        rules=load_script(LLM_FAKE_SCRIPT_PATH),
+        latency_seconds=LLM_FAKE_LATENCY_MS / 1000,
+        jitter_seconds=LLM_FAKE_JITTER_MS / 1000,
+        streaming=streaming,
+        callbacks=callbacks
+    )
+
+
+def _replay_model(streaming, callbacks):
+    return ReplayChatModel.from_file(
+        LLM_REPLAY_PATH,
+        rules=load_script(LLM_FAKE_SCRIPT_PATH),
+        latency_seconds=LLM_FAKE_LATENCY_MS / 1000,
+        jitter_seconds=LLM_FAKE_JITTER_MS / 1000,
+        latency_scale=LLM_REPLAY_LATENCY_SCALE,
+        streaming=streaming,
+        callbacks=callbacks
+    )
+
+
+PROVIDERS = {"vertex": _vertex_model, "fake": _fake_model, "replay": _replay_model}
+
+
+def create_chat_model(streaming=False, provider=None):
+    """Builds the chat model for provider (default LLM_PROVIDER) with the app's callbacks attached."""
+    provider = (provider or LLM_PROVIDER).lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{provider}'; expected one of {', '.join(PROVIDERS)}")
+    callbacks = [INSTRUMENTATION_HANDLER]
+    if LLM_RECORD_PATH:
+        callbacks.append(TranscriptRecorder(LLM_RECORD_PATH))
+        logger.debug("Recording LLM calls to %s", LLM_RECORD_PATH)
+    llm = PROVIDERS[provider](streaming, callbacks)
+    logger.debug("Using LLM provider '%s'", provider)
+    return llm
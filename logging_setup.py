@@ -0,0 +1,163 @@
+"""
+Logging for the web app and the modules it calls.
+
+Modules log through get_logger(__name__) with %-style arguments. A record below the module's
+level costs one integer comparison; its arguments are never formatted. An enabled record is
+stamped with the request's trace id and put on a bounded in-memory queue. A writer thread then
+formats, redacts and writes it to stderr, so the request thread never waits on I/O. Redaction
+masks email addresses, JWTs, bearer tokens and password/token/secret values.
+
+Levels, per-module overrides, sampling and the output format are set in config.py (LOG_*).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import threading
+
+from config import LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE_RATES, LOG_FORMAT, LOG_REDACT, LOG_QUEUE_SIZE
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s"
+REDACTIONS = [
+    (re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]*"), "[jwt]"),
+    (re.compile(r"(?i)\b(bearer)\s+[\w.~+/-]+=*"), r"\1 [redacted]"),
+    (re.compile(r"(?i)\b(password|passwd|secret|token|api[_-]?key|authorization)(['\"]?\s*[=:]\s*['\"]?)([^\s'\",}]+)"),
+     r"\1\2[redacted]"),
+    (re.compile(r"\b([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,})\b"), r"\1***@\2"),
+]
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def redact(text):
+    """Masks email local parts, JWTs, bearer tokens and secret-looking key=value pairs."""
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def parse_module_settings(text, convert):
+    """'tools=DEBUG, database=WARNING' -> {'tools': convert('DEBUG'), ...}; malformed entries are skipped."""
+    settings = {}
+    for item in text.split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip() and value.strip():
+            try:
+                settings[name.strip()] = convert(value.strip())
+            except ValueError:
+                continue
+    return settings
+
+
+class ContextFilter(logging.Filter):
+    """Stamps each record with the trace id of the request that logged it, before it leaves the thread."""
+
+    def filter(self, record):
+        from instrumentation import current_trace_id  # Deferred: instrumentation logs through this module
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of each configured module's records below WARNING, matched by logger name prefix."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))  # Most specific prefix wins
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that never blocks the caller: when the queue is full the record is dropped and
+    counted. Records are queued unformatted, arguments and exc_info included, so the message and any
+    traceback are rendered on the writer thread; arguments are therefore read there, not at the call.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record  # The stock prepare() formats on the calling thread; the listener's formatter does it instead
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RedactingFormatter(logging.Formatter):
+    """Formats on the writer thread as text or one JSON object per line, then redacts."""
+
+    def __init__(self, json_lines, redact_output):
+        super().__init__(TEXT_FORMAT)
+        self.json_lines = json_lines
+        self.redact_output = redact_output
+
+    def format(self, record):
+        if self.json_lines:
+            entry = {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "trace_id": getattr(record, "trace_id", "-"),
+                "message": record.getMessage(),
+            }
+            if record.exc_info:
+                entry["exception"] = self.formatException(record.exc_info)
+            text = json.dumps(entry, default=str)
+        else:
+            text = super().format(record)
+        return redact(text) if self.redact_output else text
+
+
+def configure_logging():
+    """Installs the queue handler on the root logger and starts the writer thread. Safe to call repeatedly."""
+    global _handler, _listener
+    with _lock:
+        if _handler is not None:
+            return
+        # Per-record attributes the output never shows; skipping them (the caller lookup walks the stack)
+        # roughly halves the cost of creating a record. See "Optimization" in the logging HOWTO.
+        logging._srcfile = None
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(RedactingFormatter(LOG_FORMAT == "json", LOG_REDACT))
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=max(1, LOG_QUEUE_SIZE)))
+        rates = parse_module_settings(LOG_SAMPLE_RATES, float)
+        if rates:
+            _handler.addFilter(SamplingFilter(rates))
+        _handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.addHandler(_handler)
+        for name, level in [("", LOG_LEVEL)] + list(parse_module_settings(LOG_LEVELS, str.upper).items()):
+            try:
+                logging.getLogger(name or None).setLevel(level)
+            except ValueError:
+                print(f"WARNING: Ignoring unknown log level {level!r} for {name or 'LOG_LEVEL'}", file=sys.stderr)
+        _listener = logging.handlers.QueueListener(_handler.queue, stream)
+        _listener.start()
+        atexit.register(_listener.stop)  # Flushes what is still queued at exit
+
+
+def get_logger(name):
+    configure_logging()
+    return logging.getLogger(name)
+
+
+def logging_stats():
+    return {"queued": _handler.queue.qsize() if _handler else 0, "dropped": _handler.dropped if _handler else 0}
@@ -0,0 +1,226 @@
+"""
+Offline replay source for the reply monitor.
+
+LocalMailbox serves the messages of an mbox file or Maildir through the subset of the imaplib
+interface check_for_replies uses (UID SEARCH, UID FETCH of header fields, BODYSTRUCTURE and
+partial body sections), so the real processing path can run without an IMAP server.
+
+Usage: python mail_replay.py PATH [--format mbox|maildir] [--mailbox inbox]
+"""
+import argparse
+import email
+import mailbox
+import os
+import re
+import time
+import zlib
+from email import policy
+from email.parser import BytesHeaderParser
+
+UID_RANGE_RE = re.compile(r"UID (\d+):\*", re.IGNORECASE)
+SECTION_RE = re.compile(r"BODY\.PEEK\[([\d.]+)\](?:<(\d+)\.(\d+)>)?", re.IGNORECASE)
+HEADER_FIELDS_RE = re.compile(r"HEADER\.FIELDS \(([^)]*)\)", re.IGNORECASE)
+
+
+def _quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _params(pairs):
+    if not pairs:
+        return "NIL"
+    return "(" + " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in pairs) + ")"
+
+
+def _raw_payload(part):
+    payload = part.get_payload(decode=False)
+    if isinstance(payload, str):
+        return payload.encode("utf-8", errors="surrogateescape")
+    return payload or b""
+
+
+def body_structure(part):
+    """Serializes a parsed message as an IMAP BODYSTRUCTURE (RFC 3501 section 7.4.2)."""
+    if part.is_multipart() and part.get_content_type() != "message/rfc822":
+        children = "".join(body_structure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())})"
+
+    params = [(k, v) for k, v in (part.get_params() or [])[1:] if isinstance(v, str)]
+    encoding = (part.get("Content-Transfer-Encoding") or "7bit").strip().upper()
+    fields = [
+        _quote(part.get_content_maintype().upper()), _quote(part.get_content_subtype().upper()),
+        _params(params), "NIL", "NIL", _quote(encoding)
+    ]
+    if part.get_content_type() == "message/rfc822":
+        fields.append("0")
+    else:
+        payload = _raw_payload(part)
+        fields.append(str(len(payload)))
+        if part.get_content_maintype() == "text":
+            fields.append(str(payload.count(b"\n") + 1))
+
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        disposition = f"({_quote(disposition.upper())} {_params([('filename', filename)] if filename else [])})"
+    fields += ["NIL", disposition or "NIL", "NIL"]  # md5, disposition, language
+    return "(" + " ".join(fields) + ")"
+
+
+def get_part(msg, section):
+    """Returns the part addressed by an IMAP section number such as '1' or '2.1'."""
+    part = msg
+    for idx in section.split("."):
+        if not part.is_multipart():
+            if idx == "1":
+                continue  # A single-part message's body is section 1
+            return None
+        children = part.get_payload()
+        if int(idx) > len(children):
+            return None
+        part = children[int(idx) - 1]
+    return part
+
+
+def parse_uid_set(uid_set):
+    uids = set()
+    for chunk in str(uid_set).split(","):
+        if ":" in chunk:
+            start, end = chunk.split(":")
+            uids.update(range(int(start), int(end) + 1))
+        elif chunk:
+            uids.add(int(chunk))
+    return uids
+
+
+def load_messages(path, fmt=None):
+    """Returns the raw bytes of every message in an mbox file or Maildir, in delivery order."""
+    fmt = fmt or ("maildir" if os.path.isdir(path) else "mbox")
+    if fmt == "maildir":
+        source = mailbox.Maildir(path, factory=None, create=False)
+        keys = sorted(source.keys())  # Unique names start with the delivery timestamp
+    else:
+        source = mailbox.mbox(path, create=False)
+        keys = list(source.keys())
+    try:
+        return [source.get_bytes(key) for key in keys]
+    finally:
+        source.close()
+
+
+class LocalMailbox:
+    """
+    Read-only, imaplib-compatible stand-in for one selected IMAP mailbox.
+    UIDs are assigned 1..n in delivery order; UIDVALIDITY is derived from the source path so
+    each file keeps its own checkpoint. server_seconds accumulates the time spent acting as the
+    server (parsing messages and building responses), which benchmarks subtract from client work.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = os.path.abspath(path)
+        self.messages = {uid: raw for uid, raw in enumerate(load_messages(path, fmt), start=1)}
+        self.uidvalidity = zlib.crc32(self.path.encode()) & 0x7FFFFFFF or 1
+        self.state = "SELECTED"
+        self.capabilities = ("IMAP4REV1",)
+        self.server_seconds = 0.0
+
+    def _parse(self, uid, headers_only=False):
+        if headers_only:
+            return BytesHeaderParser(policy=policy.compat32).parsebytes(self.messages[uid])
+        return email.message_from_bytes(self.messages[uid], policy=policy.compat32)
+
+    def response(self, code):
+        if code.upper() == "UIDVALIDITY":
+            return code, [str(self.uidvalidity).encode()]
+        return code, [None]
+
+    def status(self, mailbox_name, names):
+        return "OK", [f"{_quote(mailbox_name)} (UIDVALIDITY {self.uidvalidity} MESSAGES {len(self.messages)})".encode()]
+
+    def capability(self):
+        return "OK", [b" ".join(c.encode() for c in self.capabilities)]
+
+    def noop(self):
+        return "OK", [b""]
+
+    def close(self):
+        self.state = "AUTH"
+        return "OK", [b""]
+
+    def logout(self):
+        self.state = "LOGOUT"
+        return "BYE", [b""]
+
+    def uid(self, command, *args):
+        start = time.perf_counter()
+        try:
+            command = command.upper()
+            if command == "SEARCH":
+                return self._search(" ".join(a for a in args if a))
+            if command == "FETCH":
+                return self._fetch(args[0], args[1])
+            return "NO", [f"{command} not supported by LocalMailbox".encode()]
+        finally:
+            self.server_seconds += time.perf_counter() - start
+
+    def _search(self, criteria):
+        match = UID_RANGE_RE.search(criteria)
+        if not match:
+            return "NO", [b"Only 'UID n:*' searches are supported"]
+        low = int(match.group(1))
+        uids = [uid for uid in self.messages if uid >= low]
+        if not uids and self.messages:
+            uids = [max(self.messages)]  # 'n:*' always includes the newest message
+        return "OK", [" ".join(str(uid) for uid in uids).encode()]
+
+    def _fetch(self, uid_set, items):
+        data = []
+        seq = {uid: idx for idx, uid in enumerate(self.messages, start=1)}
+        for uid in sorted(parse_uid_set(uid_set)):
+            if uid not in self.messages:
+                continue
+            header_match = HEADER_FIELDS_RE.search(items)
+            section_match = SECTION_RE.search(items)
+            msg = self._parse(uid, headers_only=bool(header_match))
+            prefix = f"{seq[uid]} (UID {uid}"
+            if header_match:
+                names = header_match.group(1).split()
+                lines = [f"{name.title()}: {msg[name]}" for name in names if msg[name] is not None]
+                literal = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", errors="surrogateescape")
+                data.append((f"{prefix} BODY[HEADER.FIELDS ({' '.join(names)})] {{{len(literal)}}}".encode(), literal))
+                data.append(b")")
+            elif "BODYSTRUCTURE" in items.upper():
+                data.append(f"{prefix} BODYSTRUCTURE {body_structure(msg)})".encode())
+            elif section_match:
+                section, offset, length = section_match.groups()
+                part = get_part(msg, section)
+                literal = _raw_payload(part) if part is not None else b""
+                name = f"BODY[{section}]"
+                if offset is not None:
+                    literal = literal[int(offset):int(offset) + int(length)]
+                    name += f"<{offset}>"
+                data.append((f"{prefix} {name} {{{len(literal)}}}".encode(), literal))
+                data.append(b")")
+            else:
+                return "BAD", [f"Unsupported FETCH items {items}".encode()]
+        return "OK", data or [None]
+
+
+def main():
+    from database import init_db
+    from monitor_replies import check_for_replies
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="mbox file or Maildir directory")
+    parser.add_argument("--format", choices=["mbox", "maildir"], default=None)
+    parser.add_argument("--mailbox", default="inbox", help="mailbox name used for the checkpoint key")
+    args = parser.parse_args()
+
+    init_db()
+    mail = LocalMailbox(args.path, args.format)
+    print(f"Replaying {len(mail.messages)} message(s) from {mail.path}")
+    check_for_replies(mail, mailbox=args.mailbox)
+
+
+if __name__ == "__main__":
+    main()
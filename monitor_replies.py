@@ -1,21 +1,22 @@
 import imaplib
 import email
+import re
+import select
+import ssl
 from email.header import decode_header
 import time
 import datetime
-from config import MAIL_HOST, MAIL_USERNAME, MAIL_PASSWORD 
-from database import update_outreach_status, get_details_by_investor_email, init_db
+from config import MAIL_HOST, MAIL_USERNAME, MAIL_PASSWORD, MONITOR_MODE, IMAP_IDLE_TIMEOUT_SECONDS, PIPELINE_THRESHOLD
+from database import apply_reply_updates, init_db
+from database import get_mailbox_checkpoint, save_mailbox_checkpoint, get_outreach_by_message_ids, get_tracked_investor_emails
+from imap_fetch import fetch_headers, fetch_plain_text_bodies
+from reply_classifier import get_default_classifier, CATEGORY_STATUS, DEFAULT_STATUS
 
 CHECK_INTERVAL_SECONDS = 300 
-
-POSITIVE_KEYWORDS = [
-    "interested", "yes", "connect", "schedule", "call", "meet",
-    "learn more", "love to", "happy to", "would like to", "open to"
-]
-NEGATIVE_KEYWORDS = [
-    "not interested", "no thanks", "not a fit", "pass", "decline",
-    "unfortunately", "unable to", "not right now", "no capacity"
-]
+FETCH_BATCH_SIZE = 500
+RECONNECT_BACKOFF_INITIAL_SECONDS = 1
+RECONNECT_BACKOFF_MAX_SECONDS = 300
+MESSAGE_ID_RE = re.compile(r"<[^<>\s]+>")
 
 def decode_mime_words(s):
     if not s:
@@ -67,108 +68,272 @@ def get_plain_text_body(msg):
     return None
 
 
-def check_for_replies():
+def connect_imap(mailbox="inbox"):
+    """Opens an IMAP connection, logs in and selects the mailbox."""
+    mail = imaplib.IMAP4_SSL(MAIL_HOST)
+    mail.login(MAIL_USERNAME, MAIL_PASSWORD)
+    mail.select(mailbox)
+    return mail
+
+def supports_idle(mail):
+    """Checks the post-login CAPABILITY list, which may differ from the greeting's."""
+    try:
+        status, data = mail.capability()
+        if status == "OK" and data and data[0]:
+            return b"IDLE" in data[0].upper().split()
+    except imaplib.IMAP4.error as e:
+        print(f"IMAP CAPABILITY failed: {e}")
+    return "IDLE" in mail.capabilities
+
+def _read_available_lines(mail, partial=b""):
+    """
+    Reads whatever complete lines are available without blocking.
+    Drains imaplib's buffered reader first, so lines that arrived together with the IDLE
+    continuation are not missed by select(). Returns (lines, partial_line, hit_eof); hit_eof
+    right after select() reported the socket readable means the server closed the connection.
+    """
+    lines = []
+    bytes_read = 0
+    hit_eof = False
+    mail.sock.setblocking(False)
+    try:
+        while True:
+            try:
+                chunk = mail.file.readline()
+            except (BlockingIOError, ssl.SSLWantReadError):
+                break
+            if not chunk:
+                hit_eof = bytes_read == 0
+                break
+            bytes_read += len(chunk)
+            partial += chunk
+            if partial.endswith(b"\n"):
+                lines.append(partial)
+                partial = b""
+    finally:
+        mail.sock.setblocking(True)
+    return lines, partial, hit_eof
+
+def imap_idle(mail, timeout):
+    """
+    Runs one IDLE command (RFC 2177) on a selected mailbox.
+    Returns True when the server reports new mail, False when the timeout elapses first.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b" IDLE\r\n")
+    response = mail.readline()
+    if not response.startswith(b"+"):
+        raise imaplib.IMAP4.error(f"IDLE rejected: {response!r}")
+
+    new_mail = False
+    partial = b""
+    deadline = time.monotonic() + timeout
+    lines, partial, _ = _read_available_lines(mail, partial)
+    while True:
+        for line in lines:
+            if line.startswith(b"*") and (b"EXISTS" in line or b"RECENT" in line):
+                new_mail = True
+        remaining = deadline - time.monotonic()
+        if new_mail or remaining <= 0:
+            break
+        readable, _, _ = select.select([mail.sock], [], [], remaining)
+        if not readable:
+            break
+        lines, partial, hit_eof = _read_available_lines(mail, partial)
+        if hit_eof:
+            raise mail.abort("connection closed during IDLE")
+
+    mail.send(b"DONE\r\n")
+    # Drain untagged responses until the server completes the IDLE command.
+    while True:
+        line = partial + mail.readline()
+        partial = b""
+        if not line:
+            raise mail.abort("connection closed while ending IDLE")
+        if line.startswith(tag):
+            if not line[len(tag):].strip().upper().startswith(b"OK"):
+                raise imaplib.IMAP4.error(f"IDLE ended with: {line!r}")
+            break
+    return new_mail
+
+def process_reply(sender_email, body, outreach_id=None):
+    """
+    Classifies a tracked investor's reply and records it. Returns True if a row was updated, False
+    if none was still in 'sent' status, or None if the write failed and the reply must be retried.
+    outreach_id pins the update to the row the reply was correlated with by Message-ID.
+    """
+    print(f"  Match found for tracked investor: {sender_email}. Analyzing reply...")
+    if not body:
+        print(f"  Could not extract plain text body for {sender_email}. Cannot determine intent.")
+        status_to_set = "error_parsing_reply"
+    else:
+        category, hits = get_default_classifier().classify(body)
+        status_to_set = CATEGORY_STATUS.get(category, DEFAULT_STATUS)
+        if category:
+            print(f"  {category.upper()} intent detected for {sender_email}. Hits: {hits}")
+        else:
+            print(f"  Neutral or unclear intent detected for {sender_email}.")
+
+    updated_rows = apply_reply_updates([(sender_email, status_to_set, datetime.datetime.now(), outreach_id)])
+    if updated_rows is None:
+        return None
+    if not updated_rows:
+        print(f"  No 'sent' outreach left to update for {sender_email} (maybe already updated?).")
+    return updated_rows > 0
+
+def read_uidvalidity(mail, mailbox):
+    """Returns the mailbox's UIDVALIDITY, from the SELECT response if still pending, else via STATUS."""
+    _, data = mail.response("UIDVALIDITY")
+    if data and data[-1]:
+        return int(data[-1])
+    status, data = mail.status(mailbox, "(UIDVALIDITY)")
+    if status != "OK" or not data or not data[0]:
+        raise imaplib.IMAP4.error(f"Could not read UIDVALIDITY for {mailbox}: {data}")
+    match = re.search(rb"UIDVALIDITY (\d+)", data[0])
+    if not match:
+        raise imaplib.IMAP4.error(f"Could not parse UIDVALIDITY for {mailbox}: {data}")
+    return int(match.group(1))
+
+def referenced_message_ids(msg):
+    """Message-IDs a reply points at, in trust order: In-Reply-To, then References newest first."""
+    ids = MESSAGE_ID_RE.findall(msg.get("In-Reply-To") or "")
+    ids += reversed(MESSAGE_ID_RE.findall(msg.get("References") or ""))
+    return ids
+
+def route_replies(headers, verbose=True):
+    """
+    Maps fetched routing headers to the outreach they answer: {uid: (investor_email, outreach_id)}.
+    In-Reply-To/References are resolved against sent_message_id in one lookup, which pins a reply
+    (including one forwarded by an assistant) to the exact outreach row. Replies without a
+    correlated Message-ID fall back to matching the sender against investors in 'sent' status,
+    with outreach_id None.
+    """
+    parsed = {}
+    all_ids = set()
+    for uid, header_bytes in headers.items():
+        msg = email.message_from_bytes(header_bytes)
+        subject = decode_mime_words(msg["subject"])
+        from_header = decode_mime_words(msg["from"])
+        sender_email = email.utils.parseaddr(from_header)[1].lower()
+        refs = referenced_message_ids(msg)
+        all_ids.update(refs)
+        parsed[uid] = (sender_email, subject, refs)
+
+    correlated = get_outreach_by_message_ids(all_ids)
+    fallback_senders = [sender for sender, _, refs in parsed.values() if not any(r in correlated for r in refs)]
+    tracked_emails = get_tracked_investor_emails(fallback_senders)
+
+    routes = {}
+    for uid in sorted(parsed):
+        sender_email, subject, refs = parsed[uid]
+        if verbose:
+            print(f"  UID {uid} From: {sender_email} | Subject: {subject}")
+        match = next((correlated[r] for r in refs if r in correlated), None)
+        if match:
+            if match["status"] != "sent":
+                if verbose:
+                    print(f"  Reply to outreach #{match['id']} already recorded as '{match['status']}'. Ignoring.")
+                continue
+            if verbose:
+                print(f"  Correlated with outreach #{match['id']} ({match['investor_email']}) via Message-ID.")
+            routes[uid] = (match["investor_email"], match["id"])
+        elif sender_email in tracked_emails:
+            routes[uid] = (sender_email, None)
+        elif verbose:  # Sender not found in DB with status 'sent'
+            print(f"  Sender {sender_email} not found in tracked 'sent' outreach. Ignoring reply.")
+    return routes
+
+def process_uid_batch(mail, uids):
+    """
+    Runs the two-phase fetch and processing for one batch of UIDs.
+    Returns False if the server rejected a fetch or a reply could not be written to the database,
+    so the checkpoint is not advanced past the batch.
+    """
+    # Phase one: routing headers only, one round trip for the whole batch.
+    headers = fetch_headers(mail, uids)
+    if headers is None:
+        return False
+    for uid in uids:
+        if uid not in headers:
+            print(f"  Message UID {uid} no longer exists; skipping.")
+    tracked = route_replies(headers)
+
+    if not tracked:
+        return True
+
+    # Phase two: text/plain parts only, and only for tracked senders.
+    bodies = fetch_plain_text_bodies(mail, list(tracked))
+    if bodies is None:
+        return False
+    for uid, (sender_email, outreach_id) in tracked.items():
+        try:
+            updated = process_reply(sender_email, bodies.get(uid), outreach_id)
+        except Exception as e:
+            # Still checkpointed past: a message that breaks processing is reported once, not every cycle.
+            print(f"Error processing message UID {uid}: {e}")
+            import traceback
+            traceback.print_exc()
+            continue
+        if updated is None:
+            # Replies already written in this batch are skipped on retry: only rows still 'sent' are updated.
+            print(f"  Could not record the reply in UID {uid}.")
+            return False
+    return True
+
+def check_for_replies(mail=None, mailbox="inbox"):
+    """
+    Incrementally syncs the mailbox from its stored UID checkpoint and processes replies from
+    tracked investors. Message flags are never read or changed, so a person reading the inbox does
+    not affect tracking. A full resync happens only when the server's UIDVALIDITY changes.
+    When mail is given, the caller's long-lived connection is reused and left open.
+    """
     print(f"\n[{datetime.datetime.now()}] Checking for replies...")
-    mail = None
+    owns_connection = mail is None
+    mailbox_key = f"{MAIL_USERNAME}/{mailbox}"
     try:
-        mail = imaplib.IMAP4_SSL(MAIL_HOST)
-        mail.login(MAIL_USERNAME, MAIL_PASSWORD)
-        mail.select("inbox")
+        if owns_connection:
+            mail = connect_imap(mailbox)
+
+        uidvalidity = read_uidvalidity(mail, mailbox)
+        checkpoint = get_mailbox_checkpoint(mailbox_key)
+        last_uid = 0
+        if checkpoint and checkpoint[0] == uidvalidity:
+            last_uid = checkpoint[1]
+        elif checkpoint:
+            print(f"UIDVALIDITY for {mailbox_key} changed ({checkpoint[0]} -> {uidvalidity}); running a full resync.")
+        else:
+            print(f"No sync checkpoint for {mailbox_key}; running an initial full sync.")
 
-        status, messages = mail.search(None, "UNSEEN")
+        status, messages = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
         if status != "OK":
             print("Error searching for emails:", messages)
-            if mail:
-                mail.logout() 
             return
 
-        if not messages[0]:
-            print("No unseen emails found.")
-            if mail:
-                mail.logout()
+        # 'n:*' always matches the newest message, even when its UID is below n.
+        uids = sorted(int(uid) for uid in (messages[0] or b"").split() if int(uid) > last_uid)
+        if not uids:
+            print("No new emails found.")
             return
+        print(f"Found {len(uids)} new email(s) after UID {last_uid}.")
 
-        message_ids = messages[0].split()
-        print(f"Found {len(message_ids)} unseen email(s).")
-
-        for msg_id in message_ids:
-            current_msg_id_str = msg_id.decode()
-            print(f"Processing message ID: {current_msg_id_str}")
-            processed = False  # Flag to track if we should mark as Seen
-            try:
-                status, msg_data = mail.fetch(msg_id, "(RFC822)")
-                if status != "OK":
-                    print(f"Error fetching email {current_msg_id_str}: {msg_data}")
-                    continue
-
-                for response_part in msg_data:
-                    if isinstance(response_part, tuple):
-                        msg = email.message_from_bytes(response_part[1])
-                        subject = decode_mime_words(msg["subject"])
-                        from_header = decode_mime_words(msg["from"])
-                        sender_email = email.utils.parseaddr(from_header)[1].lower()
-
-                        print(f"  From: {sender_email} | Subject: {subject}")
-
-                        outreach_details = get_details_by_investor_email(sender_email)
-
-                        if outreach_details:
-                            print(f"  Match found for tracked investor: {sender_email}. Analyzing reply...")
-                            body = get_plain_text_body(msg)
-
-                            if body:
-                                body_lower = body.lower()
-                                is_positive = any(keyword in body_lower for keyword in POSITIVE_KEYWORDS)
-                                is_negative = any(keyword in body_lower for keyword in NEGATIVE_KEYWORDS)
-
-                                status_to_set = "replied_other"  # Default if neither positive nor negative
-                                if is_positive and not is_negative:  # Simple logic: prioritize positive if no negative detected
-                                    status_to_set = "replied_positive"
-                                    print(f"  POSITIVE intent detected for {sender_email}.")
-                                elif is_negative:
-                                    status_to_set = "replied_negative"
-                                    print(f"  NEGATIVE intent detected for {sender_email}.")
-                                else:
-                                    print(f"  Neutral or unclear intent detected for {sender_email}.")
-
-                                status_updated = update_outreach_status(sender_email, status_to_set,
-                                                                        datetime.datetime.now())
-                                if status_updated:
-                                    processed = True  # Successfully updated DB status, mark email as seen
-
-                                else:
-                                    print(
-                                        f"  DB status update failed for {sender_email} (maybe already updated?).")
-                                    processed = False
-
-
-                            else:  # Could not get body
-                                print(
-                                    f"  Could not extract plain text body for {sender_email}. Cannot determine intent.")
-                                status_updated = update_outreach_status(sender_email, "error_parsing_reply",
-                                                                        datetime.datetime.now())
-                                processed = status_updated  # Mark seen only if DB update worked
-
-                        else:  # Sender not found in DB with status 'sent'
-                            print(f"  Sender {sender_email} not found in tracked 'sent' outreach. Ignoring reply.")
-
-            except Exception as e:
-                print(f"Error processing message {current_msg_id_str}: {e}")
-                import traceback
-                traceback.print_exc()
-                processed = False  # Don't mark as seen on error
+        if len(uids) >= PIPELINE_THRESHOLD:
+            from reply_pipeline import ReplyPipeline  # Imported lazily; it depends on this module
+            print(f"Backlog of {len(uids)} messages; switching to the pipelined processor.")
+            ReplyPipeline(mail, mailbox_key, uidvalidity, last_uid, FETCH_BATCH_SIZE).run(uids)
+            return
 
-            finally:
-                if processed:
-                    try:
-                        status, _ = mail.store(msg_id, '+FLAGS', '\\Seen')
-                        if status == 'OK':
-                            print(f"  Marked message {current_msg_id_str} as Seen.")
-                        else:
-                            print(f"  Failed to mark message {current_msg_id_str} as Seen.")
-                    except Exception as e_flag:
-                        print(f"Error setting Seen flag for {current_msg_id_str}: {e_flag}")
+        for start in range(0, len(uids), FETCH_BATCH_SIZE):
+            batch = uids[start:start + FETCH_BATCH_SIZE]
+            if not process_uid_batch(mail, batch):
+                print(f"Stopping at UID {last_uid}; the batch will be retried next cycle.")
+                return
+            last_uid = batch[-1]
+            save_mailbox_checkpoint(mailbox_key, uidvalidity, last_uid)
 
+    except (imaplib.IMAP4.abort, OSError):
+        if not owns_connection:
+            raise  # Let the long-lived loop reconnect
+        print("IMAP connection lost while checking for replies.")
     except imaplib.IMAP4.error as e:
         print(f"IMAP Error: {e}")
     except Exception as e:
@@ -176,22 +341,73 @@ def check_for_replies():
         import traceback
         traceback.print_exc()
     finally:
-        if mail and mail.state == 'SELECTED':
-            try:
-                mail.close()  # Close mailbox before logout
-            except:
-                pass  # Ignore errors on close
-        if mail and mail.state != 'LOGOUT':
-            try:
-                mail.logout()
-                print("IMAP logout successful in finally block.")
-            except:
-                pass  # Ignore errors on logout
+        if owns_connection:
+            close_imap(mail)
 
-if __name__ == "__main__":
-    print("Starting reply monitor...")
-    init_db()
+def close_imap(mail):
+    if mail and mail.state == 'SELECTED':
+        try:
+            mail.close()  # Close mailbox before logout
+        except:
+            pass  # Ignore errors on close
+    if mail and mail.state != 'LOGOUT':
+        try:
+            mail.logout()
+            print("IMAP logout successful in finally block.")
+        except:
+            pass  # Ignore errors on logout
+
+def run_poll_loop():
+    """Original behaviour: a fresh connection every CHECK_INTERVAL_SECONDS."""
     while True:
         check_for_replies()
         print(f"Sleeping for {CHECK_INTERVAL_SECONDS} seconds...")
-        time.sleep(CHECK_INTERVAL_SECONDS)
\ No newline at end of file
+        time.sleep(CHECK_INTERVAL_SECONDS)
+
+def run_idle_loop():
+    """
+    Keeps one connection open and waits for new mail with IMAP IDLE, re-issuing IDLE every
+    IMAP_IDLE_TIMEOUT_SECONDS as a keepalive. Reconnects with exponential backoff on failure and
+    falls back to polling on the same connection when the server does not advertise IDLE.
+    """
+    backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+    while True:
+        mail = None
+        try:
+            mail = connect_imap()
+            backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+            idle_supported = supports_idle(mail)
+            if not idle_supported:
+                print("Server does not support IDLE; polling on the open connection.")
+
+            check_for_replies(mail)  # Catch anything that arrived while disconnected
+            while True:
+                if idle_supported:
+                    if imap_idle(mail, IMAP_IDLE_TIMEOUT_SECONDS):
+                        check_for_replies(mail)
+                    else:
+                        mail.noop()  # Keepalive before re-entering IDLE
+                else:
+                    time.sleep(CHECK_INTERVAL_SECONDS)
+                    mail.noop()
+                    check_for_replies(mail)
+
+        except KeyboardInterrupt:
+            close_imap(mail)
+            raise
+        except (imaplib.IMAP4.error, OSError) as e:
+            print(f"IMAP connection error: {e}. Reconnecting in {backoff} seconds...")
+            close_imap(mail)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX_SECONDS)
+
+if __name__ == "__main__":
+    print(f"Starting reply monitor ({MONITOR_MODE} mode)...")
+    init_db()
+    if MONITOR_MODE == "poll":
+        run_poll_loop()
+    elif MONITOR_MODE == "async":
+        from async_monitor import main as run_async_monitor  # Multi-mailbox asyncio monitor
+        run_async_monitor()
+    else:
+        run_idle_loop()
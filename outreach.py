@@ -0,0 +1,160 @@
+import contextvars
+import re
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import OUTREACH_WORKERS, OUTREACH_CLAIM_TIMEOUT_SECONDS, OUTREACH_MAX_INVESTORS
+from database import claim_outreach_request, update_outreach_request, get_outreach_requests, get_founder
+from tools import investor_index, send_outreach_email
+from suppression import SUPPRESSIONS, describe
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Direct outreach API: validated, idempotent sends by investor id with no agent in the loop.
+# A request only claims (founder, investor) pairs and queues them; SMTP runs on the worker pool,
+# so the response returns in milliseconds and the client polls by request id.
+
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_executor = ThreadPoolExecutor(max_workers=max(1, OUTREACH_WORKERS), thread_name_prefix="outreach")
+
+
+def _result(row, investor_name, duplicate):
+    return {
+        "investor_id": row["investor_id"],
+        "investor_name": investor_name,
+        "status": row["status"],
+        "request_id": row["request_id"],
+        "duplicate": duplicate,
+        "detail": row.get("detail"),
+    }
+
+
+def validate_outreach(founder_id, investor_ids, request_id):
+    """Returns (founder, [investor rows], request_id, None) or (None, None, None, (error body, HTTP status))."""
+    if request_id is not None and not REQUEST_ID_RE.match(str(request_id)):
+        return None, None, None, ({"error": "request_id must be 1-128 letters, digits or ._:-"}, 400)
+    try:
+        founder_id = int(founder_id)
+    except (TypeError, ValueError):
+        return None, None, None, ({"error": "founder_id must be an integer"}, 400)
+    if not isinstance(investor_ids, list) or not investor_ids or not all(isinstance(i, str) for i in investor_ids):
+        return None, None, None, ({"error": "investor_ids must be a non-empty list of investor id strings"}, 400)
+    investor_ids = list(dict.fromkeys(i.strip() for i in investor_ids))  # Drop repeats, keep order
+    if len(investor_ids) > OUTREACH_MAX_INVESTORS:
+        return None, None, None, ({"error": f"At most {OUTREACH_MAX_INVESTORS} investors per request"}, 400)
+
+    founder = get_founder(founder_id)
+    if founder is None:
+        return None, None, None, ({"error": f"Founder {founder_id} not found"}, 404)
+    index = investor_index()
+    unknown = [i for i in investor_ids if i not in index]
+    no_email = [i for i in investor_ids if i in index and '@' not in str(index[i].get('email') or '')]
+    if unknown or no_email:
+        # Validate everything before sending anything, so a bad id never leaves a request half done.
+        return None, None, None, ({"error": "Some investors cannot be contacted",
+                                   "unknown_investor_ids": unknown, "missing_email_investor_ids": no_email}, 422)
+    return founder, [index[i] for i in investor_ids], str(request_id or uuid.uuid4().hex), None
+
+
+def submit_outreach(founder_id, investor_ids, request_id=None):
+    """
+    Queues one outreach email per investor for the founder, at most once per (founder, investor).
+    Safe to retry: pairs already sent or in flight are reported with duplicate=True and the
+    request id that owns them. Returns (response body, HTTP status).
+    """
+    founder, investors, request_id, error = validate_outreach(founder_id, investor_ids, request_id)
+    if error:
+        return error
+    results = []
+    for investor in investors:
+        try:
+            state, row = claim_outreach(founder, investor, request_id)
+        except sqlite3.Error as e:
+            return {"error": f"Could not record the outreach request: {e}", "request_id": request_id, "results": results}, 503
+        if state == "claimed":
+            context = contextvars.copy_context()  # Keeps the request's trace id on the worker's spans
+            _executor.submit(context.run, deliver_outreach, founder, investor)
+        results.append(_result(row, investor.get("name"), duplicate=state == "duplicate"))
+    logger.info("Outreach request %s for founder %s: %d queued, %d duplicate, %d suppressed", request_id, founder['id'],
+                sum(r['status'] == 'queued' and not r['duplicate'] for r in results),
+                sum(r['duplicate'] for r in results), sum(r['status'] == 'suppressed' for r in results))
+    return {"request_id": request_id, "founder_id": founder["id"], "results": results}, 202
+
+
+def claim_outreach(founder, investor, request_id):
+    """
+    Claims the pair and checks it against the suppression list. Returns (state, row) with state
+    'claimed' (ready to deliver), 'duplicate' (sent or in flight already) or 'suppressed'.
+    Raises sqlite3.Error if the claim cannot be recorded.
+    """
+    claimed, row = claim_outreach_request(founder["id"], founder["founder_email"], investor["investor_id"],
+                                          investor["email"], request_id, OUTREACH_CLAIM_TIMEOUT_SECONDS)
+    if not claimed:
+        return "duplicate", row
+    suppression = SUPPRESSIONS.check(investor["email"], founder["founder_email"])
+    if suppression:
+        # Recorded like a failure, so a retry after the suppression ends claims the pair again.
+        update_outreach_request(founder["id"], investor["investor_id"], "suppressed", detail=describe(suppression))
+        return "suppressed", dict(row, status="suppressed", detail=describe(suppression))
+    return "claimed", row
+
+
+def send_outreach_now(founder_id, investor_id, request_id=None):
+    """
+    submit_outreach for a single investor, sent on the calling thread instead of the pool (batch jobs
+    run on their own workers). Same validation, claim and suppression check, so rerunning a job never
+    sends twice. Returns (response body, HTTP status).
+    """
+    founder, investors, request_id, error = validate_outreach(founder_id, [investor_id], request_id)
+    if error:
+        return error
+    investor = investors[0]
+    try:
+        state, row = claim_outreach(founder, investor, request_id)
+    except sqlite3.Error as e:
+        return {"error": f"Could not record the outreach request: {e}", "request_id": request_id}, 503
+    if state == "claimed":
+        deliver_outreach(founder, investor)
+        row = next((r for r in get_outreach_requests(request_id=request_id) if r["investor_id"] == investor["investor_id"]), row)
+    return _result(row, investor.get("name"), duplicate=state == "duplicate"), 200
+
+
+def deliver_outreach(founder, investor):
+    """Worker: sends one claimed outreach email and records the outcome on its request row."""
+    if not update_outreach_request(founder["id"], investor["investor_id"], "sending", from_status="queued"):
+        return  # Another worker or process already took it
+    try:
+        result, message_id = send_outreach_email(investor, founder["founder_email"], founder["founder_name"],
+                                                 founder["startup_name"], founder["startup_pitch"])
+    except Exception as e:
+        result, message_id = f"Error: {e}", None
+    update_outreach_request(founder["id"], investor["investor_id"], "sent" if message_id else "failed",
+                            detail=result, message_id=message_id)
+
+
+def outreach_status(request_id):
+    """Returns (response body, HTTP status) with the current state of every pair the request owns."""
+    rows = get_outreach_requests(request_id=request_id)
+    if not rows:
+        return {"error": f"No outreach found for request {request_id}"}, 404
+    index = investor_index()
+    results = [_result(row, index.get(row["investor_id"], {}).get("name"), duplicate=False) for row in rows]
+    return {"request_id": request_id, "founder_id": rows[0]["founder_id"], "results": results}, 200
+
+
+def resume_queued_outreach():
+    """Re-queues pairs left 'queued' by a previous process; they were claimed but never attempted."""
+    index = investor_index()
+    resumed = 0
+    for row in get_outreach_requests(status="queued"):
+        founder, investor = get_founder(row["founder_id"]), index.get(row["investor_id"])
+        if founder is None or investor is None:
+            update_outreach_request(row["founder_id"], row["investor_id"], "failed", detail="Founder or investor no longer exists")
+            continue
+        _executor.submit(deliver_outreach, founder, investor)
+        resumed += 1
+    if resumed:
+        logger.info("Resumed %d queued outreach email(s)", resumed)
+    return resumed
@@ -0,0 +1,150 @@
+"""
+Outreach history: a paginated JSON API and streaming CSV/NDJSON exports over the outreach table.
+
+Both read through database.get_outreach_history, which pages by id (keyset pagination) rather than
+OFFSET, so page 1,000 costs the same index seek as page 1. An export walks the same keyset in
+batches of HISTORY_EXPORT_BATCH_SIZE, each on its own short read, so memory stays flat however many
+rows match and a long download never holds a lock that would stall sends.
+
+Callers pass the scope of the caller's API token (api_auth.token_scope): a founder's token only ever
+sees that founder's rows; an operator token ("*") sees every founder's.
+
+Filters (query parameters, all optional):
+    founder    founder email, or a founder id
+    status     one or more statuses, comma-separated (e.g. sent,replied_positive)
+    from, to   sent date range as YYYY-MM-DD or ISO datetimes; a date-only "to" includes that day
+    order      desc (newest first, the default) or asc
+"""
+import base64
+import csv
+import datetime
+import io
+import json
+import sqlite3
+
+from api_auth import ANY_FOUNDER
+from config import HISTORY_MAX_PAGE_SIZE, HISTORY_EXPORT_BATCH_SIZE
+from database import get_outreach_history, get_founder, OUTREACH_HISTORY_COLUMNS
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def encode_cursor(last_id, order):
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id, "order": order}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, order):
+    """Returns (last id, None) or (None, error message)."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        last_id = int(data["after"])
+    except (ValueError, TypeError, KeyError):
+        return None, "cursor is not valid"
+    if data.get("order") != order:
+        return None, "cursor was issued for a different order"
+    return last_id, None
+
+
+def _parse_timestamp(value, end=False):
+    """Stored timestamps are str(datetime), so bounds are rendered the same way and compared as text."""
+    try:
+        if len(value) == 10:
+            parsed = datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time())
+            return str(parsed + datetime.timedelta(days=1) if end else parsed)
+        return str(datetime.datetime.fromisoformat(value).replace(tzinfo=None))
+    except ValueError:
+        return None
+
+
+def parse_history_filters(args, scope):
+    """
+    Returns (keyword arguments for get_outreach_history, None) or (None, (error body, HTTP status)).
+    scope is the founder id the caller's token acts for, or ANY_FOUNDER.
+    """
+    filters = {}
+    founder = (args.get("founder") or "").strip()
+    if scope != ANY_FOUNDER:
+        own = get_founder(int(scope))
+        if own is None or (founder not in ("", scope) and founder.lower() != own["founder_email"].lower()):
+            return None, ({"error": "This API token can only read its own founder's outreach"}, 403)
+        filters["founder_email"] = own["founder_email"]
+    elif founder.isdigit():
+        row = get_founder(int(founder))
+        if row is None:
+            return None, ({"error": f"Founder {founder} not found"}, 404)
+        filters["founder_email"] = row["founder_email"]
+    elif founder:
+        filters["founder_email"] = founder
+    statuses = [s.strip() for s in (args.get("status") or "").split(",") if s.strip()]
+    if statuses:
+        filters["statuses"] = statuses
+    for param, key in (("from", "sent_from"), ("to", "sent_to")):
+        value = (args.get(param) or "").strip()
+        if value:
+            filters[key] = _parse_timestamp(value, end=key == "sent_to")
+            if filters[key] is None:
+                return None, ({"error": f"{param} must be YYYY-MM-DD or an ISO datetime"}, 400)
+    order = (args.get("order") or "desc").lower()
+    if order not in ("asc", "desc"):
+        return None, ({"error": "order must be asc or desc"}, 400)
+    filters["descending"] = order == "desc"
+    return filters, None
+
+
+def history_page(args, scope):
+    """One page of matching outreach rows and the cursor for the next. Returns (response body, HTTP status)."""
+    filters, error = parse_history_filters(args, scope)
+    if error:
+        return error
+    order = "desc" if filters["descending"] else "asc"
+    try:
+        limit = int(args.get("limit") or 50)
+    except ValueError:
+        return {"error": "limit must be an integer"}, 400
+    if not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
+        return {"error": f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}"}, 400
+    if args.get("cursor"):
+        filters["after_id"], error = decode_cursor(args["cursor"], order)
+        if error:
+            return {"error": error}, 400
+    try:
+        rows = get_outreach_history(limit=limit + 1, **filters)  # One extra row tells us whether another page exists
+    except sqlite3.Error as e:
+        return {"error": f"Could not read the outreach history: {e}"}, 503
+    next_cursor = encode_cursor(rows[limit - 1]["id"], order) if len(rows) > limit else None
+    return {"items": rows[:limit], "limit": limit, "next_cursor": next_cursor}, 200
+
+
+def iter_history(filters, batch_size=HISTORY_EXPORT_BATCH_SIZE):
+    """Yields every matching row, reading one keyset batch at a time."""
+    after_id = None
+    while True:
+        rows = get_outreach_history(after_id=after_id, limit=batch_size, **filters)
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]["id"]
+
+
+def export_chunks(filters, fmt):
+    """Yields the export as text chunks, one per batch of rows, for a streamed response."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=OUTREACH_HISTORY_COLUMNS) if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    count = 0
+    for row in iter_history(filters):
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, default=str) + "\n")
+        count += 1
+        if count % HISTORY_EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+    logger.debug("Outreach history export (%s) streamed %s rows", fmt, count)
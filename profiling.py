@@ -0,0 +1,213 @@
+"""
+Opt-in request profiling.
+
+A request is profiled when it carries "X-Profile: <PROFILE_TOKEN>" or is picked at
+PROFILE_SAMPLE_RATE (see config.py); with PROFILE_TOKEN unset the header is ignored. While it
+runs, a background thread samples the Python stacks of the request's threads every
+PROFILE_INTERVAL_MS: the thread serving the request, plus any thread running one of the tools in
+tools.py on its behalf, matched by trace id. Nothing is traced per call, so a profiled request
+runs at close to full speed and an unprofiled one pays a dictionary lookup per tool.
+
+Each profile is saved to PROFILE_DIR as <id>.collapsed, one "root;frame;...;leaf count" line per
+distinct stack, which flamegraph.pl, speedscope and inferno read as is, with <id>.json beside it
+holding the request, duration and sample count. /profiles lists the most recent ones, and it and
+the stack files are served only to requests carrying the same header.
+"""
+import contextlib
+import functools
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import PROFILE_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, PROFILE_DIR, PROFILE_KEEP
+from instrumentation import current_trace_id
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-zA-Z_-]{1,32}$")
+MAX_STACK_DEPTH = 256
+
+
+def has_profile_token(headers):
+    """True if headers carry X-Profile: <PROFILE_TOKEN>; always False while PROFILE_TOKEN is unset."""
+    value = headers.get(PROFILE_HEADER)
+    return bool(PROFILE_TOKEN) and value is not None and hmac.compare_digest(value.encode(), PROFILE_TOKEN.encode())
+
+
+def profile_reason(headers):
+    """'header' or 'sampled' if this request should be profiled, else None."""
+    if has_profile_token(headers):
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class Profile:
+    """The samples collected for one request."""
+
+    def __init__(self, trace_id, label, reason):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^0-9a-zA-Z_-]', '', str(trace_id))[:16] or 'request'}"
+        self.trace_id = trace_id
+        self.label = label
+        self.reason = reason
+        self.started = time.time()
+        self.stacks = Counter()
+        self.samples = 0
+        self.threads = {}  # thread id -> [root frame label, nesting depth]
+        self._start = time.perf_counter()
+
+
+class SamplingProfiler:
+    """Samples the threads attached to active profiles; the sampler thread sleeps while none are active."""
+
+    def __init__(self, directory=PROFILE_DIR, interval_ms=PROFILE_INTERVAL_MS, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.interval = max(interval_ms, 0.5) / 1000
+        self.keep = keep
+        self._active = {}  # trace id -> Profile
+        self._labels = {}  # code object -> frame label
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, trace_id, label, reason):
+        """Starts profiling the calling thread under trace_id; pass the result to finish()."""
+        profile = Profile(trace_id, label, reason)
+        profile.threads[threading.get_ident()] = [label, 1]
+        with self._lock:
+            self._active[trace_id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+        return profile
+
+    @contextlib.contextmanager
+    def attach(self, label):
+        """Samples the calling thread into the current trace's profile, if there is one, for the block."""
+        profile = self._active.get(current_trace_id()) if self._active else None
+        if profile is None:
+            yield
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            entry = profile.threads.setdefault(thread_id, [label, 0])  # Nested on a sampled thread: already covered
+            entry[1] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    profile.threads.pop(thread_id, None)
+
+    def finish(self, profile, error=None):
+        """Stops the profile and saves it. Returns its metadata, or None if it could not be written."""
+        with self._lock:
+            self._active.pop(profile.trace_id, None)
+            if not self._active:
+                self._wake.clear()
+        meta = {
+            "id": profile.id,
+            "trace_id": profile.trace_id,
+            "request": profile.label,
+            "reason": profile.reason,
+            "started": profile.started,
+            "duration_ms": round((time.perf_counter() - profile._start) * 1000, 3),
+            "samples": profile.samples,
+            "interval_ms": self.interval * 1000,
+            "error": f"{type(error).__name__}: {error}" if error else None,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile.id}.collapsed"), "w", encoding="utf-8") as f:
+                for stack, count in sorted(profile.stacks.items()):
+                    f.write(f"{';'.join(stack)} {count}\n")
+            with open(os.path.join(self.directory, f"{profile.id}.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            self._prune()
+        except OSError as e:
+            logger.error("Could not save profile %s: %s", profile.id, e)
+            return None
+        logger.debug("Saved profile %s for %s: %s samples over %sms", profile.id, profile.label, profile.samples, meta['duration_ms'])
+        return meta
+
+    def recent(self, limit=50):
+        """Metadata of the newest saved profiles, newest first."""
+        profiles = []
+        for name in self._saved()[::-1][:limit]:
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def collapsed_path(self, profile_id):
+        """Path of a saved profile's collapsed stacks, or None for an unknown or malformed id."""
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.collapsed")
+        return path if os.path.exists(path) else None
+
+    def _saved(self):
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))  # Ids sort by time
+        except OSError:
+            return []
+
+    def _prune(self):
+        for name in self._saved()[:-self.keep] if self.keep > 0 else []:
+            for ext in (".json", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.directory, name[:-len(".json")] + ext))
+                except OSError:
+                    pass
+
+    def _frame_label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for profile in self._active.values():
+                    for thread_id, (root, _) in profile.threads.items():
+                        frame = frames.get(thread_id)
+                        if frame is None or thread_id == own_id:
+                            continue
+                        stack = []
+                        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                            stack.append(self._frame_label(frame.f_code))
+                            frame = frame.f_back
+                        stack.append(root)
+                        profile.stacks[tuple(reversed(stack))] += 1
+                    profile.samples += 1
+            del frames
+
+
+PROFILER = SamplingProfiler()
+
+
+def profiled_tool(name, func):
+    """Wraps a tool function so its thread is sampled while it runs inside a profiled request."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with PROFILER.attach(f"tool:{name}"):
+            return func(*args, **kwargs)
+    return wrapper
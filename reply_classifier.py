@@ -0,0 +1,192 @@
+import json
+import os
+import re
+from collections import deque
+
+from config import REPLY_KEYWORDS_PATH
+
+# Categories are checked in priority order; the first one with a hit wins.
+DEFAULT_KEYWORD_SETS = {
+    "unsubscribe": [
+        "unsubscribe", "remove me", "stop emailing", "do not contact", "don't contact", "take me off"
+    ],
+    "out_of_office": [
+        "out of office", "out of the office", "on vacation", "on leave", "auto reply", "automatic reply",
+        "limited access to email", "currently away"
+    ],
+    "negative": [
+        "not interested", "no thanks", "not a fit", "pass on", "will pass", "we'll pass", "i'll pass",
+        "have to pass", "going to pass", "pass for now", "decline", "unfortunately", "unable to",
+        "not right now", "no capacity", "not for us", "outside our focus"
+    ],
+    "positive": [
+        "interested", "yes", "connect", "schedule", "call", "meet", "learn more", "love to", "happy to",
+        "would like to", "open to", "let's chat", "sounds good", "send over the deck"
+    ],
+}
+DEFAULT_PRIORITY = ["unsubscribe", "out_of_office", "negative", "positive"]
+
+# A negator shortly before a phrase of these categories counts the hit toward the mapped category.
+DEFAULT_NEGATES_TO = {"positive": "negative"}
+DEFAULT_NEGATORS = {
+    "not", "never", "don't", "dont", "won't", "wont", "can't", "cant", "cannot", "isn't", "aren't",
+    "wouldn't", "unable", "neither", "nor", "without"
+}
+NEGATION_WINDOW = 3
+
+CATEGORY_STATUS = {
+    "positive": "replied_positive",
+    "negative": "replied_negative",
+    "out_of_office": "replied_auto",
+    "unsubscribe": "unsubscribed",
+}
+DEFAULT_STATUS = "replied_other"
+
+TOKEN_RE = re.compile(r"\w+(?:'\w+)*|[.,!?;]")
+# Negation does not carry across a clause boundary or a contrasting conjunction.
+NEGATION_BREAKS = {".", ",", "!", "?", ";", "but", "however", "though", "although"}
+
+# Everything from the first of these lines down is quoted history or a signature, not the reply.
+QUOTE_CUTOFF_RE = re.compile(
+    r"^(?:\s*On .{0,200}wrote:\s*$"
+    r"|\s*-{2,}\s*(?:Original Message|Forwarded message)\s*-{2,}"
+    r"|\s*From:\s.+$"
+    r"|\s*_{5,}\s*$"
+    r"|--\s?$"
+    r"|\s*Sent from my \w+)",
+    re.IGNORECASE | re.MULTILINE
+)
+QUOTED_LINE_RE = re.compile(r"^\s*>.*$", re.MULTILINE)
+
+
+def strip_quoted_text(body):
+    """Drops '>' quoted lines, quoted history after 'On ... wrote:' style markers, and signatures."""
+    if not body:
+        return ""
+    cutoff = QUOTE_CUTOFF_RE.search(body)
+    if cutoff:
+        body = body[:cutoff.start()]
+    return QUOTED_LINE_RE.sub("", body)
+
+
+def tokenize(text):
+    text = text.lower()
+    if "’" in text:
+        text = text.replace("’", "'")
+    return TOKEN_RE.findall(text)
+
+
+class ReplyClassifier:
+    """
+    Multi-category keyword classifier built once from keyword sets.
+    Phrases are compiled into a word-level Aho-Corasick automaton, so every body is scanned in a
+    single linear pass, phrases only match on whole words, and negation is checked per hit.
+    """
+
+    def __init__(self, keyword_sets=None, priority=None, negates_to=None, negators=None,
+                 negation_window=NEGATION_WINDOW):
+        self.keyword_sets = keyword_sets or DEFAULT_KEYWORD_SETS
+        self.priority = priority or [c for c in DEFAULT_PRIORITY if c in self.keyword_sets] + \
+            [c for c in self.keyword_sets if c not in DEFAULT_PRIORITY]
+        self.negates_to = DEFAULT_NEGATES_TO if negates_to is None else negates_to
+        self.negators = DEFAULT_NEGATORS if negators is None else set(negators)
+        self.negation_window = negation_window
+        self._build()
+
+    def _build(self):
+        # Trie over tokens: goto[state] maps token -> next state; output[state] lists (category, length).
+        self._goto = [{}]
+        self._output = [[]]
+        for category, phrases in self.keyword_sets.items():
+            for phrase in phrases:
+                words = tokenize(phrase)
+                if not words:
+                    continue
+                state = 0
+                for word in words:
+                    nxt = self._goto[state].get(word)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[state][word] = nxt
+                        self._goto.append({})
+                        self._output.append([])
+                    state = nxt
+                self._output[state].append((category, len(words)))
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def _is_negated(self, tokens, start):
+        for idx in range(start - 1, max(-1, start - 1 - self.negation_window), -1):
+            token = tokens[idx]
+            if token in NEGATION_BREAKS:
+                return False
+            if token in self.negators:
+                return True
+        return False
+
+    def scan(self, text):
+        """Returns {category: hit_count} for text that has already had quoted history stripped."""
+        tokens = tokenize(text)
+        hits = {}
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        root = goto[0]
+        for idx, token in enumerate(tokens):
+            if not state and token not in root:
+                continue  # Most tokens are not the start of any phrase
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for category, length in output[state]:
+                start = idx - length + 1
+                if category in self.negates_to and self._is_negated(tokens, start):
+                    category = self.negates_to[category]
+                hits[category] = hits.get(category, 0) + 1
+        return hits
+
+    def classify(self, body):
+        """Returns (category or None, hits) for a raw reply body."""
+        hits = self.scan(strip_quoted_text(body))
+        for category in self.priority:
+            if hits.get(category):
+                return category, hits
+        return None, hits
+
+    def status_for(self, body):
+        category, _ = self.classify(body)
+        return CATEGORY_STATUS.get(category, DEFAULT_STATUS)
+
+
+def load_keyword_sets(path):
+    """Loads {category: [phrases]} from a JSON file; falls back to the defaults if unreadable."""
+    if not path or not os.path.exists(path):
+        return DEFAULT_KEYWORD_SETS
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {str(category): [str(p) for p in phrases] for category, phrases in data.items()}
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Error loading reply keyword sets from {path}: {e}. Using defaults.")
+        return DEFAULT_KEYWORD_SETS
+
+
+_default_classifier = None
+
+
+def get_default_classifier():
+    """Returns the process-wide classifier, building it once from REPLY_KEYWORDS_PATH or the defaults."""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = ReplyClassifier(load_keyword_sets(REPLY_KEYWORDS_PATH))
+    return _default_classifier
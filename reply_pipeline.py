@@ -0,0 +1,184 @@
+import datetime
+import multiprocessing
+import queue
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from config import PIPELINE_WORKERS, PIPELINE_QUEUE_SIZE, PIPELINE_WRITE_BATCH_SIZE
+from database import apply_reply_updates, save_mailbox_checkpoint
+from imap_fetch import fetch_headers, fetch_plain_text_parts, decode_part
+from monitor_replies import route_replies
+from reply_classifier import get_default_classifier, CATEGORY_STATUS, DEFAULT_STATUS
+
+WRITER_FLUSH_INTERVAL_SECONDS = 0.5
+
+_STOP = object()
+
+
+def parse_and_classify(item):
+    """Process-pool stage: decode one raw text/plain part and classify it."""
+    batch_id, uid, sender_email, outreach_id, part = item
+    body = decode_part(*part) if part else None
+    if not body:
+        return batch_id, uid, sender_email, outreach_id, "error_parsing_reply"
+    category, _ = get_default_classifier().classify(body)
+    return batch_id, uid, sender_email, outreach_id, CATEGORY_STATUS.get(category, DEFAULT_STATUS)
+
+
+def _warm_up():
+    return True
+
+
+class _CheckpointTracker:
+    """
+    Tracks fetch batches in UID order and the tracked messages still outstanding in each.
+    The checkpoint only moves past a batch once every message in it, and in every earlier
+    batch, has been committed by the writer.
+    """
+
+    def __init__(self, last_uid):
+        self.last_uid = last_uid
+        self._batches = []  # [batch_id, max_uid, outstanding]
+        self._lock = threading.Lock()
+
+    def batch_started(self, batch_id, max_uid, outstanding):
+        with self._lock:
+            self._batches.append([batch_id, max_uid, outstanding])
+
+    def committed(self, batch_ids):
+        with self._lock:
+            for batch in self._batches:
+                batch[2] -= batch_ids.count(batch[0])
+
+    def advance(self):
+        """Returns the new watermark UID, or None if it did not move."""
+        with self._lock:
+            moved = False
+            while self._batches and self._batches[0][2] <= 0:
+                self.last_uid = self._batches.pop(0)[1]
+                moved = True
+            return self.last_uid if moved else None
+
+
+class ReplyPipeline:
+    """
+    Pipelined reply processing for large backlogs (e.g. after an outage):
+    the calling thread fetches over IMAP and streams raw parts into a bounded queue, a process
+    pool decodes and classifies them, and a single writer thread applies status updates in
+    batched transactions. The mailbox checkpoint (the sync acknowledgement) is only advanced
+    after the writer's commit succeeds.
+    """
+
+    def __init__(self, mail, mailbox_key, uidvalidity, last_uid, fetch_batch_size,
+                 workers=PIPELINE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE, write_batch_size=PIPELINE_WRITE_BATCH_SIZE):
+        self.mail = mail
+        self.mailbox_key = mailbox_key
+        self.uidvalidity = uidvalidity
+        self.fetch_batch_size = fetch_batch_size
+        self.workers = max(1, workers)
+        self.write_batch_size = max(1, write_batch_size)
+        self.raw_queue = queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue()
+        self.tracker = _CheckpointTracker(last_uid)
+        self.commit_failed = threading.Event()
+        # Bounds pool submissions so raw payloads wait in raw_queue (backpressure) instead of piling up in the pool.
+        self._in_flight = threading.BoundedSemaphore(self.workers * 4)
+        self.stats = {"fetched": 0, "tracked": 0, "committed": 0}
+
+    def _dispatch(self, executor):
+        while True:
+            item = self.raw_queue.get()
+            if item is _STOP:
+                break
+            self._in_flight.acquire()
+            future = executor.submit(parse_and_classify, item)
+            future.add_done_callback(lambda f, item=item: self._on_parsed(f, item))
+        # Wait for every submitted item to come back before telling the writer to finish.
+        for _ in range(self.workers * 4):
+            self._in_flight.acquire()
+        self.result_queue.put(_STOP)
+
+    def _on_parsed(self, future, item):
+        try:
+            result = future.result()
+        except Exception as e:
+            batch_id, uid, sender_email, outreach_id, _ = item
+            print(f"Error parsing message UID {uid}: {e}")
+            result = (batch_id, uid, sender_email, outreach_id, "error_parsing_reply")
+        self.result_queue.put(result)
+        self._in_flight.release()
+
+    def _flush(self, pending):
+        if pending:
+            now = datetime.datetime.now()
+            updates = [(sender_email, status, now, outreach_id) for _, _, sender_email, outreach_id, status in pending]
+            if apply_reply_updates(updates) is None:
+                self.commit_failed.set()
+                return
+            self.stats["committed"] += len(pending)
+            self.tracker.committed([result[0] for result in pending])
+        new_uid = self.tracker.advance()
+        if new_uid is not None:
+            save_mailbox_checkpoint(self.mailbox_key, self.uidvalidity, new_uid)
+
+    def _write(self):
+        pending = []
+        while True:
+            try:
+                result = self.result_queue.get(timeout=WRITER_FLUSH_INTERVAL_SECONDS)
+            except queue.Empty:
+                result = None
+            if self.commit_failed.is_set():
+                if result is _STOP:
+                    return
+                continue  # Drain without writing; nothing past the failure may be acknowledged
+            if result is _STOP:
+                self._flush(pending)
+                return
+            if result is not None:
+                pending.append(result)
+            if len(pending) >= self.write_batch_size or result is None:
+                self._flush(pending)
+                pending = []
+
+    def _fetch(self, uids):
+        for batch_id, start in enumerate(range(0, len(uids), self.fetch_batch_size)):
+            if self.commit_failed.is_set():
+                return
+            batch = uids[start:start + self.fetch_batch_size]
+            headers = fetch_headers(self.mail, batch)
+            if headers is None:
+                return
+            tracked = route_replies(headers, verbose=False)
+            parts = fetch_plain_text_parts(self.mail, list(tracked)) if tracked else {}
+            if parts is None:
+                return
+            self.stats["fetched"] += len(batch)
+            self.stats["tracked"] += len(tracked)
+            self.tracker.batch_started(batch_id, batch[-1], len(tracked))
+            for uid, (sender_email, outreach_id) in tracked.items():
+                self.raw_queue.put((batch_id, uid, sender_email, outreach_id, parts.get(uid)))
+
+    def run(self, uids):
+        """Processes uids (ascending, all above the checkpoint). Returns the last checkpointed UID."""
+        mp_context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context) as executor:
+            executor.submit(_warm_up).result()  # Fork the workers before any pipeline threads exist
+            dispatcher = threading.Thread(target=self._dispatch, args=(executor,), name="reply-dispatch", daemon=True)
+            writer = threading.Thread(target=self._write, name="reply-writer", daemon=True)
+            dispatcher.start()
+            writer.start()
+            try:
+                self._fetch(uids)
+            except Exception as e:
+                print(f"Error fetching replies in pipeline: {e}")
+                traceback.print_exc()
+                raise
+            finally:
+                self.raw_queue.put(_STOP)
+                dispatcher.join()
+                writer.join()
+                print(f"Pipeline finished: {self.stats}, checkpoint at UID {self.tracker.last_uid}"
+                      f"{' (stopped after a failed commit)' if self.commit_failed.is_set() else ''}.")
+        return self.tracker.last_uid
@@ -1,5 +1,4 @@
 import smtplib
-import traceback
 from email.mime.text import MIMEText
 from email.utils import formataddr
 from config import (
@@ -7,6 +6,10 @@ from config import (
     MAIL_ENCRYPTION, MAIL_FROM_ADDRESS, MAIL_FROM_NAME
 )
 from email_templates import get_follow_up_cc_email
+from instrumentation import start_span
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
 
 def send_cc(founder_email: str, investor_email: str, investor_name: str, founder_name: str, startup_name: str) -> bool:
     """
@@ -14,7 +17,6 @@ def send_cc(founder_email: str, investor_email: str, investor_name: str, founder
     Returns True on success, False on failure.
     """
     sender_login_email = MAIL_USERNAME
-    print("MAIL_USERNAME", MAIL_USERNAME)
     sender_password = MAIL_PASSWORD
     sender_display_name = MAIL_FROM_NAME
     sender_from_address = MAIL_FROM_ADDRESS
@@ -22,12 +24,12 @@ def send_cc(founder_email: str, investor_email: str, investor_name: str, founder
     try:
         smtp_port = int(MAIL_PORT)
     except (ValueError, TypeError):
-        print(f"Warning: Invalid MAIL_PORT '{MAIL_PORT}' in .env. Defaulting to 587.")
+        logger.warning("Invalid MAIL_PORT %r in .env. Defaulting to 587.", MAIL_PORT)
         smtp_port = 587
     use_tls = MAIL_ENCRYPTION and MAIL_ENCRYPTION.lower() == 'tls'
 
     if not all([sender_login_email, sender_password, smtp_host, smtp_port, sender_from_address]):
-        print("ERROR: Email SMTP configuration missing in .env (MAIL_USERNAME, MAIL_PASSWORD, MAIL_HOST, MAIL_PORT, MAIL_FROM_ADDRESS)")
+        logger.error("Email SMTP configuration missing in .env (MAIL_USERNAME, MAIL_PASSWORD, MAIL_HOST, MAIL_PORT, MAIL_FROM_ADDRESS)")
         return False
 
     try:
@@ -35,7 +37,7 @@ def send_cc(founder_email: str, investor_email: str, investor_name: str, founder
         subject = template_content["subject"]
         body = template_content["body"]
     except Exception as e:
-        print(f"Error generating email content from template: {e}")
+        logger.error("Error generating email content from template: %s", e)
         return False
 
     message = MIMEText(body, 'plain', 'utf-8')
@@ -46,57 +48,53 @@ def send_cc(founder_email: str, investor_email: str, investor_name: str, founder
     recipients = [founder_email, investor_email]
 
     server = None
+    smtp_span = start_span("smtp", "send_cc", host=smtp_host, port=smtp_port)
     try:
-        print(f"DEBUG: Attempting SMTP connection to {smtp_host}:{smtp_port}")
+        logger.debug("Connecting to SMTP %s:%s", smtp_host, smtp_port)
         if smtp_port == 465:
             server = smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=10)
             server.ehlo()
-            print("DEBUG: Connected via SMTP_SSL.")
         else:
             server = smtplib.SMTP(smtp_host, smtp_port, timeout=10)
             server.ehlo()
             if use_tls or smtp_port == 587:
-                print("DEBUG: Starting TLS...")
                 server.starttls()
                 server.ehlo()
-                print("DEBUG: TLS Handshake successful.")
-        print(f"DEBUG: Logging in as {sender_login_email}...")
         server.login(sender_login_email, sender_password)
-        print("DEBUG: SMTP Login successful.")
 
-        print(f"DEBUG: Sending CC email From: {sender_from_address} To: {recipients}...")
         server.sendmail(
             sender_from_address,
             recipients,
             message.as_string()
         )
-        print("DEBUG: CC Email sent successfully via SMTP.")
-
-        print(
-            f"Successfully sent connection email to {founder_name} ({founder_email}) and CC'd {investor_name} ({investor_email}).")
+        logger.info("Sent connection email to %s and CC'd %s", founder_email, investor_email)
         return True
 
     except smtplib.SMTPAuthenticationError as e:
-        print(f"ERROR: SMTP Authentication Error: {e}. Code: {e.smtp_code}, Detail: {e.smtp_error}")
-        print("       Check MAIL_USERNAME and MAIL_PASSWORD (ensure it's an App Password for Gmail with 2FA).")
+        smtp_span.fail(e)
+        logger.error("SMTP authentication failed: %s %s. Check MAIL_USERNAME and MAIL_PASSWORD "
+                     "(an App Password for Gmail with 2FA).", e.smtp_code, e.smtp_error)
         return False
     except smtplib.SMTPConnectError as e:
-        print(f"ERROR: SMTP Connection Error: {e}. Check MAIL_HOST and MAIL_PORT.")
+        smtp_span.fail(e)
+        logger.error("SMTP connection error: %s. Check MAIL_HOST and MAIL_PORT.", e)
         return False
     except smtplib.SMTPServerDisconnected as e:
-        print(f"ERROR: SMTP Server Disconnected Error: {e}.")
+        smtp_span.fail(e)
+        logger.error("SMTP server disconnected: %s", e)
         return False
     except TimeoutError as e:
-        print(f"ERROR: SMTP Timeout Error: {e}. Server may be slow or unreachable.")
+        smtp_span.fail(e)
+        logger.error("SMTP timeout: %s. Server may be slow or unreachable.", e)
         return False
     except Exception as e:
-        print(f"ERROR: Unexpected error sending CC email: {e}")
-        traceback.print_exc()
+        smtp_span.fail(e)
+        logger.exception("Unexpected error sending CC email: %s", e)
         return False
     finally:
         if server:
             try:
-                print("DEBUG: Closing SMTP connection.")
                 server.quit()
             except Exception as e_quit:
-                print(f"Warning: Error closing SMTP connection: {e_quit}")
\ No newline at end of file
+                logger.warning("Error closing SMTP connection: %s", e_quit)
+        smtp_span.end()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+class AgentSession:
+    """Per-browser-session agent state: the founder profile and that founder's agent executor."""
+
+    def __init__(self, session_id, founder, agent_executor):
+        self.session_id = session_id
+        self.founder = founder
+        self.agent_executor = agent_executor
+        self.last_used = time.monotonic()
+        # Fast-path router state: names from the last search shown, and the investor awaiting a yes/no.
+        self.last_results = []
+        self.pending_investor = None
+        # Serializes turns within one session; the agent's memory is not safe for concurrent use.
+        # Taken only on the agent loop (agent_loop.session_locked).
+        self.lock = asyncio.Lock()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+
+class SessionPool:
+    """
+    Bounded pool of AgentSessions keyed by session id.
+    Sessions idle for longer than idle_timeout_seconds are dropped, and when the pool is full
+    the least recently used session is evicted to make room.
+    """
+
+    def __init__(self, agent_factory, max_sessions=100, idle_timeout_seconds=1800):
+        self.agent_factory = agent_factory
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_session_id():
+        return uuid.uuid4().hex
+
+    def _purge_expired(self, now):
+        # OrderedDict is kept in least-recently-used order, so expired sessions are at the front.
+        while self._sessions:
+            session_id, agent_session = next(iter(self._sessions.items()))
+            if now - agent_session.last_used < self.idle_timeout_seconds:
+                break
+            del self._sessions[session_id]
+            logger.debug("Session %s expired after idle timeout.", session_id)
+
+    def _lookup(self, session_id, founder_id):
+        now = time.monotonic()
+        self._purge_expired(now)
+        agent_session = self._sessions.get(session_id)
+        if agent_session is None:
+            return None
+        if agent_session.founder.get("id") != founder_id:
+            # Session switched founders; the old agent's memory belongs to someone else.
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        agent_session.touch()
+        return agent_session
+
+    def get(self, session_id, founder):
+        """Returns the session for session_id, building a new agent for founder if needed."""
+        with self._lock:
+            agent_session = self._lookup(session_id, founder.get("id"))
+        if agent_session is not None:
+            return agent_session
+
+        # Build outside the pool lock so one slow agent build does not stall every other session.
+        new_session = AgentSession(session_id, founder, self.agent_factory(founder))
+
+        with self._lock:
+            agent_session = self._lookup(session_id, founder.get("id"))
+            if agent_session is not None:
+                return agent_session
+            while len(self._sessions) >= self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                logger.debug("Session pool full (%s), evicted LRU session %s.", self.max_sessions, evicted_id)
+            self._sessions[session_id] = new_session
+            return new_session
+
+    def discard(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
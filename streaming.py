@@ -0,0 +1,84 @@
+import contextvars
+import json
+import queue
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+KEEPALIVE_SECONDS = 15
+_DONE = object()
+
+
+def sse_event(event, data):
+    """Formats one server-sent event; data is JSON-encoded so multi-line tool output stays in one frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SSEQueueHandler(BaseCallbackHandler):
+    """Agent callback handler that turns progress, tool results and LLM tokens into queued SSE frames."""
+
+    run_inline = True  # Called on the agent loop itself, so tokens are queued in order; put() never blocks
+
+    def __init__(self, events):
+        self.events = events
+        self._tool_names = {}
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.events.put(sse_event("status", {"message": "Thinking..."}))
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.events.put(sse_event("status", {"message": "Thinking..."}))
+
+    def on_llm_new_token(self, token, **kwargs):
+        if token:
+            self.events.put(sse_event("token", {"text": token}))
+
+    def on_agent_action(self, action, **kwargs):
+        self.events.put(sse_event("action", {"tool": action.tool, "input": action.tool_input}))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._tool_names[kwargs.get("run_id")] = (serialized or {}).get("name")
+
+    def on_tool_end(self, output, **kwargs):
+        name = self._tool_names.pop(kwargs.get("run_id"), None)
+        self.events.put(sse_event("tool", {"tool": name, "output": str(getattr(output, "content", output))}))
+
+    def on_tool_error(self, error, **kwargs):
+        name = self._tool_names.pop(kwargs.get("run_id"), None)
+        self.events.put(sse_event("tool", {"tool": name, "output": f"Error: {error}"}))
+
+
+def stream_agent_turn(work):
+    """
+    Runs work(handler) on a background thread and yields its SSE frames as they are produced.
+    work returns the final response dict, sent as the 'final' event; a keepalive comment is sent
+    during long silent stretches (e.g. a slow LLM call) so proxies do not close the stream.
+    """
+    events = queue.Queue()
+    handler = SSEQueueHandler(events)
+
+    def run():
+        try:
+            events.put(sse_event("final", work(handler)))
+        except Exception as e:
+            logger.exception("Streaming agent turn failed: %s", e)
+            events.put(sse_event("error", {"message": f"Error: There is some error {e}"}))
+        finally:
+            events.put(_DONE)
+
+    # Copy the request's context so spans recorded on the worker thread keep the request's trace id.
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), name="sse-agent-turn", daemon=True).start()
+    while True:
+        try:
+            frame = events.get(timeout=KEEPALIVE_SECONDS)
+        except queue.Empty:
+            yield ": keepalive\n\n"
+            continue
+        if frame is _DONE:
+            yield sse_event("done", {})
+            return
+        yield frame
@@ -0,0 +1,188 @@
+"""
+Recontact suppression checked before every send.
+
+The suppressions table (database.py) is the source of truth: negative replies, unsubscribes, hard
+bounces, manual entries and a cooldown after each send. A Bloom filter over its keys sits in front
+of it, so the common case, an investor with no suppression, is answered in memory without touching
+SQLite. Only a filter hit (a real suppression or a rare false positive) costs an indexed lookup.
+
+Usage: python suppression.py rebuild
+       python suppression.py check <investor_email> [--founder <founder_email>]
+       python suppression.py add <investor_email> [--founder <founder_email>] [--reason manual] [--days N]
+       python suppression.py remove <investor_email> [--founder <founder_email>]
+"""
+import argparse
+import datetime
+import hashlib
+import math
+import threading
+import time
+
+from config import SUPPRESSION_ENABLED, SUPPRESSION_BLOOM_CAPACITY, SUPPRESSION_BLOOM_FP_RATE, SUPPRESSION_REFRESH_SECONDS
+from logging_setup import get_logger
+from database import add_suppression, remove_suppression, rebuild_outreach_suppressions, get_suppression_keys, get_active_suppression
+
+logger = get_logger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, about fp_rate false positives at capacity."""
+
+    def __init__(self, capacity, fp_rate):
+        self.capacity = max(1, capacity)
+        self.num_bits = max(8, int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one 128-bit digest.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def suppression_key(investor_email, founder_email=""):
+    return f"{str(founder_email or '').strip().lower()}|{str(investor_email or '').strip().lower()}"
+
+
+class SuppressionList:
+    """
+    The in-process view of the suppressions table. The first check rebuilds the derived rows from
+    outreach and loads every key into the filter. Writes made through this object are visible at
+    once; writes by other processes (the reply monitors) are picked up every refresh_seconds.
+    """
+
+    def __init__(self, capacity=SUPPRESSION_BLOOM_CAPACITY, fp_rate=SUPPRESSION_BLOOM_FP_RATE,
+                 refresh_seconds=SUPPRESSION_REFRESH_SECONDS):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.refresh_seconds = refresh_seconds
+        self._bloom = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stats = {"checks": 0, "filter_passes": 0, "db_lookups": 0, "suppressed": 0, "db_misses": 0}
+
+    def rebuild(self):
+        """Re-derives the outreach suppressions and reloads the filter. Returns the number of keys loaded."""
+        derived = rebuild_outreach_suppressions()
+        with self._lock:
+            self._load(get_suppression_keys())
+        logger.info("Suppression list rebuilt: %d derived rows, %d keys (%d KiB filter, %d hashes)",
+                    derived, self._bloom.count, self._bloom.num_bits // 8 // 1024, self._bloom.num_hashes)
+        return self._bloom.count
+
+    def _load(self, rows):
+        capacity = self.capacity
+        while capacity < len(rows):
+            capacity *= 2
+        self.capacity = capacity
+        self._bloom = BloomFilter(capacity, self.fp_rate)
+        self._watermark = None
+        self._add_rows(rows)
+        self._refreshed_at = time.monotonic()
+
+    def _add_rows(self, rows):
+        for investor_email, founder_email, updated in rows:
+            self._bloom.add(suppression_key(investor_email, founder_email))
+            if updated is not None and (self._watermark is None or str(updated) > self._watermark):
+                self._watermark = str(updated)
+
+    def _refresh(self):
+        rows = get_suppression_keys(self._watermark)
+        with self._lock:
+            if self._bloom.count + len(rows) > self._bloom.capacity:
+                self._load(get_suppression_keys())  # Past capacity the false positive rate climbs; resize
+            else:
+                self._add_rows(rows)
+            self._refreshed_at = time.monotonic()
+
+    def add(self, investor_email, founder_email="", reason="manual", source="manual", days=None):
+        """Suppresses the investor for founder_email (every founder if ''), for days or until removed."""
+        expires = datetime.datetime.now() + datetime.timedelta(days=days) if days else None
+        if not add_suppression(investor_email, founder_email, reason, source, expires):
+            return False
+        self.note(investor_email, founder_email)
+        return True
+
+    def note(self, investor_email, founder_email=""):
+        """Adds a key that was just written to the table elsewhere (e.g. the cooldown recorded with a send)."""
+        if self._bloom is not None:
+            with self._lock:
+                self._bloom.add(suppression_key(investor_email, founder_email))
+
+    def check(self, investor_email, founder_email):
+        """Returns the active suppression for the pair ({reason, founder_email, expires_timestamp}) or None."""
+        if not SUPPRESSION_ENABLED:
+            return None
+        if self._bloom is None:
+            with self._load_lock:
+                if self._bloom is None:
+                    self.rebuild()
+        elif time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            self._refresh()
+        self._stats["checks"] += 1
+        if suppression_key(investor_email) not in self._bloom and suppression_key(investor_email, founder_email) not in self._bloom:
+            self._stats["filter_passes"] += 1
+            return None
+        self._stats["db_lookups"] += 1
+        suppression = get_active_suppression(investor_email, founder_email)
+        self._stats["suppressed" if suppression else "db_misses"] += 1  # A false positive, or an expired/lifted entry
+        return suppression
+
+    def stats(self):
+        bloom = self._bloom
+        return dict(self._stats, keys=bloom.count if bloom else 0, capacity=bloom.capacity if bloom else self.capacity,
+                    filter_bytes=len(bloom.bits) if bloom else 0, hashes=bloom.num_hashes if bloom else 0)
+
+
+SUPPRESSIONS = SuppressionList()
+
+
+def describe(suppression):
+    """A sentence for the founder explaining why a send was blocked."""
+    scope = "for your startup" if suppression.get("founder_email") else "for everyone"
+    until = f" until {str(suppression['expires_timestamp'])[:16]}" if suppression.get("expires_timestamp") else ""
+    reasons = {
+        "cooldown": "was already contacted recently",
+        "replied_negative": "already declined",
+        "unsubscribed": "asked not to be contacted",
+        "hard_bounce": "has an address that bounced",
+    }
+    return f"{reasons.get(suppression['reason'], 'is on the suppression list')} (suppressed {scope}{until})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild", "check", "add", "remove"])
+    parser.add_argument("investor_email", nargs="?")
+    parser.add_argument("--founder", default="", help="founder email; omit to apply to every founder")
+    parser.add_argument("--reason", default="manual")
+    parser.add_argument("--days", type=float, default=None, help="expire after this many days (default: never)")
+    args = parser.parse_args()
+    if args.command != "rebuild" and not args.investor_email:
+        parser.error(f"{args.command} needs an investor email")
+
+    if args.command == "rebuild":
+        SUPPRESSIONS.rebuild()
+    elif args.command == "check":
+        suppression = SUPPRESSIONS.check(args.investor_email, args.founder)
+        print(f"{args.investor_email} {describe(suppression)}" if suppression else f"{args.investor_email} is not suppressed")
+    elif args.command == "add":
+        print("Suppressed." if SUPPRESSIONS.add(args.investor_email, args.founder, args.reason, "manual", args.days) else "Failed.")
+    else:
+        print("Lifted." if remove_suppression(args.investor_email, args.founder) else "No such suppression.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import jwt
+import re
 import smtplib
-import traceback
+import logging
 import sqlite3
 from email.mime.text import MIMEText
 from email.utils import make_msgid, formataddr
 from langchain.tools import tool
+from typing import List
 import pandas as pd
 from tabulate import tabulate
 from data_loader import get_investor_dataframe 
@@ -12,126 +14,273 @@ from config import (
     MAIL_HOST, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD,
     MAIL_ENCRYPTION, MAIL_FROM_ADDRESS, MAIL_FROM_NAME, ACCEPT_LINK_SECRET_KEY
 )
-from database import add_sent_email_record, init_db, DB_NAME
+from database import add_sent_email_record, init_db, get_founder_by_email, get_recommendations, DB_NAME
 from email_templates import get_initial_outreach_email
+from instrumentation import start_span, TracedConnection
+from llm_instrumentation import INSTRUMENTATION_HANDLER
+from profiling import profiled_tool
+from suppression import SUPPRESSIONS, describe
+from logging_setup import get_logger
 
-@tool
-def search_investors(query: str) -> str:
+logger = get_logger(__name__)
+
+SEARCHABLE_COLUMNS = ['name', 'focusarea', 'investmentstage', 'description', 'industry', 'email']
+DISPLAY_COLUMNS = ['name', 'focusarea', 'investmentstage', 'email']
+
+def find_investors(query):
     """
-    Searches the investor database (CSV) for relevant investors based on provided criteria...
-    (Your corrected search_investors function code here)
+    Runs the investor search without formatting: returns (results DataFrame, None) on success,
+    or (None, error message). Shared by the search_investors tool and the fast-path router.
     """
-    print(f"\n--- DEBUG TOOL: search_investors ---")
-    print(f"DEBUG TOOL: Received query: '{query}'")
-    if query is None or not isinstance(query, str) or query.strip() == "": return "Error: Please provide a valid search query string."
+    logger.debug("Search query %r", query)
+    if query is None or not isinstance(query, str) or query.strip() == "": return None, "Error: Please provide a valid search query string."
     df = get_investor_dataframe()
-    if df is None: return "Error: Investor data could not be loaded."
-    if df.empty: return "Error: Investor data is empty."
-    print(f"DEBUG TOOL: DataFrame Columns: {df.columns.tolist()}")
+    if df is None: return None, "Error: Investor data could not be loaded."
+    if df.empty: return None, "Error: Investor data is empty."
     search_terms = [term for term in query.lower().split() if term]
-    if not search_terms: return "Error: Please provide meaningful search terms."
-    print(f"DEBUG TOOL: Parsed search terms: {search_terms}")
-    searchable_columns = ['name', 'focusarea', 'investmentstage', 'description', 'industry', 'email']
-    display_columns = ['name', 'focusarea', 'investmentstage', 'email']
-    print(f"DEBUG TOOL: Searching within columns: {searchable_columns}")
-    valid_searchable_columns = [col for col in searchable_columns if col in df.columns]
-    if not valid_searchable_columns: return f"Error: Internal configuration issue - search columns {searchable_columns} not found in data columns: {df.columns.tolist()}."
-    print(f"DEBUG TOOL: Valid searchable columns to use: {valid_searchable_columns}")
+    if not search_terms: return None, "Error: Please provide meaningful search terms."
+    valid_searchable_columns = [col for col in SEARCHABLE_COLUMNS if col in df.columns]
+    if not valid_searchable_columns: return None, f"Error: Internal configuration issue - search columns {SEARCHABLE_COLUMNS} not found in data columns: {df.columns.tolist()}."
     try:
         results = df[df.apply(lambda row: any(term in str(row.get(col, '')).lower() for term in search_terms for col in valid_searchable_columns), axis=1)]
-        print(f"DEBUG TOOL: Found {len(results)} rows after filtering.")
-        if not results.empty:
-             debug_display_cols = [col for col in ['name', 'email'] if col in results.columns]
-             if debug_display_cols: print(f"DEBUG TOOL: Filtered Results Head:\n{results[debug_display_cols].head()}")
+        logger.debug("Search terms %s over columns %s: %d rows", search_terms, valid_searchable_columns, len(results))
+        if not results.empty and 'name' in results.columns and logger.isEnabledFor(logging.DEBUG):
+             logger.debug("First matches: %s", results['name'].head().tolist())
     except Exception as e:
-         print(f"ERROR: Unexpected error during filtering: {e}")
-         traceback.print_exc()
-         return f"An unexpected error occurred during the search process: {e}"
+         logger.exception("Unexpected error during filtering: %s", e)
+         return None, f"An unexpected error occurred during the search process: {e}"
+    return results, None
+
+# Batch search. Column weights rank a name hit above a focus/stage hit above a description hit.
+SEARCH_WEIGHTS = {'name': 3, 'focusarea': 2, 'investmentstage': 2, 'industry': 2, 'description': 1, 'email': 1}
+MAX_BATCH_QUERIES = 8
+MAX_BATCH_LIMIT = 20
+COMPACT_ROW_RE = re.compile(r"^\d+\. (.+?) \[(inv_[0-9a-f]+)\]", re.MULTILINE)
+_lowered_cache = {}
+_investor_index_cache = {}
+
+def _lowered(df):
+    """Lower-cased text of the searchable columns, computed once per loaded DataFrame."""
+    if _lowered_cache.get('df') is not df:
+        columns = [col for col in SEARCH_WEIGHTS if col in df.columns]
+        _lowered_cache['frame'] = pd.DataFrame({col: df[col].astype(str).str.lower() for col in columns})
+        _lowered_cache['df'] = df
+    return _lowered_cache['frame']
+
+def search_investor_rows(queries, stage="", focus="", limit=5):
+    """
+    Runs several keyword queries in one pass and merges them into one ranked list.
+    Returns ({"queries", "stage", "focus", "total", "rows"}, None) or (None, error message). Each
+    row is {investor_id, name, stage, focus, score, matched}; score is the best query's weighted
+    share of matched terms (0-1) and matched lists the indices of the queries that hit the row.
+    """
+    if isinstance(queries, str):
+        queries = [queries]
+    queries = [q.strip() for q in (queries or []) if isinstance(q, str) and q.strip()][:MAX_BATCH_QUERIES]
+    stage, focus = (stage or "").strip().lower(), (focus or "").strip().lower()
+    if not queries and not stage and not focus:
+        return None, "Error: Please provide at least one search query or a stage/focus filter."
+    df = get_investor_dataframe()
+    if df is None: return None, "Error: Investor data could not be loaded."
+    if df.empty: return None, "Error: Investor data is empty."
+    limit = max(1, min(int(limit or 5), MAX_BATCH_LIMIT))
+
+    lowered = _lowered(df)
+    keep = pd.Series(True, index=df.index)
+    if stage and 'investmentstage' in lowered:
+        keep &= lowered['investmentstage'].str.contains(stage, regex=False)
+    if focus and 'focusarea' in lowered:
+        keep &= lowered['focusarea'].str.contains(focus, regex=False)
+
+    best = pd.Series(1.0 if not queries else 0.0, index=df.index)
+    matched = [[] for _ in range(len(df))]
+    for q_idx, query in enumerate(queries):
+        terms = [term for term in query.lower().split() if term]
+        score = pd.Series(0.0, index=df.index)
+        for term in terms:
+            # Match at a word start, so "ai" finds "AI, Robotics" but not "Retail" or "Main Street".
+            pattern = r"\b" + re.escape(term)
+            term_weight = pd.Series(0, index=df.index)
+            for col in lowered.columns:
+                hit = lowered[col].str.contains(pattern, regex=True)
+                term_weight = term_weight.where(~hit | (term_weight >= SEARCH_WEIGHTS[col]), SEARCH_WEIGHTS[col])
+            score += term_weight
+        score /= max(SEARCH_WEIGHTS.values()) * max(len(terms), 1)
+        for pos in (score > 0).to_numpy().nonzero()[0]:
+            matched[pos].append(q_idx)
+        best = best.where(best >= score, score)
+
+    mask = keep & (best > 0)
+    hits = df[mask].assign(_score=best[mask]).sort_values('_score', ascending=False, kind='stable')
+    rows = [{
+        'investor_id': row.get('investor_id', ''),
+        'name': row.get('name', ''),
+        'stage': row.get('investmentstage', ''),
+        'focus': row.get('focusarea', ''),
+        'score': round(float(row['_score']), 2),
+        'matched': matched[df.index.get_loc(idx)],
+    } for idx, row in hits.head(limit).iterrows()]
+    return {'queries': queries, 'stage': stage, 'focus': focus, 'total': int(len(hits)), 'rows': rows}, None
+
+def render_compact(result):
+    """One line per investor, about a third of the tokens of the grid table; parse_compact_rows reads it back."""
+    criteria = result.get('criteria') or " | ".join(f'"{q}"' for q in result['queries']) or "all investors"
+    filters = ", ".join(f"{name}: {value}" for name, value in (('stage', result['stage']), ('focus', result['focus'])) if value)
+    if not result['rows']:
+        return f"No investors found for {criteria}" + (f" ({filters})." if filters else ".")
+    lines = [f"Found {result['total']} investors for {criteria}" + (f" ({filters})" if filters else "")
+             + f". Top {len(result['rows'])}:"]
+    for n, row in enumerate(result['rows'], start=1):
+        lines.append(f"{n}. {row['name']} [{row['investor_id']}] · {row['stage'] or '-'} · {row['focus'] or '-'} · {row['score']:.2f}")
+    lines.append("Reply with an investor's name or number to contact them.")
+    return "\n".join(lines)
+
+def recommended_investor_rows(founder, limit=5):
+    """
+    The founder's precomputed recommendations (see affinity.py) in the search_investor_rows shape,
+    so render_compact and the UI handle both alike. Returns (result, None) or (None, error message);
+    the result has no rows until the affinity job has scored this founder.
+    """
+    if not founder or founder.get('id') is None:
+        return None, "Error: Unknown founder."
+    limit = max(1, min(int(limit or 5), MAX_BATCH_LIMIT))
+    index = investor_index()
+    rows = []
+    for rec in get_recommendations(founder['id']):
+        investor = index.get(rec['investor_id'])
+        if investor is None:
+            continue  # Removed from the CSV since the last affinity run
+        rows.append({
+            'investor_id': rec['investor_id'],
+            'name': investor.get('name', ''),
+            'stage': investor.get('investmentstage', ''),
+            'focus': investor.get('focusarea', ''),
+            'score': round(float(rec['score']), 2),
+            'matched': [],
+        })
+    criteria = f"{founder.get('startup_name') or 'your startup'}'s pitch"
+    return {'queries': [], 'stage': '', 'focus': '', 'criteria': criteria, 'total': len(rows), 'rows': rows[:limit]}, None
+
+def parse_compact_rows(text):
+    """Returns [(name, investor_id)] from render_compact output, or [] if text is not one."""
+    return COMPACT_ROW_RE.findall(text or "")
+
+@tool(return_direct=True)
+def batch_search_investors(queries: List[str], stage: str = "", focus: str = "", limit: int = 5) -> str:
+    """
+    Finds investors for one or more keyword queries in a single call, e.g. queries=["fintech", "payments"].
+    Optional filters: stage (e.g. "seed") and focus (e.g. "AI"); limit caps the rows returned (default 5).
+    Returns one ranked list that is shown to the user as is.
+    """
+    logger.debug("batch_search_investors queries=%s stage=%r focus=%r", queries, stage, focus)
+    result, error = search_investor_rows(queries, stage, focus, limit)
+    if error: return error
+    logger.debug("%d matches, returning %d rows", result['total'], len(result['rows']))
+    return render_compact(result)
+
+@tool(return_direct=True)
+def recommend_investors(founder_email: str, limit: int = 5) -> str:
+    """
+    Lists the investors that best match the founder's pitch, ranked ahead of time, with no search needed.
+    Use it when the founder asks for recommendations or who to contact. Pass the founder's email.
+    Returns one ranked list that is shown to the user as is.
+    """
+    logger.debug("recommend_investors founder_email=%s limit=%s", founder_email, limit)
+    founder = get_founder_by_email(founder_email or "")
+    if founder is None:
+        return f"Error: No founder found with email '{founder_email}'."
+    result, error = recommended_investor_rows(founder, limit)
+    if error: return error
+    if not result['rows']:
+        return "No recommendations are available yet. Tell me what kind of investors you are looking for and I will search."
+    return render_compact(result)
+
+@tool
+def search_investors(query: str) -> str:
+    """
+    Searches the investor database (CSV) for relevant investors based on provided criteria...
+    (Your corrected search_investors function code here)
+    """
+    results, error = find_investors(query)
+    if error: return error
     if results.empty:
-        print("DEBUG TOOL: Results DataFrame is empty.")
         return f"No investors found matching the criteria: '{query}'"
     else:
-        valid_display_columns = [col for col in display_columns if col in results.columns]
-        print(f"DEBUG TOOL: Valid display columns found: {valid_display_columns}")
+        valid_display_columns = [col for col in DISPLAY_COLUMNS if col in results.columns]
         if not valid_display_columns:
              fallback_cols = [col for col in ['name', 'email'] if col in results.columns]
              if fallback_cols:
-                  print("DEBUG TOOL: Falling back to displaying Name/Email.")
+                  logger.debug("No display columns; falling back to name/email")
                   valid_display_columns = fallback_cols
              else: return "Error: Could not find suitable columns (like name or email) to display results."
         try:
             table_output = tabulate(results[valid_display_columns].head(5), headers='keys', tablefmt='grid', stralign='left')
             summary = f"\n\nFound {len(results)} total matches. Showing top {min(5, len(results))}."
-            print(f"DEBUG TOOL: Returning formatted results table.")
-            print(f"--- END DEBUG TOOL: search_investors ---")
             return table_output + summary
         except Exception as e:
-            print(f"ERROR: Error formatting results: {e}")
-            traceback.print_exc()
+            logger.exception("Error formatting results: %s", e)
             return f"Found {len(results)} matches, but encountered an error displaying the details."
 
-@tool
-def send_investor_email(
-    investor_name: str,
-    founder_email: str,
-    founder_name: str,
-    startup_name: str,
-    startup_pitch: str
-) -> str:
+def investor_index():
+    """{investor_id: row} for the loaded investors, built once per DataFrame."""
+    df = get_investor_dataframe()
+    if df is None:
+        return {}
+    if _investor_index_cache.get('df') is not df:
+        _investor_index_cache['by_id'] = {row['investor_id']: row for row in df.to_dict('records') if row.get('investor_id')}
+        _investor_index_cache['df'] = df
+    return _investor_index_cache['by_id']
+
+def find_investor_by_name(investor_name):
     """
-    Sends an HTML email to a specific investor, including an acceptance button.
-    Requires: investor_name, founder_email, founder_name, startup_name, startup_pitch
+    Resolves a (partial) investor name to exactly one investor row with a usable email.
+    Returns (row dict, None) or (None, error message).
     """
-
-    print(f"\n--- DEBUG TOOL: send_investor_email ---")
-    print(f"DEBUG TOOL: Received request to email investor named: '{investor_name}'")
-
-    required_args = {
-        "investor_name": investor_name,
-        "founder_email": founder_email,
-        "founder_name": founder_name,
-        "startup_name": startup_name,
-        "startup_pitch": startup_pitch
-    }
-    missing_args = [k for k, v in required_args.items() if not v]
-    if missing_args:
-        return f"Error: Missing required arguments: {', '.join(missing_args)}."
-
     df = get_investor_dataframe()
     if df is None:
-        return "Error: Investor data could not be loaded to find email."
-
-    investor_email = None
-    investor_name_exact = None
-    investor_focus = None
+        return None, "Error: Investor data could not be loaded to find email."
 
     try:
         potential_matches = df[df['name'].str.contains(investor_name, case=False, na=False)]
         if len(potential_matches) == 1:
-            matched_row = potential_matches.iloc[0]
+            matched_row = potential_matches.iloc[0].to_dict()
             investor_email = matched_row.get('email')
-            investor_name_exact = matched_row.get('name')
-            investor_focus = matched_row.get('focusarea', "") 
-            print(f"DEBUG TOOL: Found unique match for '{investor_name}': Email={investor_email}, Exact Name='{investor_name_exact}', Focus='{investor_focus}'")
+            logger.debug("Unique match for %r: %s <%s>", investor_name, matched_row.get('name'), investor_email)
 
         elif len(potential_matches) > 1:
-            print(f"ERROR: Found multiple investors matching name '{investor_name}'. Cannot proceed.")
-            return f"Error: Ambiguous investor name. Found multiple matches for '{investor_name}'. Please be more specific."
+            logger.info("Multiple investors match name %r", investor_name)
+            return None, f"Error: Ambiguous investor name. Found multiple matches for '{investor_name}'. Please be more specific."
         else:
-            print(f"ERROR: Could not find an investor with name '{investor_name}' in the data.")
-            return f"Error: Investor named '{investor_name}' not found in the database."
+            logger.info("No investor named %r", investor_name)
+            return None, f"Error: Investor named '{investor_name}' not found in the database."
 
         if not investor_email or not isinstance(investor_email, str) or '@' not in investor_email:
-            print(f"ERROR: Found investor '{investor_name}' but email ('{investor_email}') is missing or invalid.")
-            return f"Error: Found investor '{investor_name}' but their email address is missing or invalid in the data."
+            logger.warning("Investor %r has a missing or invalid email (%r)", investor_name, investor_email)
+            return None, f"Error: Found investor '{investor_name}' but their email address is missing or invalid in the data."
+        return matched_row, None
 
     except KeyError as e:
-        print(f"ERROR: Column missing for email lookup (likely 'name' or 'email'): {e}")
-        return f"Error: Required column '{e}' missing in data for email lookup."
+        logger.error("Column missing for email lookup (likely 'name' or 'email'): %s", e)
+        return None, f"Error: Required column '{e}' missing in data for email lookup."
     except Exception as e:
-        print(f"ERROR: Unexpected error during investor email lookup: {e}")
-        traceback.print_exc()
-        return f"Error looking up investor email: {e}"
+        logger.exception("Unexpected error during investor email lookup: %s", e)
+        return None, f"Error looking up investor email: {e}"
+
+def send_outreach_email(investor, founder_email, founder_name, startup_name, startup_pitch):
+    """
+    The send pipeline shared by the agent tool and /api/outreach: acceptance link, templated HTML
+    email over SMTP, and the outreach DB record. investor is a row from the investor data.
+    Returns (result message, Message-ID), with Message-ID None if nothing was sent.
+    """
+    investor_email = investor.get('email')
+    investor_name_exact = investor.get('name')
+    investor_focus = investor.get('focusarea', "")
+
+    # Before anything is rendered or an SMTP session opened; a miss is answered from memory.
+    suppression = SUPPRESSIONS.check(investor_email, founder_email)
+    if suppression:
+        logger.info("Not sending to %s: suppressed (%s)", investor_email, suppression['reason'])
+        return f"Error: Not sent. {investor_name_exact} {describe(suppression)}.", None
 
     sender_login_email = MAIL_USERNAME
     sender_password = MAIL_PASSWORD
@@ -145,7 +294,7 @@ def send_investor_email(
     use_tls = MAIL_ENCRYPTION and MAIL_ENCRYPTION.lower() == 'tls'
 
     if not all([sender_login_email, sender_password, smtp_host, smtp_port, sender_from_address]):
-        return "Error: Email credentials/server info not fully configured."
+        return "Error: Email credentials/server info not fully configured.", None
 
     try:
         payload = {
@@ -178,30 +327,25 @@ def send_investor_email(
         message['Message-ID'] = message_id
 
     except Exception as e:
-        print(f"ERROR: Error generating email content or JWT: {e}")
-        return f"Error generating email content: {e}"
+        logger.error("Error generating email content or JWT: %s", e)
+        return f"Error generating email content: {e}", None
 
     server = None
+    smtp_span = start_span("smtp", "send_investor_email", host=smtp_host, port=smtp_port)
     try:
-        print(f"DEBUG: Attempting SMTP connection to {smtp_host}:{smtp_port}")
+        logger.debug("Connecting to SMTP %s:%s", smtp_host, smtp_port)
         if smtp_port == 465:
             server = smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=15)
         else:
             server = smtplib.SMTP(smtp_host, smtp_port, timeout=15)
             server.ehlo()
             if use_tls or smtp_port == 587:
-                print("DEBUG: Starting TLS...")
                 server.starttls()
                 server.ehlo()
-                print("DEBUG: TLS Handshake successful.")
-        print(f"DEBUG: Logging in as {sender_login_email}...")
         server.login(sender_login_email, sender_password)
-        print("DEBUG: SMTP Login successful.")
-        print(f"DEBUG: Sending email From: {sender_from_address} To: {investor_email}...")
         server.sendmail(sender_from_address, [investor_email], message.as_string())
-        print("DEBUG: Email sent successfully via SMTP.")
+        logger.info("Outreach email sent to %s (%s)", investor_email, message_id)
 
-        print("DEBUG: Attempting to record send in database...")
         record_added = add_sent_email_record(
             investor_email=investor_email,
             investor_name=investor_name_exact,
@@ -210,38 +354,79 @@ def send_investor_email(
             startup_name=startup_name,
             message_id=message_id
         )
+        if record_added:
+            SUPPRESSIONS.note(investor_email, founder_email)  # The cooldown row written with the record
         db_msg = " (DB record added)" if record_added else " (DB record FAILED)"
-        print(f"DEBUG: Database record attempt status: {db_msg}")
-        print(f"--- END DEBUG TOOL: send_investor_email (Success) ---")
-        return f"Email successfully sent to {investor_name_exact} at {investor_email}." + db_msg
+        if not record_added:
+            logger.error("Sent to %s but the outreach record could not be saved", investor_email)
+        return f"Email successfully sent to {investor_name_exact} at {investor_email}." + db_msg, message_id
 
+    except smtplib.SMTPRecipientsRefused as e:
+        smtp_span.fail(e)
+        code, detail = next(iter(e.recipients.values()), (None, b""))
+        logger.warning("Recipient %s refused: %s %s", investor_email, code, detail)
+        if code and code >= 500:  # Permanent failure: a hard bounce, never worth retrying
+            SUPPRESSIONS.add(investor_email, reason='hard_bounce', source='send')
+        return f"Error: The mail server refused {investor_email} ({code}).", None
     except smtplib.SMTPAuthenticationError as e:
-        print(f"ERROR: SMTP Auth Error: {e}. Code: {e.smtp_code}, Detail: {e.smtp_error}")
-        return f"Error: SMTP Authentication failed ({e.smtp_code}). Check credentials. {e.smtp_error}"
+        smtp_span.fail(e)
+        logger.error("SMTP authentication failed: %s %s", e.smtp_code, e.smtp_error)
+        return f"Error: SMTP Authentication failed ({e.smtp_code}). Check credentials. {e.smtp_error}", None
     except Exception as e:
-        print(f"ERROR: Unexpected error sending email: {e}")
-        traceback.print_exc()
-        return f"Error: Failed to send email to {investor_name}. Details: {e}"
+        smtp_span.fail(e)
+        logger.exception("Unexpected error sending email: %s", e)
+        return f"Error: Failed to send email to {investor_name_exact}. Details: {e}", None
     finally:
         if server:
             try:
                 server.quit()
             except Exception:
                 pass
+        smtp_span.end()
+
+@tool
+def send_investor_email(
+    investor_name: str,
+    founder_email: str,
+    founder_name: str,
+    startup_name: str,
+    startup_pitch: str
+) -> str:
+    """
+    Sends an HTML email to a specific investor, including an acceptance button.
+    Requires: investor_name, founder_email, founder_name, startup_name, startup_pitch
+    """
+
+    logger.debug("send_investor_email investor_name=%r", investor_name)
+
+    required_args = {
+        "investor_name": investor_name,
+        "founder_email": founder_email,
+        "founder_name": founder_name,
+        "startup_name": startup_name,
+        "startup_pitch": startup_pitch
+    }
+    missing_args = [k for k, v in required_args.items() if not v]
+    if missing_args:
+        return f"Error: Missing required arguments: {', '.join(missing_args)}."
+
+    investor, error = find_investor_by_name(investor_name)
+    if error:
+        return error
+    result, _ = send_outreach_email(investor, founder_email, founder_name, startup_name, startup_pitch)
+    return result
 
 @tool
 def check_investor_outreach_status(investor_email: str) -> str:
     """Checks the database for the latest recorded status..."""
-    print(f"\n--- DEBUG TOOL: check_investor_outreach_status ---")
-    print(f"DEBUG TOOL: Checking status for: '{investor_email}'")
+    logger.debug("check_investor_outreach_status %s", investor_email)
     if not investor_email or not isinstance(investor_email, str): return "Error: Please provide a valid investor email address string."
     normalized_email = investor_email.lower().strip()
     conn = None
     try:
         init_db()
-        conn = sqlite3.connect(DB_NAME)
+        conn = sqlite3.connect(DB_NAME, factory=TracedConnection)
         cursor = conn.cursor()
-        print(f"DEBUG TOOL: Querying database for status of {normalized_email}...")
         cursor.execute("SELECT status, sent_timestamp, reply_timestamp FROM outreach WHERE investor_email = ? ORDER BY sent_timestamp DESC LIMIT 1", (normalized_email,))
         row = cursor.fetchone()
         if row:
@@ -249,22 +434,23 @@ def check_investor_outreach_status(investor_email: str) -> str:
             sent_ts_str = f" (Outreach sent: {pd.to_datetime(sent_ts).strftime('%Y-%m-%d %H:%M')})" if sent_ts else ""
             reply_ts_str = f" (Reply detected: {pd.to_datetime(reply_ts).strftime('%Y-%m-%d %H:%M')})" if reply_ts else ""
             status_msg = f"Status for {normalized_email}: '{status}'.{sent_ts_str}{reply_ts_str}"
-            print(f"DEBUG TOOL: Found status: {status} | Sent: {sent_ts} | Replied: {reply_ts}")
-            print(f"--- END DEBUG TOOL: check_investor_outreach_status (Found) ---")
+            logger.debug("Status %s, sent %s, replied %s", status, sent_ts, reply_ts)
             return status_msg
         else:
-            print(f"DEBUG TOOL: No outreach record found.")
-            print(f"--- END DEBUG TOOL: check_investor_outreach_status (Not Found) ---")
             return f"No outreach record found for investor email: {normalized_email}"
     except sqlite3.Error as e:
-        print(f"ERROR: Database error checking status: {e}")
-        traceback.print_exc()
+        logger.exception("Database error checking status: %s", e)
         return f"Error checking status due to database issue: {e}"
     except Exception as e:
-        print(f"ERROR: Unexpected error checking status: {e}")
-        traceback.print_exc()
+        logger.exception("Unexpected error checking status: %s", e)
         return f"An unexpected error occurred while checking status: {e}"
     finally:
          if conn:
              try: conn.close()
-             except Exception: pass
\ No newline at end of file
+             except Exception: pass
+
+# Every tool run, whoever calls it (agent, fast-path router or a script), records a span, and is
+# sampled into the request's profile when that request is being profiled.
+for _tool in (search_investors, batch_search_investors, recommend_investors, send_investor_email, check_investor_outreach_status):
+    _tool.callbacks = [INSTRUMENTATION_HANDLER]
+    _tool.func = profiled_tool(_tool.name, _tool.func)